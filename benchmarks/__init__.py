@@ -0,0 +1,27 @@
+"""
+Benchmarks for Hikari TikTok Downloader
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+Cluster benchmark
+Runs a coordinator and several worker processes on localhost against the stand-in CDN
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cdn_server import CDNConfig, StandInCDN
+from core.coordinator import Coordinator, CoordinatorServer
+
+FIXTURE_URL = "https://www.tiktok.com/@bench/video/{}"
+
+class FixtureEngine:
+    """Maps TikTok-style URLs to files on the stand-in CDN"""
+    
+    def __init__(self, cdn_url):
+        from engines.tiktok_api_engine import TikTokApiEngine
+        self.cdn_url = cdn_url.rstrip("/")
+        self.engine = TikTokApiEngine()
+    
+    def download(self, url, output_path, quality="best", progress_callback=None, status_callback=None,
+                 prepared=None, cancel_token=None):
+        video_id = url.rstrip("/").rsplit("/", 1)[-1]
+        filepath = os.path.join(output_path, video_id)
+        if cancel_token:
+            cancel_token.reserved_path = filepath
+        success = self.engine._download_file(
+            f"{self.cdn_url}/video/{video_id}.mp4", filepath + ".mp4",
+            progress_callback, status_callback, cancel_token
+        )
+        return success, "Download completed" if success else "Download failed"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=3, help="Worker processes to start")
+    parser.add_argument("--slots", type=int, default=2, help="Concurrent jobs per worker")
+    parser.add_argument("--files", type=int, default=30, help="Distinct videos to submit")
+    parser.add_argument("--duplicates", type=int, default=10, help="Extra submissions of already queued videos")
+    parser.add_argument("--size-mb", type=float, default=1.0, help="Payload size per file")
+    parser.add_argument("--bandwidth-mbps", type=float, default=40, help="Per-connection cap, 0 = unlimited")
+    parser.add_argument("--lease-seconds", type=int, default=3, help="Lease period")
+    parser.add_argument("--kill-after", type=int, default=5,
+                        help="Kill the first worker after this many completed jobs, 0 = never")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--as-worker", nargs=3, metavar=("COORDINATOR", "CDN", "OUTPUT"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def run_worker_process(args):
+    """Entry point of each worker subprocess"""
+    from core.remote_worker import RemoteWorker
+    coordinator_url, cdn_url, output_path = args.as_worker
+    engines = {'fixture': FixtureEngine(cdn_url)}
+    worker = RemoteWorker(coordinator_url, engines, output_path, args.slots,
+                          worker_id=f"worker-{os.getpid()}", default_engine="fixture", poll_seconds=2)
+    worker.start()
+    worker.wait()
+
+def wait_until_done(base_url, total, killer=None, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        counts = requests.get(f"{base_url}/stats", timeout=5).json()['jobs']
+        if killer:
+            killer(counts.get('completed', 0))
+        if sum(counts.get(s, 0) for s in ("completed", "failed", "duplicate")) >= total:
+            return counts
+        time.sleep(0.2)
+    raise TimeoutError("Cluster did not finish in time")
+
+def main():
+    args = parse_args()
+    if args.as_worker:
+        run_worker_process(args)
+        return
+    
+    config = CDNConfig(size=int(args.size_mb * 1024 * 1024), latency=0.02,
+                       bandwidth=int(args.bandwidth_mbps * 1024 * 1024 / 8))
+    work_dir = tempfile.mkdtemp(prefix="hikari-cluster-")
+    coordinator = Coordinator(os.path.join(work_dir, "archive.txt"), lease_seconds=args.lease_seconds)
+    coordinator.start()
+    server = CoordinatorServer(("127.0.0.1", 0), coordinator)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    processes = []
+    try:
+        with StandInCDN(config) as cdn:
+            for index in range(args.workers):
+                output_path = os.path.join(work_dir, f"worker-{index}")
+                os.makedirs(output_path)
+                processes.append(subprocess.Popen(
+                    [sys.executable, os.path.abspath(__file__), "--slots", str(args.slots),
+                     "--as-worker", base_url, cdn.base_url, output_path],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                ))
+            
+            video_ids = [str(7300000000000000000 + index) for index in range(args.files)]
+            urls = [FIXTURE_URL.format(v) for v in video_ids]
+            urls += urls[:args.duplicates]
+            start = time.perf_counter()
+            reply = requests.post(f"{base_url}/jobs", json={'urls': urls, 'engine': 'fixture'}, timeout=10).json()
+            
+            killed = []
+            def killer(completed):
+                if args.kill_after and not killed and completed >= args.kill_after:
+                    processes[0].kill()
+                    killed.append(completed)
+            
+            counts = wait_until_done(base_url, len(reply['jobs']), killer)
+            seconds = time.perf_counter() - start
+            workers = requests.get(f"{base_url}/workers", timeout=5).json()['workers']
+            
+            # Submitting the same videos again is a no-op thanks to the archive
+            again = requests.post(f"{base_url}/jobs", json={'urls': urls[:5]}, timeout=10).json()
+        
+        files = sum(name.endswith(".mp4") for _, _, names in os.walk(work_dir) for name in names)
+        result = {
+            'workers': args.workers,
+            'submitted': len(urls),
+            'accepted': len(reply['jobs']),
+            'deduplicated': len(reply['duplicates']),
+            'resubmitted_accepted': len(again['jobs']),
+            'jobs': counts,
+            'killed_worker_after': killed[0] if killed else None,
+            'files_on_disk': files,
+            'seconds': round(seconds, 3),
+            'throughput_mb_s': round(counts.get('completed', 0) * args.size_mb / seconds, 3),
+            'per_worker': {name: {k: w[k] for k in ('completed', 'failed', 'expired', 'alive')}
+                           for name, w in sorted(workers.items())}
+        }
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+        server.shutdown()
+        server.server_close()
+        coordinator.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['workers']} workers: submitted={result['submitted']} accepted={result['accepted']} "
+          f"deduplicated={result['deduplicated']} resubmitted_accepted={result['resubmitted_accepted']}")
+    print(f"jobs={result['jobs']} files_on_disk={result['files_on_disk']} "
+          f"seconds={result['seconds']} throughput_mb_s={result['throughput_mb_s']}")
+    for name, worker in result['per_worker'].items():
+        print(f"  {name:<16} completed={worker['completed']} failed={worker['failed']} "
+              f"expired={worker['expired']} alive={worker['alive']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+End-to-end download benchmark
+Drives the engines and job workers against the local stand-in CDN
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cdn_server import CDNConfig, StandInCDN
+from core.jobs import JobManager
+from engines.tiktok_api_engine import TikTokApiEngine
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+class FixtureTikTokApiEngine(TikTokApiEngine):
+    """TikTok API engine whose video info points at the stand-in CDN"""
+    
+    def __init__(self, cdn):
+        super().__init__()
+        self.cdn = cdn
+    
+    def _extract_video_id(self, url):
+        return url.rstrip("/").rsplit("/", 1)[-1].replace(".mp4", "")
+    
+    def _get_video_info(self, video_id):
+        return {
+            'id': video_id,
+            'title': f'bench_{video_id}',
+            'author': 'bench',
+            'download_urls': {'best': self.cdn.url_for(video_id)}
+        }
+
+def current_rss():
+    """Resident set size in bytes, where the platform exposes it"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def create_engines(cdn):
+    engines = {"tiktok-api": FixtureTikTokApiEngine(cdn)}
+    try:
+        from engines.yt_dlp_engine import YtDlpEngine
+        engines["yt-dlp"] = YtDlpEngine()
+    except ImportError:
+        pass
+    return engines
+
+def run_benchmark(args):
+    config = CDNConfig(
+        size=int(args.size_mb * 1024 * 1024),
+        latency=args.latency,
+        bandwidth=int(args.bandwidth_mbps * 1024 * 1024 / 8),
+        accept_ranges=not args.no_ranges,
+        failure_rate=args.failure_rate,
+        truncate_rate=args.truncate_rate
+    )
+    output_path = tempfile.mkdtemp(prefix="hikari-bench-")
+    
+    with StandInCDN(config) as cdn:
+        engines = create_engines(cdn)
+        if args.engine not in engines:
+            raise SystemExit(f"Engine not available: {args.engine}")
+        
+        manager = JobManager(engines, max_workers=args.workers, default_engine=args.engine)
+        
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        manager.start()
+        jobs = [
+            # The yt-dlp engine reads the CDN URL directly with its generic extractor
+            manager.submit(cdn.url_for(f"{index:06d}"), output_path)
+            for index in range(args.jobs)
+        ]
+        while not all(job.finished for job in jobs):
+            time.sleep(0.01)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        manager.shutdown()
+        stats = dict(cdn.stats)
+        finished = [job.to_dict() for job in jobs]
+    
+    shutil.rmtree(output_path, ignore_errors=True)
+    
+    latencies = [job['finished_at'] - job['created_at'] for job in finished]
+    completed = [job for job in finished if job['status'] == "completed"]
+    total_bytes = len(completed) * config.size
+    return {
+        'label': args.label,
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'engine': args.engine,
+        'jobs': args.jobs,
+        'workers': args.workers,
+        'cdn': config.to_dict(),
+        'cdn_stats': stats,
+        'completed': len(completed),
+        'failed': len(finished) - len(completed),
+        'wall_seconds': wall,
+        'throughput_mb_s': total_bytes / wall / 1024 / 1024 if wall else None,
+        'jobs_per_second': len(completed) / wall if wall else None,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p95': percentile(latencies, 95),
+        'cpu_seconds': cpu,
+        'cpu_percent': 100.0 * cpu / wall if wall else None,
+        'rss_bytes': current_rss(),
+        'peak_rss_bytes': peak_rss()
+    }
+
+def print_result(result, baseline=None):
+    keys = ("throughput_mb_s", "jobs_per_second", "latency_p50", "latency_p95",
+            "cpu_percent", "peak_rss_bytes")
+    print(f"engine={result['engine']} jobs={result['jobs']} workers={result['workers']} "
+          f"completed={result['completed']} failed={result['failed']}")
+    for key in keys:
+        value = result.get(key)
+        line = f"  {key:<16} {value if value is None else round(value, 3)}"
+        if baseline and baseline.get(key) and value is not None:
+            change = (value - baseline[key]) / baseline[key] * 100
+            line += f"  ({change:+.1f}% vs {baseline.get('label') or 'baseline'})"
+        print(line)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engine", default="tiktok-api", help="Engine to benchmark")
+    parser.add_argument("--jobs", type=int, default=50, help="Number of download jobs")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent job workers")
+    parser.add_argument("--size-mb", type=float, default=2.0, help="Payload size per video")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before each response")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="Per-connection cap, 0 = unlimited")
+    parser.add_argument("--no-ranges", action="store_true", help="Disable Accept-Ranges support")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="Share of responses cut off early")
+    parser.add_argument("--label", default="", help="Name stored with the results")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/e2e-<time>.json)")
+    parser.add_argument("--compare", help="Previous result JSON to compare against")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    result = run_benchmark(args)
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_result(result, baseline)
+    
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"e2e-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results saved to {output}")
+
+if __name__ == "__main__":
+    main()
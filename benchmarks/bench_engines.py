@@ -0,0 +1,82 @@
+"""
+Engine comparison benchmark
+Runs every registered engine's benchmark() hook on the same fixture files
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cdn_server import CDNConfig, StandInCDN
+from engines import create_engines
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engine", action="append", help="Engine to run (repeatable, default: all)")
+    parser.add_argument("--files", type=int, default=10, help="Fixture files per engine")
+    parser.add_argument("--size-mb", type=float, default=2.0, help="Payload size per file")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before each response")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="Per-connection cap, 0 = unlimited")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    config = CDNConfig(
+        size=int(args.size_mb * 1024 * 1024),
+        latency=args.latency,
+        bandwidth=int(args.bandwidth_mbps * 1024 * 1024 / 8)
+    )
+    registry = create_engines()
+    names = args.engine or registry.names()
+    
+    results = []
+    with StandInCDN(config) as cdn:
+        urls = [cdn.url_for(f"{index:06d}") for index in range(args.files)]
+        for name in names:
+            result = registry.benchmark(name, urls)
+            result['capabilities'] = registry.capabilities(name).to_dict()
+            results.append(result)
+    
+    for name in names:
+        engine = registry.loaded(name)
+        if engine and hasattr(engine, "shutdown"):
+            engine.shutdown()
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        print(f"{result['engine']:<12} failed={result['failed']}/{result['jobs']} "
+              f"seconds={result['seconds']} mean_job={result['mean_job_seconds']} "
+              f"throughput_mb_s={result['throughput_mb_s']}")
+
+if __name__ == "__main__":
+    main()
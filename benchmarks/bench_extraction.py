@@ -0,0 +1,147 @@
+"""
+Extraction throughput benchmark
+Compares in-process threads against the process pool for yt-dlp extraction
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines.extraction_pool import ExtractionPool, _extract_in_worker
+
+EXTRACT_OPTS = {'quiet': True, 'no_warnings': True, 'noplaylist': True}
+
+def build_page(page_kb):
+    """Build a synthetic video page that keeps the generic extractor busy"""
+    filler = json.dumps([{'id': i, 'text': 'x' * 64} for i in range(page_kb * 10)])
+    return (
+        "<html><head><title>Synthetic clip</title>"
+        "<meta property=\"og:video\" content=\"/clip.mp4\">"
+        f"<script type=\"application/json\">{filler}</script>"
+        "</head><body><video src=\"/clip.mp4\"></video></body></html>"
+    ).encode('utf-8')
+
+def start_page_server(page_kb):
+    """Serve the synthetic page locally so no network is involved"""
+    page = build_page(page_kb)
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_threads(urls, workers):
+    """Extract with a thread pool in this process (GIL-bound)"""
+    _extract_in_worker(urls[0], EXTRACT_OPTS)  # warm up imports and extractor caches
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda url: _extract_in_worker(url, EXTRACT_OPTS), urls))
+        return time.perf_counter() - start
+
+def run_processes(urls, workers):
+    """Extract with the process pool used by YtDlpEngine"""
+    pool = ExtractionPool(workers)
+    try:
+        pool.warm_up()
+        start = time.perf_counter()
+        futures = [pool.submit(url, EXTRACT_OPTS) for url in urls]
+        for future in futures:
+            future.result()
+        return time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--urls", help="File with real URLs to extract (default: local synthetic pages)")
+    parser.add_argument("--jobs", type=int, default=48, help="Synthetic extractions per run")
+    parser.add_argument("--page-kb", type=int, default=256, help="Synthetic page size factor")
+    parser.add_argument("--workers", default=None, help="Comma-separated worker counts (default: 1,2,4..cpu)")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    cpus = multiprocessing.cpu_count()
+    if args.workers:
+        worker_counts = [int(value) for value in args.workers.split(",")]
+    else:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpus:
+            worker_counts.append(worker_counts[-1] * 2)
+    
+    server = None
+    if args.urls:
+        with open(args.urls, 'r', encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip()]
+    else:
+        server = start_page_server(args.page_kb)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base}/video/{index}" for index in range(args.jobs)]
+    
+    print(f"CPUs: {cpus}  jobs: {len(urls)}")
+    print(f"{'workers':>8} {'threads/s':>10} {'procs/s':>10} {'speedup':>8}")
+    results = []
+    for workers in worker_counts:
+        thread_time = run_threads(urls, workers)
+        process_time = run_processes(urls, workers)
+        row = {
+            'workers': workers,
+            'thread_throughput': len(urls) / thread_time,
+            'process_throughput': len(urls) / process_time
+        }
+        results.append(row)
+        print(f"{workers:>8} {row['thread_throughput']:>10.1f} {row['process_throughput']:>10.1f} "
+              f"{row['process_throughput'] / row['thread_throughput']:>7.2f}x")
+    
+    if server:
+        server.shutdown()
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'cpus': cpus, 'jobs': len(urls), 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Proxy pool benchmark
+Downloads fixture files through local forwarding proxies, some of them offline
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cdn_server import CDNConfig, StandInCDN
+from benchmarks.forward_proxy import LocalForwardProxy
+from engines.tiktok_api_engine import TikTokApiEngine
+from utils.proxy_pool import ProxyPool, STRATEGIES
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--proxies", type=int, default=3, help="Local proxies to start")
+    parser.add_argument("--offline", type=int, default=1, help="How many of them refuse traffic")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="least-loaded")
+    parser.add_argument("--files", type=int, default=30, help="Fixture files to download")
+    parser.add_argument("--size-mb", type=float, default=1.0, help="Payload size per file")
+    parser.add_argument("--workers", type=int, default=6, help="Concurrent downloads")
+    parser.add_argument("--max-concurrency", type=int, default=2, help="Transfers per proxy")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="Cap per proxy, 0 = unlimited")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    config = CDNConfig(size=int(args.size_mb * 1024 * 1024), latency=0.02)
+    output_path = tempfile.mkdtemp(prefix="hikari-proxies-")
+    
+    with contextlib.ExitStack() as stack:
+        cdn = stack.enter_context(StandInCDN(config))
+        proxies = [stack.enter_context(LocalForwardProxy()) for _ in range(args.proxies)]
+        for proxy in proxies[:args.offline]:
+            proxy.online = False
+        
+        pool = ProxyPool(
+            [{'url': proxy.url, 'max_concurrency': args.max_concurrency,
+              'max_bandwidth_mbps': args.bandwidth_mbps or None} for proxy in proxies],
+            strategy=args.strategy,
+            probe_url=cdn.url_for("probe"),
+            probe_interval=1
+        )
+        pool.probe_all()
+        engine = TikTokApiEngine(proxy_pool=pool)
+        
+        def download(index):
+            url = cdn.url_for(f"{index:06d}")
+            with pool.acquire(session_key=url) as lease:
+                return engine._download_file(url, os.path.join(output_path, f"{index:06d}.mp4"), lease=lease)
+        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(download, range(args.files)))
+        seconds = time.perf_counter() - start
+        pool.shutdown()
+        
+        result = {
+            'strategy': args.strategy,
+            'jobs': args.files,
+            'failed': results.count(False),
+            'seconds': round(seconds, 3),
+            'throughput_mb_s': round(args.files * args.size_mb / seconds, 3),
+            'proxies': [dict(p.to_dict(), requests=s.stats.get('requests', 0), bytes=s.stats.get('bytes', 0))
+                        for p, s in zip(pool.proxies, proxies)]
+        }
+    shutil.rmtree(output_path, ignore_errors=True)
+    
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['strategy']}: failed={result['failed']}/{result['jobs']} "
+          f"seconds={result['seconds']} throughput_mb_s={result['throughput_mb_s']}")
+    for proxy in result['proxies']:
+        print(f"  {proxy['url']:<24} healthy={proxy['healthy']} requests={proxy['requests']} "
+              f"mb={proxy['bytes'] / 1024 / 1024:.1f}")
+
+if __name__ == "__main__":
+    main()
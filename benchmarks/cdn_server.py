@@ -0,0 +1,252 @@
+"""
+Local stand-in CDN for benchmarks
+Serves synthetic MP4 payloads with configurable latency, bandwidth and failures
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHUNK_SIZE = 64 * 1024
+
+def synthetic_payload_chunk():
+    """Build one reusable chunk of media data"""
+    rng = random.Random(1234)
+    return bytes(rng.getrandbits(8) for _ in range(CHUNK_SIZE))
+
+def _box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+def _full_box(box_type, payload):
+    return _box(box_type, b"\x00\x00\x00\x00" + payload)  # Version 0, no flags
+
+def _track(track_id, handler, codec, offsets, duration, width=0, height=0):
+    if max(offsets) > 0xFFFFFFFF:
+        chunks = _full_box(b"co64", struct.pack(f">I{len(offsets)}Q", len(offsets), *offsets))
+    else:
+        chunks = _full_box(b"stco", struct.pack(f">I{len(offsets)}I", len(offsets), *offsets))
+    entry = _box(codec, bytes(6) + struct.pack(">H", 1) + bytes(16) + struct.pack(">HH", width, height))
+    stbl = _box(b"stbl", _full_box(b"stsd", struct.pack(">I", 1) + entry) + chunks)
+    mdia = _box(b"mdia",
+                _full_box(b"mdhd", struct.pack(">IIIIHH", 0, 0, 1000, duration * 1000, 0x55C4, 0)) +
+                _full_box(b"hdlr", bytes(4) + handler + bytes(12) + b"\x00") +
+                _box(b"minf", stbl))
+    tkhd = _full_box(b"tkhd", struct.pack(">IIII", 0, 0, track_id, 0) + struct.pack(">I", duration * 1000) +
+                     bytes(52) + struct.pack(">II", width << 16, height << 16))
+    return _box(b"trak", tkhd + mdia)
+
+def synthetic_video_header(size, duration=15, width=720, height=1280):
+    """Build the ftyp, moov and mdat header of a complete ``size``-byte MP4
+    
+    The mdat payload fills the rest of the file and the chunk offsets of
+    both tracks point into it, so a fully downloaded file passes
+    utils.mp4 checks and only a cut-off transfer fails them.
+    """
+    ftyp = _box(b"ftyp", b"isom\x00\x00\x02\x00isomiso2avc1mp41")
+    
+    def moov(data_start):
+        data = size - data_start
+        mvhd = _full_box(b"mvhd", struct.pack(">IIII", 0, 0, 1000, duration * 1000) + bytes(76) +
+                         struct.pack(">I", 3))
+        return _box(b"moov", mvhd +
+                    _track(1, b"vide", b"avc1", [data_start, data_start + data // 2], duration, width, height) +
+                    _track(2, b"soun", b"mp4a", [data_start + data // 4], duration))
+    
+    # The moov size does not depend on the offset values, only on their width
+    head = len(ftyp) + len(moov(size))
+    mdat_size = size - head
+    if mdat_size > 0xFFFFFFFF:
+        mdat = struct.pack(">I4sQ", 1, b"mdat", mdat_size)
+    else:
+        mdat = struct.pack(">I4s", mdat_size, b"mdat")
+    data_start = head + len(mdat)
+    if data_start >= size:
+        raise ValueError(f"size must be over {data_start} bytes to hold an MP4 file")
+    return ftyp + moov(data_start) + mdat
+
+class CDNConfig:
+    """Behaviour of the stand-in CDN"""
+    
+    def __init__(self, size=2 * 1024 * 1024, latency=0.0, bandwidth=0,
+                 accept_ranges=True, failure_rate=0.0, truncate_rate=0.0, seed=42):
+        self.size = size                    # payload bytes per video
+        self.latency = latency              # seconds before the response starts
+        self.bandwidth = bandwidth          # bytes/s per connection, 0 = unlimited
+        self.accept_ranges = accept_ranges  # honour Range requests
+        self.failure_rate = failure_rate    # share of requests answered with 503
+        self.truncate_rate = truncate_rate  # share of responses cut off half way
+        self.seed = seed
+    
+    def to_dict(self):
+        return dict(vars(self))
+
+class _CDNHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Clients may drop keep-alive connections at any time
+    
+    def do_HEAD(self):
+        self._serve(send_body=False)
+    
+    def do_GET(self):
+        self._serve(send_body=True)
+    
+    def _serve(self, send_body):
+        cdn = self.server.cdn
+        config = cdn.config
+        cdn.count("requests")
+        
+        if not re.match(r"^/video/[\w-]+\.mp4$", self.path.split("?")[0]):
+            self.send_error(404)
+            return
+        
+        if config.latency:
+            time.sleep(config.latency)
+        
+        if cdn.roll(config.failure_rate):
+            cdn.count("failures")
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        
+        start, end = 0, config.size - 1
+        range_header = self.headers.get("Range")
+        match = re.match(r"bytes=(\d+)-(\d*)", range_header or "")
+        if match and config.accept_ranges:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)), end)
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{config.size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{config.size}")
+            cdn.count("range_requests")
+        else:
+            self.send_response(200)
+        
+        length = end - start + 1
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(length))
+        if config.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if not send_body:
+            return
+        
+        if cdn.roll(config.truncate_rate):
+            cdn.count("truncated")
+            length //= 2
+            self.close_connection = True
+        
+        self._send_body(start, length, config.bandwidth)
+    
+    def _send_body(self, offset, length, bandwidth):
+        header, chunk = self.server.cdn.header, self.server.cdn.chunk
+        began = time.perf_counter()
+        sent = 0
+        try:
+            while sent < length:
+                position = offset + sent
+                if position < len(header):
+                    piece = header[position:position + min(len(header) - position, length - sent)]
+                else:
+                    # Media data repeats the same chunk up to the end of the file
+                    position = (position - len(header)) % CHUNK_SIZE
+                    piece = chunk[position:position + min(CHUNK_SIZE - position, length - sent)]
+                self.wfile.write(piece)
+                sent += len(piece)
+                if bandwidth:
+                    # Sleep until the average rate drops back under the cap
+                    ahead = sent / bandwidth - (time.perf_counter() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.server.cdn.count("bytes_sent", sent)
+
+class StandInCDN:
+    """Threaded local HTTP server that mimics a video CDN"""
+    
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or CDNConfig()
+        self.header = synthetic_video_header(self.config.size)
+        self.chunk = synthetic_payload_chunk()
+        self.stats = {}
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _CDNHandler)
+        self._server.daemon_threads = True
+        self._server.cdn = self
+        self._thread = None
+    
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def url_for(self, video_id):
+        return f"{self.base_url}/video/{video_id}.mp4"
+    
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+    
+    def roll(self, rate):
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
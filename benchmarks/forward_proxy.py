@@ -0,0 +1,130 @@
+"""
+Local forwarding proxy for benchmarks
+Minimal HTTP forward proxy that counts traffic and can be switched off
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import http.client
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+CHUNK_SIZE = 64 * 1024
+
+# Hop-by-hop headers are not forwarded
+_HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "proxy-authorization",
+                "te", "trailers", "transfer-encoding", "upgrade"}
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    def do_GET(self):
+        self._forward(send_body=True)
+    
+    def do_HEAD(self):
+        self._forward(send_body=False)
+    
+    def _forward(self, send_body):
+        proxy = self.server.proxy
+        proxy.count("requests")
+        if not proxy.online:
+            # Behave like a dead upstream proxy
+            self.send_error(502, "Proxy offline")
+            self.close_connection = True
+            return
+        
+        target = urlsplit(self.path)
+        if target.scheme != "http" or not target.hostname:
+            self.send_error(400, "Only absolute http:// URLs are proxied")
+            return
+        
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in _HOP_HEADERS}
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        try:
+            path = target.path + (f"?{target.query}" if target.query else "")
+            connection.request(self.command, path or "/", headers=headers)
+            response = connection.getresponse()
+            self.send_response(response.status, response.reason)
+            for key, value in response.getheaders():
+                if key.lower() not in _HOP_HEADERS:
+                    self.send_header(key, value)
+            self.end_headers()
+            if send_body:
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    proxy.count("bytes", len(chunk))
+        except OSError:
+            self.close_connection = True
+        finally:
+            connection.close()
+
+class LocalForwardProxy:
+    """Threaded HTTP forward proxy on localhost"""
+    
+    def __init__(self, host="127.0.0.1", port=0):
+        self.online = True
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _ProxyHandler)
+        self._server.daemon_threads = True
+        self._server.proxy = self
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,540 @@
+"""
+Cluster coordinator for Hikari TikTok Downloader
+Holds the shared job queue and download archive; remote workers lease jobs over HTTP
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer
+
+from core.daemon import DaemonRequestHandler
+from core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_cluster_metrics
+from core.scheduler import JobScheduler, INTERACTIVE, BATCH
+from utils.validator import URLValidator
+
+DEFAULT_COORDINATOR_PORT = 8766
+
+class DownloadArchive:
+    """Video IDs that were already downloaded, kept in a yt-dlp style archive file
+    
+    Each line reads "tiktok <video id>", so the same file also works with
+    yt-dlp's --download-archive option.
+    """
+    
+    PREFIX = "tiktok"
+    
+    def __init__(self, path=None):
+        self.path = path
+        self._ids = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2:
+                        self._ids.add(parts[1])
+    
+    def __contains__(self, video_id):
+        with self._lock:
+            return video_id in self._ids
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._ids)
+    
+    def add(self, video_id):
+        """Record a finished download; False if it was already recorded"""
+        with self._lock:
+            if video_id in self._ids:
+                return False
+            self._ids.add(video_id)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(f"{self.PREFIX} {video_id}\n")
+            return True
+
+class ClusterJob:
+    """A job in the coordinator's queue"""
+    
+    QUEUED = "queued"
+    LEASED = "leased"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    DUPLICATE = "duplicate"
+    
+    FINISHED_STATES = (COMPLETED, FAILED, DUPLICATE)
+    
+    def __init__(self, url, video_key, engine=None, quality="best", priority=BATCH):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        # Numeric video ID, or the short link itself until a worker resolves it
+        self.video_key = video_key
+        self.engine = engine
+        self.quality = quality
+        self.priority = priority
+        self.status = self.QUEUED
+        self.attempts = 0
+        self.lease_id = None
+        self.worker = None
+        self.lease_expires = None
+        self.progress = 0.0
+        self.message = ""
+        self.metrics = {}
+        self.created_at = time.time()
+        self.queued_at = self.created_at
+        self.finished_at = None
+    
+    @property
+    def finished(self):
+        return self.status in self.FINISHED_STATES
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'url': self.url,
+            'video_id': self.video_key,
+            'engine': self.engine,
+            'quality': self.quality,
+            'priority': self.priority,
+            'status': self.status,
+            'attempts': self.attempts,
+            'worker': self.worker,
+            'progress': round(self.progress, 2),
+            'message': self.message,
+            'metrics': self.metrics,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+class Coordinator:
+    """Job queue, leases and download archive shared by remote workers
+    
+    Workers lease jobs for ``lease_seconds`` and extend them with
+    heartbeats. A lease that runs out (the worker died or lost its
+    network) goes back in the queue for another worker; a job is given
+    up after ``max_attempts`` failed or expired leases. Submissions are
+    deduplicated by video ID against queued, running and archived jobs.
+    """
+    
+    def __init__(self, archive_path=None, lease_seconds=60, max_attempts=3, history_limit=10000):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.history_limit = history_limit
+        self.archive = DownloadArchive(archive_path)
+        self.validator = URLValidator()
+        self.logger = logging.getLogger("HikariDownloader")
+        
+        self._jobs = {}
+        self._by_video = {}
+        self._leases = {}
+        self._workers = {}
+        self._queue = JobScheduler()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper = None
+    
+    def start(self):
+        """Start the thread that reassigns expired leases"""
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, name="hikari-lease-reaper", daemon=True)
+            self._reaper.start()
+    
+    def shutdown(self):
+        self._stop.set()
+        self._queue.close()
+    
+    @property
+    def priorities(self):
+        """Priority classes jobs can be submitted with"""
+        return self._queue.priorities
+    
+    def submit(self, url, engine=None, quality="best", priority=BATCH):
+        """Queue a URL; returns (job, created), or (None, False) if already archived"""
+        video_key = self.validator.extract_video_id(url) or url
+        with self._lock:
+            if video_key in self.archive:
+                return None, False
+            existing = self._by_video.get(video_key)
+            if existing and existing.status != ClusterJob.FAILED:
+                return existing, False
+            job = ClusterJob(url, video_key, engine, quality, priority)
+            self._jobs[job.id] = job
+            self._by_video[video_key] = job
+        self._enqueue(job)
+        return job, True
+    
+    def _enqueue(self, job):
+        self._queue.put(job.id, job.priority, queued_at=job.queued_at)
+    
+    def get_job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def list_jobs(self, status=None):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if status:
+            jobs = [job for job in jobs if job.status == status]
+        return sorted(jobs, key=lambda job: job.created_at)
+    
+    def _touch_worker(self, worker_id, metrics=None):
+        worker = self._workers.setdefault(worker_id, {
+            'completed': 0, 'failed': 0, 'expired': 0, 'metrics': {}, 'first_seen': time.time()
+        })
+        worker['last_seen'] = time.time()
+        if metrics:
+            worker['metrics'] = metrics
+        return worker
+    
+    def lease(self, worker_id, max_jobs=1, wait=0):
+        """Hand up to ``max_jobs`` queued jobs to a worker, waiting up to ``wait`` seconds for the first"""
+        with self._lock:
+            self._touch_worker(worker_id)
+        leased = []
+        timeout = wait
+        while len(leased) < max_jobs:
+            job_id = self._queue.get(timeout=timeout)
+            timeout = 0  # Only wait for the first job
+            if job_id is None:
+                break
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if not job or job.status != ClusterJob.QUEUED:
+                    continue
+                job.status = ClusterJob.LEASED
+                job.lease_id = uuid.uuid4().hex
+                job.worker = worker_id
+                job.lease_expires = time.monotonic() + self.lease_seconds
+                job.progress = 0.0
+                self._leases[job.lease_id] = job
+                leased.append(dict(job.to_dict(), lease_id=job.lease_id))
+        return leased
+    
+    def heartbeat(self, worker_id, leases=None, metrics=None):
+        """Extend a worker's leases; returns the lease IDs it no longer holds"""
+        lost = []
+        with self._lock:
+            self._touch_worker(worker_id, metrics)
+            for entry in leases or []:
+                job = self._leases.get(entry.get('lease_id'))
+                if job is None or job.worker != worker_id:
+                    lost.append(entry.get('lease_id'))
+                    continue
+                job.lease_expires = time.monotonic() + self.lease_seconds
+                job.progress = float(entry.get('progress') or job.progress)
+        return lost
+    
+    def resolve(self, worker_id, lease_id, video_id):
+        """Re-key a short-link job by the video it points to; True if it is a duplicate"""
+        with self._lock:
+            job = self._leases.get(lease_id)
+            if job is None or job.worker != worker_id or not video_id or job.video_key == video_id:
+                return False
+            existing = self._by_video.get(video_id)
+            duplicate = video_id in self.archive or (
+                existing is not None and existing is not job and existing.status != ClusterJob.FAILED
+            )
+            if self._by_video.get(job.video_key) is job:
+                del self._by_video[job.video_key]
+            job.video_key = video_id
+            if duplicate:
+                del self._leases[lease_id]
+                self._finish(job, ClusterJob.DUPLICATE, "Already downloaded or queued")
+            else:
+                self._by_video[video_id] = job
+            return duplicate
+    
+    def complete(self, worker_id, lease_id, success, message="", metrics=None):
+        """Record a worker's result; False if the lease had already been reassigned"""
+        with self._lock:
+            worker = self._touch_worker(worker_id)
+            job = self._leases.get(lease_id)
+            if job is None or job.worker != worker_id:
+                return False
+            del self._leases[lease_id]
+            job.metrics = metrics or {}
+            if success:
+                worker['completed'] += 1
+                self.archive.add(job.video_key)
+                self._finish(job, ClusterJob.COMPLETED, message or "Download completed")
+                return True
+            
+            worker['failed'] += 1
+            job.attempts += 1
+            if job.attempts >= self.max_attempts:
+                self._finish(job, ClusterJob.FAILED, message)
+                return True
+            self._requeue(job, message)
+        self._enqueue(job)
+        return True
+    
+    def _requeue(self, job, message):
+        job.status = ClusterJob.QUEUED
+        job.lease_id = None
+        job.worker = None
+        job.lease_expires = None
+        job.message = message
+    
+    def _finish(self, job, status, message):
+        job.status = status
+        job.message = message
+        job.lease_id = None
+        job.lease_expires = None
+        job.finished_at = time.time()
+        if status == ClusterJob.COMPLETED:
+            job.progress = 100.0
+        if status != ClusterJob.COMPLETED and self._by_video.get(job.video_key) is job:
+            del self._by_video[job.video_key]
+        self._trim_history()
+    
+    def _trim_history(self):
+        """Forget the oldest finished jobs (the archive still deduplicates them)"""
+        if not self.history_limit or len(self._jobs) <= self.history_limit:
+            return
+        for job_id, job in list(self._jobs.items()):
+            if len(self._jobs) <= self.history_limit:
+                break
+            if job.finished:
+                del self._jobs[job_id]
+                if self._by_video.get(job.video_key) is job:
+                    del self._by_video[job.video_key]
+    
+    def _reap_loop(self):
+        while not self._stop.wait(1.0):
+            self.reap_expired()
+    
+    def reap_expired(self):
+        """Put jobs whose lease ran out back in the queue"""
+        now = time.monotonic()
+        requeue = []
+        with self._lock:
+            for lease_id, job in list(self._leases.items()):
+                if job.lease_expires > now:
+                    continue
+                del self._leases[lease_id]
+                worker = self._workers.get(job.worker)
+                if worker:
+                    worker['expired'] += 1
+                self.logger.warning(f"Job {job.id}: lease held by {job.worker} expired")
+                job.attempts += 1
+                if job.attempts >= self.max_attempts:
+                    self._finish(job, ClusterJob.FAILED, "Lease expired too many times")
+                else:
+                    self._requeue(job, "Lease expired; reassigning")
+                    requeue.append(job)
+        for job in requeue:
+            self._enqueue(job)
+        return len(requeue)
+    
+    def workers(self):
+        """Known workers with their counters and last reported metrics"""
+        now = time.time()
+        with self._lock:
+            active = {}
+            for job in self._leases.values():
+                active[job.worker] = active.get(job.worker, 0) + 1
+            return {
+                worker_id: dict(
+                    info,
+                    active=active.get(worker_id, 0),
+                    alive=now - info['last_seen'] < self.lease_seconds
+                )
+                for worker_id, info in self._workers.items()
+            }
+    
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            'jobs': counts,
+            'queued': len(self._queue),
+            'archived': len(self.archive),
+            'workers': len(self._workers)
+        }
+
+class CoordinatorRequestHandler(DaemonRequestHandler):
+    """REST API of the coordinator
+    
+    POST   /jobs             queue {"urls": [...], "engine", "quality", "priority"}
+    GET    /jobs             list jobs (optional ?status=)
+    GET    /jobs/<id>        job details
+    POST   /lease            {"worker", "max_jobs", "wait"} -> leased jobs
+    POST   /heartbeat        {"worker", "leases": [{"lease_id", "progress"}], "metrics"}
+    POST   /resolve          {"worker", "lease_id", "video_id"} -> {"duplicate"}
+    POST   /complete         {"worker", "lease_id", "success", "message", "metrics"}
+    GET    /workers          workers, their counters and last metrics
+    GET    /stats            job counts, queue depth and archive size
+    GET    /metrics          the same numbers in Prometheus text format
+    GET    /health           liveness check
+    """
+    
+    @property
+    def coordinator(self):
+        return self.server.coordinator
+    
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # A worker went away mid long-poll; its leases expire
+    
+    def do_GET(self):
+        parts, params = self._route()
+        if parts == ["health"]:
+            self._send_json(200, {'status': 'ok'})
+        elif parts == ["stats"]:
+            self._send_json(200, self.coordinator.stats())
+        elif parts == ["workers"]:
+            self._send_json(200, {'workers': self.coordinator.workers()})
+        elif parts == ["metrics"]:
+            self._send_text(200, render_cluster_metrics(self.coordinator), METRICS_CONTENT_TYPE)
+        elif parts == ["jobs"]:
+            jobs = self.coordinator.list_jobs(params.get("status", [None])[0])
+            self._send_json(200, {'jobs': [job.to_dict() for job in jobs]})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.coordinator.get_job(parts[1])
+            if job:
+                self._send_json(200, job.to_dict())
+            else:
+                self._send_json(404, {'error': 'Job not found'})
+        else:
+            self._send_json(404, {'error': 'Not found'})
+    
+    def do_POST(self):
+        parts, _ = self._route()
+        try:
+            payload = self._read_json()
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        
+        worker = payload.get("worker")
+        if parts in (["lease"], ["heartbeat"], ["resolve"], ["complete"]) and not (worker and isinstance(worker, str)):
+            self._send_json(400, {'error': 'Missing worker ID'})
+        elif parts == ["lease"]:
+            try:
+                max_jobs, wait = self._lease_params(payload)
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            jobs = self.coordinator.lease(worker, max_jobs, wait)
+            self._send_json(200, {'jobs': jobs, 'lease_seconds': self.coordinator.lease_seconds})
+        elif parts == ["heartbeat"]:
+            lost = self.coordinator.heartbeat(worker, payload.get("leases"), payload.get("metrics"))
+            self._send_json(200, {'lost': lost})
+        elif parts == ["resolve"]:
+            duplicate = self.coordinator.resolve(worker, payload.get("lease_id"), payload.get("video_id"))
+            self._send_json(200, {'duplicate': duplicate})
+        elif parts == ["complete"]:
+            accepted = self.coordinator.complete(
+                worker, payload.get("lease_id"), bool(payload.get("success")),
+                payload.get("message") or "", payload.get("metrics")
+            )
+            self._send_json(200 if accepted else 409, {'accepted': accepted})
+        elif parts == ["jobs"]:
+            self._submit(payload)
+        else:
+            self._send_json(404, {'error': 'Not found'})
+    
+    def do_DELETE(self):
+        self._send_json(404, {'error': 'Not found'})
+    
+    def _lease_params(self, payload):
+        """(max_jobs, wait) of a lease request; raises ValueError when malformed"""
+        max_jobs, wait = payload.get("max_jobs") or 1, payload.get("wait") or 0
+        if isinstance(max_jobs, bool) or not isinstance(max_jobs, int) or max_jobs < 1:
+            raise ValueError('"max_jobs" must be a positive integer')
+        if isinstance(wait, bool) or not isinstance(wait, (int, float)) or not math.isfinite(wait) or wait < 0:
+            raise ValueError('"wait" must be a non-negative number of seconds')
+        # Long-poll, but never past the point where the client gives up
+        return max_jobs, min(float(wait), 30.0)
+    
+    def _submit(self, payload):
+        urls = payload.get("urls") or ([payload["url"]] if payload.get("url") else [])
+        if not isinstance(urls, list):
+            self._send_json(400, {'error': '"urls" must be a list'})
+            return
+        if not urls:
+            self._send_json(400, {'error': 'No URLs given'})
+            return
+        priority = payload.get("priority") or (INTERACTIVE if len(urls) == 1 else BATCH)
+        if not isinstance(priority, str) or priority not in self.coordinator.priorities:
+            self._send_json(400, {'error': f'Unknown priority: {priority}'})
+            return
+        
+        accepted, duplicates, rejected = [], [], []
+        validator = self.coordinator.validator
+        for url in urls:
+            url = validator.normalize_url(str(url).strip())
+            is_valid, message = validator.is_valid_tiktok_url(url)
+            if not is_valid:
+                rejected.append({'url': url, 'error': message})
+                continue
+            job, created = self.coordinator.submit(
+                url, payload.get("engine"), payload.get("quality") or "best", priority
+            )
+            if created:
+                accepted.append(job.to_dict())
+            else:
+                duplicates.append({'url': url, 'job': job.id if job else None})
+        status = 202 if accepted else (200 if duplicates else 400)
+        self._send_json(status, {'jobs': accepted, 'duplicates': duplicates, 'rejected': rejected})
+
+class CoordinatorServer(ThreadingHTTPServer):
+    """HTTP server around one coordinator"""
+    
+    daemon_threads = True
+    
+    def __init__(self, address, coordinator):
+        super().__init__(address, CoordinatorRequestHandler)
+        self.coordinator = coordinator
+        self.stopping = False
+
+def serve_coordinator(host="127.0.0.1", port=DEFAULT_COORDINATOR_PORT, archive_path=None, lease_seconds=60):
+    """Run the coordinator until interrupted"""
+    from utils.logger import Logger
+    logger = Logger()
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    coordinator = Coordinator(archive_path or os.path.join(base_dir, "download_archive.txt"), lease_seconds)
+    coordinator.start()
+    
+    server = CoordinatorServer((host, port), coordinator)
+    logger.info(f"Coordinator listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        coordinator.shutdown()
+        logger.info("Coordinator stopped")
\ No newline at end of file
@@ -0,0 +1,376 @@
+"""
+Local REST daemon for Hikari TikTok Downloader
+Exposes the download engines over HTTP from one long-running process
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import json
+import logging
+import os
+import queue
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from core.ingest import URLIngestor
+from core.jobs import JobManager
+from core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from core.scheduler import INTERACTIVE, BATCH, size_hint
+from engines import create_engines
+from utils.validator import URLValidator
+from utils.settings import get_settings
+from utils.proxy_pool import get_proxy_pool
+from utils.catalog import get_catalog
+from utils.thumbnails import get_thumbnail_cache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """Routes REST calls to the shared job manager
+
+    POST   /jobs             queue {"urls": [...] or "text", "engine", "quality", "output_dir", "priority"}
+    GET    /jobs             list jobs (optional ?status=)
+    GET    /stats            queue depth and wait times per priority class, circuit
+                             breakers, proxies, and per-engine routing stats once "auto" is used
+    GET    /metrics          the same numbers in Prometheus text format
+    GET    /engines          registered engines and their capabilities
+    GET    /catalog          search downloaded videos (?q=, author=, since=, until=, by=, limit=)
+    GET    /thumbnails/<id>  cached JPEG thumbnail of a downloaded video
+    GET    /jobs/<id>        job details
+    DELETE /jobs/<id>        cancel a job
+    POST   /jobs/<id>/pause  pause a job, keeping its partial download
+    POST   /jobs/<id>/resume put a paused job back in the queue
+    GET    /events           server-sent progress events (optional ?job=<id>)
+    GET    /health           liveness check
+    """
+    
+    server_version = "HikariDaemon/1.2.0"
+    
+    @property
+    def manager(self):
+        return self.server.manager
+    
+    def log_message(self, format, *args):
+        logging.getLogger("HikariDownloader").debug("Daemon: " + format % args)
+    
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _send_text(self, status, text, content_type="text/plain; charset=utf-8"):
+        self._send_bytes(status, text.encode('utf-8'), content_type)
+    
+    def _send_bytes(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _read_json(self):
+        """Parse a JSON object body; raises ValueError for anything else
+        
+        Only application/json is accepted: browsers must ask a CORS
+        preflight for it, which this server never grants, so other web
+        pages cannot post to the daemon.
+        """
+        length = int(self.headers.get("Content-Length", 0))
+        if not length:
+            return {}
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            raise ValueError("Content-Type must be application/json")
+        try:
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError:
+            raise ValueError("Invalid JSON body")
+        if not isinstance(payload, dict):
+            raise ValueError("Body must be a JSON object")
+        return payload
+    
+    def _output_path(self, requested):
+        """Resolve a requested output folder; it must be inside the download root"""
+        root = os.path.realpath(self.server.output_path)
+        if not requested:
+            return root
+        path = os.path.realpath(os.path.join(root, str(requested)))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"output_dir must be inside {root}")
+        return path
+    
+    def _route(self):
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split("/") if part]
+        return parts, parse_qs(parsed.query)
+    
+    def do_GET(self):
+        parts, params = self._route()
+        if parts == ["health"]:
+            self._send_json(200, {'status': 'ok'})
+        elif parts == ["stats"]:
+            stats = {
+                'queues': self.manager.queue_stats(),
+                'breakers': self.manager.breakers.snapshot()
+            }
+            router = self.manager.engines.loaded("auto")
+            if router:
+                stats['routing'] = router.stats()
+            proxy_pool = get_proxy_pool(getattr(self.manager.engines, "settings", None))
+            if proxy_pool:
+                stats['proxies'] = proxy_pool.snapshot()
+            self._send_json(200, stats)
+        elif parts == ["metrics"]:
+            self._send_text(200, render_metrics(self.manager), METRICS_CONTENT_TYPE)
+        elif parts == ["catalog"]:
+            self._search_catalog(params)
+        elif len(parts) == 2 and parts[0] == "thumbnails":
+            self._send_thumbnail(parts[1])
+        elif parts == ["engines"]:
+            engines = self.manager.engines
+            self._send_json(200, {'engines': {
+                name: engines.capabilities(name).to_dict() for name in engines.names()
+            }})
+        elif parts == ["jobs"]:
+            status = params.get("status", [None])[0]
+            jobs = self.manager.list_jobs(status)
+            self._send_json(200, {'jobs': [job.to_dict() for job in jobs]})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.manager.get_job(parts[1])
+            if job:
+                self._send_json(200, job.to_dict())
+            else:
+                self._send_json(404, {'error': 'Job not found'})
+        elif parts == ["events"]:
+            self._stream_events(params.get("job", [None])[0])
+        else:
+            self._send_json(404, {'error': 'Not found'})
+    
+    def do_POST(self):
+        parts, _ = self._route()
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] in ("pause", "resume"):
+            action = self.manager.pause if parts[2] == "pause" else self.manager.resume
+            job = action(parts[1])
+            if job:
+                self._send_json(200, job.to_dict())
+            else:
+                self._send_json(404, {'error': 'Job not found'})
+            return
+        if parts != ["jobs"]:
+            self._send_json(404, {'error': 'Not found'})
+            return
+        
+        try:
+            payload = self._read_json()
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        
+        urls = payload.get("urls") or ([payload["url"]] if payload.get("url") else [])
+        if not isinstance(urls, list):
+            self._send_json(400, {'error': '"urls" must be a list'})
+            return
+        if payload.get("text") and not isinstance(payload["text"], str):
+            self._send_json(400, {'error': '"text" must be a string'})
+            return
+        if payload.get("text"):
+            # Pasted text: pull every link out of it
+            ingestor = URLIngestor(self.server.validator)
+            urls = list(urls) + list(ingestor.iter_urls(ingestor.lines_from_text(payload["text"])))
+        if not urls:
+            self._send_json(400, {'error': 'No URLs given'})
+            return
+        
+        # A single pasted link is someone waiting at the screen; lists are bulk work
+        priority = payload.get("priority") or (INTERACTIVE if len(urls) == 1 else BATCH)
+        engine = payload.get("engine")
+        # Check what applies to every item first, so a bad request queues nothing
+        if not isinstance(priority, str) or priority not in self.manager.priorities:
+            self._send_json(400, {'error': f'Unknown priority: {priority}'})
+            return
+        if engine and (not isinstance(engine, str) or engine not in self.manager.engines):
+            self._send_json(400, {'error': f'Unknown engine: {engine}'})
+            return
+        if payload.get("quality") and not isinstance(payload["quality"], str):
+            self._send_json(400, {'error': '"quality" must be a string'})
+            return
+        
+        try:
+            output_path = self._output_path(payload.get("output_dir"))
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        try:
+            os.makedirs(output_path, exist_ok=True)
+        except OSError as e:
+            self._send_json(400, {'error': f'Could not create output directory: {e}'})
+            return
+        
+        accepted, rejected = [], []
+        for item in urls:
+            # Items may carry size hints: {"url", "expected_size", "duration"}
+            hints = item if isinstance(item, dict) else {}
+            url = hints.get("url", item) if hints else item
+            url = self.server.validator.normalize_url(str(url).strip())
+            is_valid, message = self.server.validator.is_valid_tiktok_url(url)
+            if not is_valid:
+                rejected.append({'url': url, 'error': message})
+                continue
+            try:
+                job = self.manager.submit(
+                    url, output_path,
+                    engine=engine,
+                    quality=payload.get("quality") or "best",
+                    priority=priority,
+                    expected_size=size_hint(hints.get("expected_size"), "expected_size"),
+                    duration=size_hint(hints.get("duration"), "duration")
+                )
+            except ValueError as e:
+                rejected.append({'url': url, 'error': str(e)})
+                continue
+            accepted.append(job.to_dict())
+        
+        self._send_json(202 if accepted else 400, {'jobs': accepted, 'rejected': rejected})
+    
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self._send_json(404, {'error': 'Not found'})
+            return
+        job = self.manager.cancel(parts[1])
+        if job:
+            self._send_json(200, job.to_dict())
+        else:
+            self._send_json(404, {'error': 'Job not found'})
+    
+    def _search_catalog(self, params):
+        catalog = get_catalog(getattr(self.manager.engines, "settings", None))
+        if catalog is None:
+            self._send_json(404, {'error': 'The download catalog is turned off'})
+            return
+        param = lambda name, default=None: params.get(name, [default])[0]
+        try:
+            rows = catalog.search(
+                param("q"), param("author"), param("since"), param("until"),
+                param("by", "uploaded"), int(param("limit", 50)), int(param("offset", 0))
+            )
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(200, {'videos': rows, 'stats': catalog.stats()})
+    
+    def _send_thumbnail(self, video_id):
+        cache = get_thumbnail_cache(getattr(self.manager.engines, "settings", None))
+        path = cache.get(video_id) if cache else None
+        body = None
+        if path:
+            try:
+                with open(path, "rb") as f:
+                    body = f.read()
+            except OSError:
+                pass  # Evicted in the meantime
+        if body is None:
+            self._send_json(404, {'error': 'No thumbnail for this video'})
+            return
+        self._send_bytes(200, body, "image/jpeg")
+    
+    def _stream_events(self, job_id=None):
+        """Stream job events as server-sent events until the client leaves"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        
+        events = self.manager.subscribe()
+        try:
+            while not self.server.stopping:
+                try:
+                    event = events.get(timeout=15)
+                except queue.Empty:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+                if job_id and event['job']['id'] != job_id:
+                    continue
+                data = json.dumps(event['job'])
+                self.wfile.write(f"event: {event['type']}\ndata: {data}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.manager.unsubscribe(events)
+
+class DaemonServer(ThreadingHTTPServer):
+    """HTTP server that owns one warm job manager"""
+    
+    daemon_threads = True
+    
+    def __init__(self, address, manager, output_path):
+        super().__init__(address, DaemonRequestHandler)
+        self.manager = manager
+        self.output_path = output_path
+        self.validator = URLValidator()
+        self.stopping = False
+    
+    def shutdown(self):
+        self.stopping = True
+        super().shutdown()
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, max_workers=2):
+    """Run the daemon until interrupted"""
+    from utils.logger import Logger
+    logger = Logger()
+    settings = get_settings()
+    
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output_path = settings.get("last_output_dir") or os.path.join(base_dir, "Downloads")
+    
+    engines = create_engines(settings)
+    manager = JobManager(
+        engines,
+        max_workers=max_workers,
+        default_engine=settings.get("engine", "yt-dlp")
+    )
+    manager.start()
+    
+    server = DaemonServer((host, port), manager, output_path)
+    logger.info(f"Daemon listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stopping = True
+        server.server_close()
+        manager.shutdown()
+        for engine in engines.values():
+            if hasattr(engine, "shutdown"):
+                engine.shutdown()
+        settings.close()
+        logger.info("Daemon stopped")
\ No newline at end of file
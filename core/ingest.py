@@ -0,0 +1,119 @@
+"""
+Streaming URL ingestion for batch downloads
+Reads links lazily and feeds them to the job queue with backpressure
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import io
+import logging
+import re
+import sys
+
+from core.scheduler import BATCH
+from utils.validator import URLValidator
+
+# Anything that looks like a TikTok link inside a line of text
+URL_TOKEN = re.compile(r'(?:https?://)?(?:[\w-]+\.)*tiktok\.com/[^\s,;"\'<>]+', re.IGNORECASE)
+
+class URLIngestor:
+    """Turns files, stdin or pasted text into validated download jobs
+
+    Input is read one line at a time and each URL is submitted as soon as
+    it is parsed, so memory stays flat for any input size and the first
+    download starts immediately. When the job queue is bounded, submit()
+    blocks and reading pauses until a worker frees a slot.
+    """
+    
+    def __init__(self, validator=None):
+        self.validator = validator or URLValidator()
+        self.logger = logging.getLogger("HikariDownloader")
+        self.accepted = 0
+        self.rejected = 0
+    
+    def lines_from_file(self, path):
+        """Yield lines from a file, or from stdin when path is '-'"""
+        if path == "-":
+            for line in sys.stdin:
+                yield line
+            return
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                yield line
+    
+    def lines_from_text(self, text):
+        """Yield lines from pasted text without copying it"""
+        for line in io.StringIO(text):
+            yield line
+    
+    def iter_urls(self, lines):
+        """Yield normalized, valid TikTok URLs found in the given lines"""
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            for token in URL_TOKEN.findall(line):
+                url = self.validator.normalize_url(token.rstrip(").]"))
+                is_valid, message = self.validator.is_valid_tiktok_url(url)
+                if is_valid:
+                    self.accepted += 1
+                    yield url
+                else:
+                    self.rejected += 1
+                    self.logger.debug(f"Skipping {url}: {message}")
+    
+    def feed(self, urls, manager, output_path, engine=None, quality="best"):
+        """Submit URLs one by one; blocks while the manager's queue is full"""
+        jobs = 0
+        for url in urls:
+            manager.submit(url, output_path, engine, quality, priority=BATCH)
+            jobs += 1
+        return jobs
+
+def run_batch(source, output_path, max_workers=2, engine=None, quality="best"):
+    """Download every URL in a file (or stdin with '-') without the GUI"""
+    from core.jobs import JobManager
+    from engines import create_engines
+    from utils.settings import get_settings
+    
+    settings = get_settings()
+    engines = create_engines(settings)
+    manager = JobManager(
+        engines,
+        max_workers=max_workers,
+        default_engine=engine or settings.get("engine", "yt-dlp"),
+        max_pending=max_workers * 4
+    )
+    ingestor = URLIngestor()
+    manager.start()
+    try:
+        ingestor.feed(ingestor.iter_urls(ingestor.lines_from_file(source)), manager, output_path, quality=quality)
+        manager.wait_idle()
+    finally:
+        manager.shutdown()
+        for instance in engines.values():
+            if hasattr(instance, "shutdown"):
+                instance.shutdown()
+    return ingestor.accepted, ingestor.rejected
@@ -0,0 +1,589 @@
+"""
+Job queue for Hikari TikTok Downloader
+Runs download jobs on a pool of worker threads and publishes progress events
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import asyncio
+import collections
+import contextlib
+import inspect
+import logging
+import queue
+import threading
+import os
+import time
+import uuid
+
+from core.scheduler import JobScheduler, BATCH, size_hint
+from engines.formats import FormatPreference, estimate_size, rank_formats
+from utils.cancellation import CancelToken, DownloadCancelled, DownloadPaused
+from utils.circuit_breaker import BreakerBoard, job_keys
+from utils.profiler import get_profiler
+from utils.validator import URLValidator
+
+class Job:
+    """A single download request and its current state"""
+    
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    PAUSED = "paused"
+    
+    FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+    
+    def __init__(self, url, engine, quality, output_path, priority=BATCH, expected_size=None, duration=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.engine = engine
+        self.quality = quality
+        self.output_path = output_path
+        self.priority = priority
+        # Size hints for shortest-job-first scheduling, when known up front
+        self.expected_size = expected_size
+        self.duration = duration
+        self.status = self.QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.cancel_requested = False
+        self.token = CancelToken()
+        # Transfer this job shares with duplicate submissions
+        self.flight = None
+        self.created_at = time.time()
+        self.queued_at = self.created_at
+        self.started_at = None
+        self.finished_at = None
+    
+    @property
+    def finished(self):
+        return self.status in self.FINISHED_STATES
+    
+    def to_dict(self):
+        """Get a JSON-serializable snapshot of the job"""
+        lead = self.flight.lead if self.flight and self.flight.jobs else None
+        return {
+            'id': self.id,
+            'url': self.url,
+            'engine': self.engine,
+            'quality': self.quality,
+            'output_path': self.output_path,
+            'priority': self.priority,
+            'expected_size': self.expected_size,
+            'status': self.status,
+            'progress': round(self.progress, 2),
+            'message': self.message,
+            'cancel_requested': self.cancel_requested,
+            'coalesced_with': lead.id if lead and lead is not self else None,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+class Flight:
+    """Jobs for the same video, format and folder that share one transfer
+    
+    The first attached job is the one queued and run; the others mirror
+    its progress and result. All of them share its cancel token.
+    """
+    
+    def __init__(self, key, job):
+        self.key = key
+        self.token = job.token
+        self.jobs = [job]
+        job.flight = self
+    
+    @property
+    def lead(self):
+        return self.jobs[0]
+
+class JobManager:
+    """Queues jobs and runs them with the shared download engines"""
+    
+    def __init__(self, engines, max_workers=2, default_engine="yt-dlp",
+                 max_pending=0, history_limit=1000, breakers=None, profiler=None):
+        self.engines = engines
+        self.max_workers = max_workers
+        self.default_engine = default_engine
+        self.history_limit = history_limit
+        self.logger = logging.getLogger("HikariDownloader")
+        self.validator = URLValidator()
+        # Shared with the engines so the auto router sees the same breakers
+        self.breakers = breakers or getattr(engines, "breakers", None) or BreakerBoard()
+        # Samples whole jobs with cProfile/tracemalloc when profiling is on
+        self.profiler = profiler or get_profiler(getattr(engines, "settings", None))
+        
+        self._jobs = {}
+        self._finished = collections.deque()
+        # In-flight transfers by (video ID, quality, output folder)
+        self._inflight = {}
+        # A bounded queue makes submit() block while every worker is busy
+        self._queue = JobScheduler(max_pending=max_pending)
+        self._lock = threading.Lock()
+        # Per priority class: [jobs started, total queue wait, longest wait]
+        self._waits = {name: [0, 0.0, 0.0] for name in self._queue.class_delays}
+        self._subscribers = []
+        self._workers = []
+        self._running = False
+    
+    @property
+    def priorities(self):
+        """Priority classes jobs can be submitted with"""
+        return self._queue.priorities
+    
+    def start(self):
+        """Start the worker threads"""
+        if self._running:
+            return
+        self._running = True
+        for index in range(self.max_workers):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"hikari-worker-{index}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+    
+    def shutdown(self, wait=False):
+        """Stop the workers once they finish their current job"""
+        self._running = False
+        self._queue.close()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        self._workers = []
+    
+    def submit(self, url, output_path, engine=None, quality="best", priority=BATCH,
+               expected_size=None, duration=None):
+        """Queue a single URL for download, waiting if the queue is full
+        
+        A duplicate of a transfer that is still queued or running is
+        attached to it instead of downloading the same file again.
+        """
+        engine = engine or self.default_engine
+        if engine not in self.engines:
+            raise ValueError(f"Unknown engine: {engine}")
+        if not isinstance(priority, str) or priority not in self._queue.class_delays:
+            raise ValueError(f"Unknown priority: {priority}")
+        expected_size = size_hint(expected_size, "expected_size")
+        duration = size_hint(duration, "duration")
+        
+        job = Job(url, engine, quality, output_path, priority, expected_size, duration)
+        key = self._coalesce_key(url, quality, output_path)
+        with self._lock:
+            self._jobs[job.id] = job
+            flight = self._inflight.get(key) if key else None
+            if flight:
+                enqueue = self._attach(flight, job)
+            else:
+                flight = Flight(key, job)
+                if key:
+                    self._inflight[key] = flight
+                enqueue = True
+        
+        if flight.lead is not job:
+            self.logger.info(f"Job {job.id}: attached to in-flight job {flight.lead.id}")
+        # A re-queued transfer changed its other jobs too
+        for member in (list(flight.jobs) if enqueue else [job]):
+            self._publish(member.status, member)
+        if enqueue:
+            try:
+                self._enqueue(flight.lead)
+            except Exception:
+                # Never leave a job that is not queued for later duplicates to attach to
+                with self._lock:
+                    self._jobs.pop(job.id, None)
+                    flight.jobs.remove(job)
+                    if not flight.jobs and self._inflight.get(key) is flight:
+                        del self._inflight[key]
+                raise
+        return job
+    
+    def submit_many(self, urls, output_path, engine=None, quality="best", priority=BATCH):
+        """Queue several URLs for download"""
+        return [self.submit(url, output_path, engine, quality, priority) for url in urls]
+    
+    def _coalesce_key(self, url, quality, output_path):
+        """Key under which identical requests share a transfer"""
+        video_id = self.validator.extract_video_id(url)
+        if not video_id:
+            return None
+        return (video_id, quality, os.path.abspath(output_path))
+    
+    def _attach(self, flight, job):
+        """Join a job to an existing transfer; True if the lead must be re-queued"""
+        lead = flight.lead
+        job.flight = flight
+        job.token = flight.token
+        job.status = lead.status
+        job.progress = lead.progress
+        job.started_at = lead.started_at
+        flight.jobs.append(job)
+        
+        # Someone asked for the video again, so a paused transfer continues
+        if flight.token.paused:
+            flight.token.resume()
+            if lead.status == Job.PAUSED:
+                for member in flight.jobs:
+                    member.status = Job.QUEUED
+                    member.message = ""
+                lead.queued_at = time.time()
+                lead.priority = min((lead.priority, job.priority), key=self._queue.class_delays.get)
+                return True
+        
+        # A more urgent duplicate pulls the shared transfer forward
+        delays = self._queue.class_delays
+        if lead.status == Job.QUEUED and delays[job.priority] < delays[lead.priority]:
+            lead.priority = job.priority
+            return True
+        return False
+    
+    def _fill_size_hint(self, job):
+        """Use a size an engine already knows (e.g. from a prefetch) when none was given"""
+        if job.expected_size or job.duration:
+            return
+        video_id = self.validator.extract_video_id(job.url)
+        if not video_id:
+            return
+        for engine in list(self.engines.values()):
+            cache = getattr(engine, "format_cache", None)
+            formats = cache.get(video_id) if cache else None
+            if not formats:
+                continue
+            # Size of the format this quality would pick: filesize / content-length, or bitrate
+            ranked = rank_formats(formats, FormatPreference.parse(job.quality))
+            size = estimate_size(ranked[0]) if ranked else None
+            if size:
+                job.expected_size = size
+                return
+    
+    def _enqueue(self, job):
+        """Hand a queued job to the scheduler"""
+        self._fill_size_hint(job)
+        self._queue.put(job.id, job.priority, job.expected_size, job.duration, job.queued_at)
+    
+    def get_job(self, job_id):
+        """Get a job by ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def list_jobs(self, status=None):
+        """List jobs in submission order, optionally filtered by status"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if status:
+            jobs = [job for job in jobs if job.status == status]
+        return sorted(jobs, key=lambda job: job.created_at)
+    
+    def cancel(self, job_id):
+        """Cancel a job; running jobs stop at the next chunk
+        
+        A job that shares its transfer with other jobs is only detached;
+        the transfer stops when the last job attached to it is cancelled.
+        """
+        requeue = None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job.finished:
+                return job
+            job.cancel_requested = True
+            flight = job.flight
+            if len(flight.jobs) > 1:
+                was_lead = flight.lead is job
+                flight.jobs.remove(job)
+                self._mark_finished(job, Job.CANCELLED, "Cancelled")
+                if was_lead and flight.lead.status == Job.QUEUED:
+                    requeue = flight.lead
+            else:
+                job.token.cancel()
+                if job.status in (Job.QUEUED, Job.PAUSED):
+                    if job.status == Job.PAUSED:
+                        self._remove_partial(job)
+                    self._end_flight(flight)
+                    self._mark_finished(job, Job.CANCELLED, "Cancelled")
+        
+        if requeue:
+            self._enqueue(requeue)
+        self._publish("cancelled" if job.finished else "cancel_requested", job)
+        return job
+    
+    def pause(self, job_id):
+        """Pause a job; a running one frees its worker and keeps its .part file"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job.status not in (Job.QUEUED, Job.RUNNING):
+                return job
+            job.token.pause()
+            members = list(job.flight.jobs) if job.status == Job.QUEUED else []
+            for member in members:
+                member.status = Job.PAUSED
+                member.message = "Paused"
+        for member in members:
+            self._publish("paused", member)
+        return job
+    
+    def resume(self, job_id):
+        """Put a paused job back in the queue; it continues from its .part file"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job.status != Job.PAUSED:
+                return job
+            job.token.resume()
+            members = list(job.flight.jobs)
+            for member in members:
+                member.status = Job.QUEUED
+                member.message = ""
+            lead = job.flight.lead
+            lead.queued_at = time.time()
+        for member in members:
+            self._publish("queued", member)
+        self._enqueue(lead)
+        return job
+    
+    def _remove_partial(self, job):
+        """Delete the partial download left behind by a paused job"""
+        path = job.token.partial_path
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _end_flight(self, flight):
+        """Stop matching new submissions against a finished transfer"""
+        if flight.key and self._inflight.get(flight.key) is flight:
+            del self._inflight[flight.key]
+    
+    def _mark_finished(self, job, status, message):
+        """Record the final state of a job"""
+        job.status = status
+        job.message = message
+        job.finished_at = time.time()
+        if status == Job.COMPLETED:
+            job.progress = 100.0
+        self._remember_finished(job)
+    
+    def wait_idle(self, poll_interval=0.2):
+        """Block until no job is queued or running (paused jobs don't count)"""
+        while True:
+            with self._lock:
+                busy = any(job.status in (Job.QUEUED, Job.RUNNING) for job in self._jobs.values())
+            if not busy:
+                return
+            time.sleep(poll_interval)
+    
+    def queue_stats(self):
+        """Queue depth and mean/max queue wait per priority class"""
+        queued = self._queue.queued_by_class()
+        with self._lock:
+            return {
+                name: {
+                    'queued': queued.get(name, 0),
+                    'started': count,
+                    'mean_wait': round(total / count, 3) if count else 0.0,
+                    'max_wait': round(longest, 3)
+                }
+                for name, (count, total, longest) in self._waits.items()
+            }
+    
+    def _remember_finished(self, job):
+        """Keep only the most recent finished jobs so memory stays bounded"""
+        self._finished.append(job.id)
+        while self.history_limit and len(self._finished) > self.history_limit:
+            self._jobs.pop(self._finished.popleft(), None)
+    
+    def subscribe(self, max_events=1000):
+        """Get a queue that receives progress events"""
+        events = queue.Queue(maxsize=max_events)
+        with self._lock:
+            self._subscribers.append(events)
+        return events
+    
+    def unsubscribe(self, events):
+        """Stop delivering events to a subscriber queue"""
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+    
+    def _publish(self, event_type, job):
+        """Send an event to every subscriber"""
+        event = {'type': event_type, 'job': job.to_dict()}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                pass  # Slow consumers miss intermediate events
+    
+    def _worker_loop(self):
+        """Pull jobs off the queue until shutdown"""
+        while self._running:
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            # A resumed job can be in the queue twice, so claim it under the lock
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if not job or job.status != Job.QUEUED or job.flight.lead is not job:
+                    continue
+                # The media host is only known once a run has started (a resumed job)
+                keys = job_keys(job.engine, job.flight.token.media_url)
+                hold = self.breakers.acquire(keys)
+                if hold:
+                    # Keep the job queued (with its place by age) instead of
+                    # spending a worker on an engine or host that keeps failing
+                    job.message = f"Waiting {hold:.0f}s for a failing service to recover"
+                    self._fill_size_hint(job)
+                    self._queue.put(job.id, job.priority, job.expected_size, job.duration,
+                                    job.queued_at, not_before=time.time() + hold)
+                    continue
+                started_at = time.time()
+                for member in job.flight.jobs:
+                    member.status = Job.RUNNING
+                    member.started_at = started_at
+                waits = self._waits[job.priority]
+                wait = started_at - job.queued_at
+                waits[0] += 1
+                waits[1] += wait
+                waits[2] = max(waits[2], wait)
+            if self._canonicalize(job.flight):
+                self._run_job(job, keys)
+            else:
+                self.breakers.release(keys)
+    
+    def _canonicalize(self, flight):
+        """Re-key a flight submitted as a short link by the video it points to
+        
+        Returns False when the flight was merged into a matching transfer
+        that is already queued or running, so it must not run itself.
+        """
+        if not flight.key or flight.key[0].isdigit():
+            return True
+        try:
+            video_id = self.validator.extract_video_id(self.validator.resolve_url(flight.lead.url))
+        except Exception:
+            return True  # The engine reports unreachable links
+        if not video_id or not video_id.isdigit():
+            return True
+        
+        key = (video_id,) + flight.key[1:]
+        with self._lock:
+            self._end_flight(flight)
+            target = self._inflight.get(key)
+            if target is None:
+                flight.key = key
+                self._inflight[key] = flight
+                return True
+            members, flight.jobs = flight.jobs, []
+            enqueue = False
+            for member in members:
+                enqueue = self._attach(target, member) or enqueue
+        
+        self.logger.info(f"Job {members[0].id}: short link merged into in-flight job {target.lead.id}")
+        for member in members:
+            self._publish(member.status, member)
+        if enqueue:
+            self._enqueue(target.lead)
+        return False
+    
+    def _engine_slot(self, name):
+        """Context manager that enforces an engine's declared concurrency limit"""
+        slot = getattr(self.engines, "slot", None)
+        if slot is None:
+            return contextlib.nullcontext()
+        return slot(name)
+    
+    def _run_job(self, job, keys=()):
+        """Run one job with its engine, for every job attached to its transfer"""
+        flight = job.flight
+        for member in list(flight.jobs):
+            self._publish("started", member)
+        self.logger.info(f"Job {job.id}: downloading {job.url} with {job.engine}")
+        started = time.monotonic()
+        first_byte = []
+        
+        def progress_callback(percent):
+            if not first_byte:
+                first_byte.append(time.monotonic() - started)
+            for member in list(flight.jobs):
+                member.progress = percent
+                self._publish("progress", member)
+        
+        def status_callback(status):
+            for member in list(flight.jobs):
+                member.message = status
+        
+        try:
+            engine = self.engines[job.engine]
+            with self._engine_slot(job.engine), self.profiler.profile(f"{job.id}-{job.url}", "job"):
+                result = engine.download(
+                    job.url, job.output_path, job.quality,
+                    progress_callback, status_callback,
+                    cancel_token=flight.token
+                )
+                if inspect.isawaitable(result):
+                    result = asyncio.run(result)  # Async engines get a loop per job
+            success, message = result
+            status = Job.COMPLETED if success else Job.FAILED
+        except DownloadPaused:
+            self.breakers.release(keys)
+            with self._lock:
+                members = list(flight.jobs)
+                for member in members:
+                    member.status = Job.PAUSED
+                    member.message = "Paused"
+            self.logger.info(f"Job {job.id}: paused")
+            for member in members:
+                self._publish("paused", member)
+            return
+        except DownloadCancelled:
+            status, message = Job.CANCELLED, "Cancelled"
+        except Exception as e:
+            status, message = Job.FAILED, f"Download failed: {str(e)}"
+        
+        if status == Job.CANCELLED:
+            self.breakers.release(keys)
+        else:
+            self.breakers.finish(keys, job_keys(job.engine, flight.token.media_url),
+                                 status == Job.COMPLETED, first_byte[0] if first_byte else None)
+        
+        with self._lock:
+            self._end_flight(flight)
+            members = list(flight.jobs)
+            for member in members:
+                self._mark_finished(member, status, message)
+        
+        if status == Job.COMPLETED:
+            self.logger.info(f"Job {job.id}: completed")
+        elif status == Job.CANCELLED:
+            self.logger.info(f"Job {job.id}: cancelled")
+        else:
+            self.logger.error(f"Job {job.id}: {message}")
+        for member in members:
+            self._publish(member.status, member)
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Metrics export for Hikari TikTok Downloader
+Renders daemon state in the Prometheus text exposition format
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import collections
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from utils.proxy_pool import get_proxy_pool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Numeric breaker states, so dashboards can alert on "> 0"
+BREAKER_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class _Writer:
+    """Collects samples and writes each metric's lines together under one HELP/TYPE"""
+    
+    def __init__(self):
+        self._metrics = {}
+    
+    def sample(self, name, value, help_text, metric_type="gauge", **labels):
+        if value is None:
+            return
+        metric = self._metrics.setdefault(name, (help_text, metric_type, []))
+        label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        metric[2].append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    
+    def render(self):
+        lines = []
+        for name, (help_text, metric_type, samples) in self._metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+def render_metrics(manager):
+    """Queue, job, circuit breaker and routing metrics of a JobManager"""
+    out = _Writer()
+    
+    for name, stats in manager.queue_stats().items():
+        out.sample("hikari_queue_depth", stats['queued'], "Jobs waiting in the queue", priority=name)
+        out.sample("hikari_jobs_started_total", stats['started'], "Jobs taken off the queue",
+                   "counter", priority=name)
+        out.sample("hikari_queue_wait_seconds_mean", stats['mean_wait'], "Mean queue wait", priority=name)
+        out.sample("hikari_queue_wait_seconds_max", stats['max_wait'], "Longest queue wait", priority=name)
+    
+    statuses = collections.Counter(job.status for job in manager.list_jobs())
+    for status, count in sorted(statuses.items()):
+        out.sample("hikari_jobs", count, "Known jobs by status", status=status)
+    
+    for key, breaker in manager.breakers.snapshot().items():
+        out.sample("hikari_circuit_state", BREAKER_STATE_VALUES[breaker['state']],
+                   "Circuit breaker state (0 closed, 1 half-open, 2 open)", breaker=key)
+        out.sample("hikari_circuit_error_rate", breaker['error_rate'],
+                   "Error rate in the breaker's rolling window", breaker=key)
+        out.sample("hikari_circuit_opened_total", breaker['times_opened'],
+                   "Times the breaker has opened", "counter", breaker=key)
+    
+    proxy_pool = get_proxy_pool(getattr(manager.engines, "settings", None))
+    if proxy_pool:
+        for proxy in proxy_pool.snapshot():
+            out.sample("hikari_proxy_healthy", int(proxy['healthy']), "Proxy passed its last health check",
+                       proxy=proxy['url'])
+            out.sample("hikari_proxy_active_transfers", proxy['active'], "Transfers using the proxy",
+                       proxy=proxy['url'])
+            out.sample("hikari_proxy_latency_seconds", proxy['latency'], "Smoothed probe latency",
+                       proxy=proxy['url'])
+    
+    router = manager.engines.loaded("auto") if hasattr(manager.engines, "loaded") else None
+    if router:
+        for engine, stats in router.stats().items():
+            out.sample("hikari_engine_success_rate", stats['success_rate'],
+                       "Recent success rate seen by the auto router", engine=engine)
+            out.sample("hikari_engine_ttfb_seconds", stats['ttfb'],
+                       "Mean time to first byte", engine=engine)
+            out.sample("hikari_engine_throughput_mb_s", stats['throughput_mb_s'],
+                       "Mean download throughput", engine=engine)
+    
+    return out.render()
+
+def render_cluster_metrics(coordinator):
+    """Job, queue and per-worker metrics of a cluster Coordinator"""
+    out = _Writer()
+    
+    stats = coordinator.stats()
+    out.sample("hikari_cluster_queue_depth", stats['queued'], "Jobs waiting for a worker")
+    out.sample("hikari_cluster_archived", stats['archived'], "Video IDs in the download archive")
+    for status, count in sorted(stats['jobs'].items()):
+        out.sample("hikari_cluster_jobs", count, "Known jobs by status", status=status)
+    
+    for worker_id, worker in sorted(coordinator.workers().items()):
+        out.sample("hikari_worker_up", int(worker['alive']), "Worker was seen within one lease period",
+                   worker=worker_id)
+        out.sample("hikari_worker_active_leases", worker['active'], "Jobs leased to the worker",
+                   worker=worker_id)
+        for key, help_text in (("completed", "Jobs the worker completed"),
+                               ("failed", "Failed attempts reported by the worker"),
+                               ("expired", "Leases the worker let expire")):
+            out.sample(f"hikari_worker_jobs_{key}_total", worker[key], help_text, "counter", worker=worker_id)
+        reported = worker['metrics']
+        out.sample("hikari_worker_downloaded_bytes_total", reported.get('bytes'),
+                   "Bytes the worker has downloaded", "counter", worker=worker_id)
+        out.sample("hikari_worker_download_seconds_total", reported.get('seconds'),
+                   "Time the worker has spent downloading", "counter", worker=worker_id)
+        out.sample("hikari_worker_load", reported.get('load'), "One-minute load average of the worker's host",
+                   worker=worker_id)
+    
+    return out.render()
\ No newline at end of file
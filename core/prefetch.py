@@ -0,0 +1,107 @@
+"""
+Speculative metadata prefetch
+Starts extraction and CDN warm-up as soon as a valid URL is detected
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class Prefetcher:
+    """Runs engine.prepare() in the background for the URL being typed
+
+    Only the most recent URL is kept. Starting a new prefetch (or calling
+    cancel) discards the previous one; a prepare() call already in flight
+    finishes in the background but its result is thrown away.
+    """
+    
+    def __init__(self, max_age=300, max_workers=2):
+        self.max_age = max_age
+        self.logger = logging.getLogger("HikariDownloader")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hikari-prefetch")
+        self._lock = threading.Lock()
+        self._key = None
+        self._future = None
+    
+    def start(self, url, engine_name, engine, quality="best"):
+        """Prefetch metadata for url unless it is already being prefetched"""
+        if not hasattr(engine, "prepare"):
+            return
+        key = (url, engine_name, quality)
+        with self._lock:
+            if self._key == key and self._future is not None:
+                return
+            self._discard()
+            self._key = key
+            self._future = self._executor.submit(self._prepare, engine, url, quality)
+    
+    def _prepare(self, engine, url, quality):
+        started = time.perf_counter()
+        try:
+            prepared = engine.prepare(url, quality)
+            self.logger.debug(f"Prefetched {url} in {time.perf_counter() - started:.2f}s")
+            return prepared
+        except Exception as e:
+            self.logger.debug(f"Prefetch failed for {url}: {e}")
+            return None
+    
+    def cancel(self):
+        """Forget the current prefetch, e.g. because the URL text changed"""
+        with self._lock:
+            self._discard()
+    
+    def _discard(self):
+        if self._future is not None:
+            self._future.cancel()  # Only stops it if it hasn't started yet
+        self._key = None
+        self._future = None
+    
+    def take(self, url, engine_name, quality="best", timeout=None):
+        """Hand over the prefetched result if it matches this download
+
+        If the prefetch is still running the caller waits for it rather
+        than starting the same extraction a second time.
+        """
+        with self._lock:
+            if self._key != (url, engine_name, quality) or self._future is None:
+                return None
+            future = self._future
+            self._key = None
+            self._future = None
+        
+        try:
+            prepared = future.result(timeout=timeout)
+        except Exception:
+            return None
+        if not prepared or time.time() - prepared.get('created_at', 0) > self.max_age:
+            return None  # CDN links expire; fall back to a fresh extraction
+        return prepared
+    
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
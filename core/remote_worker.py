@@ -0,0 +1,258 @@
+"""
+Remote worker for Hikari TikTok Downloader
+Headless worker that leases jobs from a coordinator and runs them with the local engines
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import asyncio
+import contextlib
+import inspect
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+import requests
+
+from utils.cancellation import CancelToken, DownloadCancelled, DownloadPaused
+from utils.profiler import get_profiler
+from utils.validator import URLValidator
+
+# Extensions a finished download may have, to measure its size
+_OUTPUT_EXTENSIONS = (".mp4", ".m4a", ".webm", ".mp3", ".mkv")
+
+class RemoteWorker:
+    """Leases jobs from a coordinator and downloads them
+    
+    Each of ``slots`` threads long-polls /lease for one job at a time, so
+    a worker never holds more jobs than it can run. A heartbeat thread
+    extends every running lease (and reports progress and metrics) at a
+    third of the lease period; if the coordinator says a lease was lost,
+    the job is cancelled here because another worker now owns it.
+    """
+    
+    def __init__(self, coordinator_url, engines, output_path, slots=2, worker_id=None,
+                 default_engine="yt-dlp", poll_seconds=20):
+        self.coordinator_url = coordinator_url.rstrip("/")
+        self.engines = engines
+        self.output_path = output_path
+        self.slots = max(1, slots)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+        self.default_engine = default_engine
+        self.poll_seconds = poll_seconds
+        self.validator = URLValidator()
+        self.profiler = get_profiler(getattr(engines, "settings", None))
+        self.logger = logging.getLogger("HikariDownloader")
+        
+        self.lease_seconds = 60
+        self._session = requests.Session()
+        self._running = {}  # lease ID -> [job, token, progress]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._totals = {'completed': 0, 'failed': 0, 'bytes': 0, 'seconds': 0.0}
+    
+    def _post(self, path, payload, timeout=10):
+        payload = dict(payload, worker=self.worker_id)
+        response = self._session.post(f"{self.coordinator_url}{path}", json=payload, timeout=timeout)
+        if response.status_code >= 500:
+            response.raise_for_status()
+        return response.json()
+    
+    def start(self):
+        for index in range(self.slots):
+            thread = threading.Thread(target=self._lease_loop, name=f"hikari-remote-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="hikari-remote-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        self.logger.info(f"Worker {self.worker_id} polling {self.coordinator_url} with {self.slots} slots")
+    
+    def shutdown(self):
+        """Stop leasing and cancel running jobs; their leases expire and are reassigned"""
+        self._stop.set()
+        with self._lock:
+            for _, token, _ in self._running.values():
+                token.cancel()
+    
+    def wait(self):
+        for thread in self._threads:
+            thread.join()
+    
+    def metrics(self):
+        """Counters reported to the coordinator with every heartbeat"""
+        with self._lock:
+            metrics = dict(self._totals, active=len(self._running), slots=self.slots)
+        if hasattr(os, "getloadavg"):
+            metrics['load'] = round(os.getloadavg()[0], 2)
+        return metrics
+    
+    def _lease_loop(self):
+        while not self._stop.is_set():
+            try:
+                reply = self._post("/lease", {'max_jobs': 1, 'wait': self.poll_seconds},
+                                   timeout=self.poll_seconds + 10)
+            except (requests.RequestException, ValueError) as e:
+                self.logger.warning(f"Worker {self.worker_id}: coordinator unreachable ({e})")
+                self._stop.wait(2.0)
+                continue
+            self.lease_seconds = reply.get('lease_seconds', self.lease_seconds)
+            for job in reply.get('jobs', []):
+                self._run(job)
+    
+    def _heartbeat_loop(self):
+        while not self._stop.wait(max(1.0, self.lease_seconds / 3)):
+            with self._lock:
+                leases = [{'lease_id': lease_id, 'progress': state[2]} for lease_id, state in self._running.items()]
+            try:
+                reply = self._post("/heartbeat", {'leases': leases, 'metrics': self.metrics()})
+            except (requests.RequestException, ValueError) as e:
+                self.logger.warning(f"Worker {self.worker_id}: heartbeat failed ({e})")
+                continue
+            with self._lock:
+                for lease_id in reply.get('lost', []):
+                    state = self._running.get(lease_id)
+                    if state:
+                        self.logger.warning(f"Job {state[0]['id']}: lease lost, cancelling")
+                        state[1].cancel()
+    
+    def _is_duplicate(self, job):
+        """Resolve a short link and ask the coordinator whether its video is already handled"""
+        if job['video_id'].isdigit():
+            return False
+        try:
+            video_id = self.validator.extract_video_id(self.validator.resolve_url(job['url']))
+        except Exception:
+            return False  # The engine reports unreachable links
+        if not video_id or not video_id.isdigit():
+            return False
+        try:
+            reply = self._post("/resolve", {'lease_id': job['lease_id'], 'video_id': video_id})
+        except (requests.RequestException, ValueError):
+            return False
+        return bool(reply.get('duplicate'))
+    
+    def _engine_slot(self, name):
+        slot = getattr(self.engines, "slot", None)
+        return slot(name) if slot else contextlib.nullcontext()
+    
+    def _run(self, job):
+        lease_id = job['lease_id']
+        if self._is_duplicate(job):
+            self.logger.info(f"Job {job['id']}: short link points to a video that is already handled")
+            return
+        
+        token = CancelToken()
+        state = [job, token, 0.0]
+        with self._lock:
+            self._running[lease_id] = state
+        
+        def progress_callback(percent):
+            state[2] = percent
+        
+        def status_callback(status):
+            pass
+        
+        engine_name = job.get('engine') or self.default_engine
+        self.logger.info(f"Job {job['id']}: downloading {job['url']} with {engine_name}")
+        started = time.monotonic()
+        try:
+            engine = self.engines[engine_name]
+            with self._engine_slot(engine_name), self.profiler.profile(f"{job['id']}-{job['url']}", "job"):
+                result = engine.download(
+                    job['url'], self.output_path, job.get('quality') or "best",
+                    progress_callback, status_callback,
+                    cancel_token=token
+                )
+                if inspect.isawaitable(result):
+                    result = asyncio.run(result)
+            success, message = result
+        except (DownloadCancelled, DownloadPaused):
+            success, message = False, "Cancelled"
+        except Exception as e:
+            success, message = False, f"Download failed: {str(e)}"
+        seconds = time.monotonic() - started
+        size = self._output_size(token) if success else None
+        
+        with self._lock:
+            del self._running[lease_id]
+            self._totals['completed' if success else 'failed'] += 1
+            self._totals['seconds'] = round(self._totals['seconds'] + seconds, 3)
+            self._totals['bytes'] += size or 0
+        if token.cancelled:
+            return  # The lease is gone; the new holder reports the result
+        
+        if success:
+            self.logger.info(f"Job {job['id']}: completed")
+        else:
+            self.logger.error(f"Job {job['id']}: {message}")
+        try:
+            self._post("/complete", {
+                'lease_id': lease_id,
+                'success': success,
+                'message': message,
+                'metrics': {'seconds': round(seconds, 3), 'bytes': size}
+            })
+        except (requests.RequestException, ValueError) as e:
+            # The lease will expire and the job runs again elsewhere
+            self.logger.warning(f"Job {job['id']}: could not report result ({e})")
+    
+    @staticmethod
+    def _output_size(token):
+        if not token.reserved_path:
+            return None
+        for ext in _OUTPUT_EXTENSIONS:
+            try:
+                return os.path.getsize(token.reserved_path + ext)
+            except OSError:
+                continue
+        return None
+
+def run_worker(coordinator_url, output_path, slots=2, engine=None, worker_id=None):
+    """Run a headless worker until interrupted"""
+    from engines import create_engines
+    from utils.settings import get_settings
+    
+    settings = get_settings()
+    engines = create_engines(settings)
+    worker = RemoteWorker(
+        coordinator_url, engines, output_path, slots, worker_id,
+        default_engine=engine or settings.get("engine", "yt-dlp")
+    )
+    worker.start()
+    try:
+        while not worker._stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.shutdown()
+        for instance in engines.values():
+            if hasattr(instance, "shutdown"):
+                instance.shutdown()
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Job scheduler for Hikari TikTok Downloader
+Priority classes, shortest-job-first ordering and aging for queued jobs
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+
+# How many seconds later than its real submit time a job of each class is
+# treated as queued. A bulk job that has already waited longer than the
+# gap still runs before a newer interactive one, so nothing starves.
+CLASS_DELAYS = {
+    INTERACTIVE: 0.0,
+    BATCH: 120.0,
+    BACKGROUND: 900.0
+}
+PRIORITIES = tuple(CLASS_DELAYS)
+
+# Used to turn sizes and durations into expected transfer seconds
+ASSUMED_THROUGHPUT = 2 * 1024 * 1024  # bytes per second
+ASSUMED_BITRATE = 1.5 * 1024 * 1024 / 8  # bytes per second of video
+DEFAULT_SIZE = 8 * 1024 * 1024  # jobs of unknown size
+
+def size_hint(value, name="hint"):
+    """A size or duration hint as a non-negative float, None when not given
+    
+    Raises ValueError for anything else, so a bad hint is refused before
+    the job is registered rather than failing inside the queue.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{name} must be a number")
+    try:
+        hint = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number") from None
+    if not math.isfinite(hint) or hint < 0:
+        raise ValueError(f"{name} must be a non-negative number")
+    return hint
+
+def expected_seconds(expected_size=None, duration=None):
+    """Rough transfer time of a job from its known size or duration"""
+    if expected_size:
+        size = expected_size
+    elif duration:
+        size = duration * ASSUMED_BITRATE
+    else:
+        size = DEFAULT_SIZE
+    return size / ASSUMED_THROUGHPUT
+
+class JobScheduler:
+    """Blocking priority queue of job IDs
+    
+    Jobs are ordered by queue time plus their class delay plus their
+    expected transfer time. Every job ages at the same rate, so the key is
+    fixed when the job is queued: within a class short jobs go first, and a
+    long or low-priority job moves up simply by waiting. The size term is
+    capped below half the smallest gap between classes, so a huge job never
+    falls behind a lower class queued at the same time.
+    
+    A job put back with ``not_before`` (e.g. while a circuit breaker is
+    open) is held aside until that time, then competes with its original key.
+    """
+    
+    def __init__(self, max_pending=0, class_delays=None):
+        self.max_pending = max_pending
+        self.class_delays = dict(CLASS_DELAYS)
+        if class_delays:
+            self.class_delays.update(class_delays)
+        delays = sorted(set(self.class_delays.values()))
+        gaps = [b - a for a, b in zip(delays, delays[1:])]
+        self.max_size_seconds = min(gaps) / 2 if gaps else float('inf')
+        
+        self._heap = []
+        # (not_before, counter, heap entry) for held jobs
+        self._deferred = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+    
+    @property
+    def priorities(self):
+        """Names of the priority classes this queue accepts"""
+        return tuple(self.class_delays)
+    
+    def put(self, job_id, priority=BATCH, expected_size=None, duration=None, queued_at=None,
+            not_before=None):
+        """Queue a job, waiting while max_pending jobs are already queued
+        
+        Jobs held until ``not_before`` were already admitted once, so they
+        never wait for room.
+        """
+        if not isinstance(priority, str) or priority not in self.class_delays:
+            raise ValueError(f"Unknown priority: {priority}")
+        queued_at = time.time() if queued_at is None else queued_at
+        size_seconds = min(expected_seconds(expected_size, duration), self.max_size_seconds)
+        key = queued_at + self.class_delays[priority] + size_seconds
+        entry = (key, next(self._counter), job_id, priority)
+        with self._condition:
+            if not_before is not None:
+                if not self._closed:
+                    heapq.heappush(self._deferred, (not_before, entry[1], entry))
+                    self._condition.notify_all()
+                return
+            while self.max_pending and len(self._heap) >= self.max_pending and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return
+            heapq.heappush(self._heap, entry)
+            self._condition.notify_all()
+    
+    def _release_deferred(self):
+        """Move held jobs whose time has come into the queue; seconds to the next one"""
+        now = time.time()
+        while self._deferred and self._deferred[0][0] <= now:
+            heapq.heappush(self._heap, heapq.heappop(self._deferred)[2])
+        return self._deferred[0][0] - now if self._deferred else None
+    
+    def get(self, timeout=None):
+        """Wait for the next job ID; None once closed or after ``timeout`` seconds"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._closed:
+                wait = self._release_deferred()
+                if self._heap:
+                    break
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._condition.wait(wait)
+            if self._closed:
+                return None
+            job_id = heapq.heappop(self._heap)[2]
+            self._condition.notify_all()
+            return job_id
+    
+    def close(self):
+        """Drop queued jobs and release every waiting get() and put()"""
+        with self._condition:
+            self._closed = True
+            self._heap.clear()
+            self._deferred.clear()
+            self._condition.notify_all()
+    
+    def __len__(self):
+        with self._condition:
+            return len(self._heap) + len(self._deferred)
+    
+    def queued_by_class(self):
+        """Number of queued entries per priority class"""
+        with self._condition:
+            queued = {name: 0 for name in self.class_delays}
+            for entry in self._heap:
+                queued[entry[3]] += 1
+            for _, _, entry in self._deferred:
+                queued[entry[3]] += 1
+            return queued
@@ -24,4 +24,31 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 For commercial licensing, contact Gary19gts.
 
 Author: Gary19gts
-"""
\ No newline at end of file
+"""
+
+def create_engines(settings=None):
+    """Register the built-in engines and any installed plugins
+
+    Engines are only imported and built when first looked up by name.
+    """
+    from engines.registry import EngineRegistry, EngineCapabilities
+    from engines.router import AutoEngine
+    registry = EngineRegistry(settings)
+    registry.register(
+        "yt-dlp", "engines.yt_dlp_engine:YtDlpEngine",
+        EngineCapabilities(ranges=True),
+        "Advanced downloader with best compatibility"
+    )
+    registry.register(
+        "tiktok-api", "engines.tiktok_api_engine:TikTokApiEngine",
+        # Keep parallel requests to the CDN modest
+        EngineCapabilities(ranges=True, max_concurrency=4),
+        "Direct API access for faster downloads"
+    )
+    registry.register(
+        "auto", lambda: AutoEngine(registry, explore=registry.settings.get("auto_explore", 0.1)),
+        EngineCapabilities(ranges=True),
+        "Routes each download to the engine that is currently fastest"
+    )
+    registry.discover()
+    return registry
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+Process pool for yt-dlp extraction
+Moves CPU-heavy info extraction out of the GUI process so it can use several cores
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Keys that are never needed to download from an info dict and can be large
+HEAVY_KEYS = (
+    'thumbnails', 'subtitles', 'automatic_captions', 'comments',
+    'heatmap', 'chapters', '_format_sort_fields'
+)
+
+# Per-process YoutubeDL instances, created on first use in each worker
+_worker_pool = None
+
+def slim_info(info):
+    """Drop bulky fields so the info dict is cheap to send between processes"""
+    slim = {key: value for key, value in info.items() if key not in HEAVY_KEYS}
+    if info.get('thumbnails') and not slim.get('thumbnail'):
+        slim['thumbnail'] = info['thumbnails'][-1].get('url')
+    return slim
+
+def _extract_in_worker(url, ydl_opts):
+    """Run inside a pool process: extract and return a sanitized, slim info dict"""
+    global _worker_pool
+    if _worker_pool is None:
+        from engines.ydl_pool import YoutubeDLPool
+        _worker_pool = YoutubeDLPool()
+    
+    with _worker_pool.checkout(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        return slim_info(ydl.sanitize_info(info, remove_private_keys=True))
+
+def _warm_up():
+    """Import yt-dlp so the first real job doesn't pay for it"""
+    import yt_dlp  # noqa: F401
+    return True
+
+class ExtractionPool:
+    """Runs yt-dlp extraction in worker processes
+
+    Extraction (page parsing, JSON decoding, format sorting) holds the GIL,
+    so threads in one process cannot scale it. Only the small sanitized
+    info dict crosses the process boundary; the transfer itself stays on
+    an I/O thread in the calling process.
+    """
+    
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn keeps workers clean of the parent's threads and Tk state
+                context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context
+                )
+            return self._executor
+    
+    def warm_up(self):
+        """Start every worker process and import yt-dlp in it"""
+        executor = self._get_executor()
+        futures = [executor.submit(_warm_up) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+    
+    def submit(self, url, ydl_opts):
+        """Queue an extraction and return a future for the info dict"""
+        return self._get_executor().submit(_extract_in_worker, url, ydl_opts)
+    
+    def extract(self, url, ydl_opts, timeout=None):
+        """Extract info for a URL, blocking until a worker returns it"""
+        return self.submit(url, ydl_opts).result(timeout=timeout)
+    
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
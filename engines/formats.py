@@ -0,0 +1,212 @@
+"""
+Format ranking for Hikari TikTok Downloader
+Picks formats by resolution cap, bitrate and estimated size budget
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Named quality presets shown in the UI
+QUALITY_PRESETS = {
+    "best": "",
+    "1080p": "<=1080p",
+    "720p": "<=720p",
+    "480p": "<=480p",
+    "data-saver": "<=720p, <=8MB",
+    "audio": "audio"
+}
+
+SIZE_UNITS = {'kb': 1024, 'mb': 1024 ** 2, 'gb': 1024 ** 3}
+BITRATE_UNITS = {'kbps': 1, 'mbps': 1000}
+
+def estimate_size(fmt, duration=None):
+    """Best guess of a format's size in bytes, or None"""
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if not size and fmt.get('tbr') and duration:
+        size = fmt['tbr'] * 1000 / 8 * duration
+    return size
+
+def is_watermarked(fmt):
+    text = f"{fmt.get('format_id', '')} {fmt.get('format_note', '')}".lower()
+    return 'watermark' in text and 'no_watermark' not in text and 'unwatermarked' not in text
+
+def is_audio_only(fmt):
+    return fmt.get('vcodec') == 'none' and fmt.get('acodec') not in (None, 'none')
+
+def has_audio_only(formats):
+    """Check whether a native audio-only stream is available"""
+    return any(fmt.get('url') and is_audio_only(fmt) for fmt in formats or [])
+
+def is_h264(fmt):
+    vcodec = (fmt.get('vcodec') or '').lower()
+    return vcodec.startswith(('h264', 'avc'))
+
+class FormatPreference:
+    """Constraints and tie-breakers for choosing a format
+
+    Specs combine tokens such as "<=720p", "<=8MB" and "<=2000kbps"
+    (the "≤" sign works too), e.g. "≤720p, ≤8 MB". "audio" asks for the
+    soundtrack only.
+    """
+    
+    def __init__(self, max_height=None, max_bitrate=None, max_size=None, audio_only=False):
+        self.max_height = max_height      # pixels
+        self.max_bitrate = max_bitrate    # kbit/s
+        self.max_size = max_size          # bytes
+        self.audio_only = audio_only
+    
+    @classmethod
+    def parse(cls, quality):
+        """Build a preference from a preset name or a spec string"""
+        spec = QUALITY_PRESETS.get(quality, quality or "").lower().replace("≤", "<=")
+        preference = cls(audio_only="audio" in spec)
+        for value, unit in re.findall(r'(\d+(?:\.\d+)?)\s*(p|kbps|mbps|kb|mb|gb)\b', spec):
+            number = float(value)
+            if unit == 'p':
+                preference.max_height = int(number)
+            elif unit in BITRATE_UNITS:
+                preference.max_bitrate = number * BITRATE_UNITS[unit]
+            else:
+                preference.max_size = int(number * SIZE_UNITS[unit])
+        return preference
+    
+    def allows(self, fmt, duration=None):
+        """Check a format against the caps; unknown values are allowed"""
+        height = fmt.get('height')
+        if self.max_height and height and height > self.max_height:
+            return False
+        bitrate = fmt.get('tbr')
+        if self.max_bitrate and bitrate and bitrate > self.max_bitrate:
+            return False
+        size = estimate_size(fmt, duration)
+        if self.max_size and size and size > self.max_size:
+            return False
+        return True
+    
+    def sort_key(self, fmt, duration=None, top_bitrate=0):
+        """Higher resolution and bitrate first; formats within 10% of the top
+        bitrate for their resolution count as equal, and among those no
+        watermark, then H.264, then MP4, then smaller wins"""
+        bitrate = fmt.get('tbr') or 0
+        near_top = bitrate >= 0.9 * top_bitrate
+        return (
+            -(fmt.get('height') or 0),
+            not near_top,
+            0 if near_top else -bitrate,
+            is_watermarked(fmt),
+            not is_h264(fmt),
+            fmt.get('ext') != 'mp4',
+            estimate_size(fmt, duration) or 0
+        )
+
+def rank_formats(formats, preference, duration=None):
+    """Order formats best-first under the given preference"""
+    candidates = [fmt for fmt in formats if fmt.get('url')]
+    if preference.audio_only:
+        return rank_audio_formats(candidates, duration)
+    
+    # Only pick muxed video+audio formats when there are any
+    playable = [fmt for fmt in candidates if fmt.get('vcodec') != 'none' and fmt.get('acodec') != 'none']
+    candidates = playable or candidates
+    
+    within = [fmt for fmt in candidates if preference.allows(fmt, duration)]
+    if within:
+        top_bitrates = {}
+        for fmt in within:
+            height = fmt.get('height') or 0
+            top_bitrates[height] = max(top_bitrates.get(height, 0), fmt.get('tbr') or 0)
+        return sorted(within, key=lambda fmt: preference.sort_key(
+            fmt, duration, top_bitrates[fmt.get('height') or 0]))
+    
+    # Nothing fits the budget: go over it by as little as possible
+    return sorted(candidates, key=lambda fmt: (estimate_size(fmt, duration) or float('inf'),
+                                               fmt.get('height') or 0))
+
+def rank_audio_formats(formats, duration=None):
+    """Native audio-only streams first (highest bitrate); otherwise the
+    smallest muxed format, whose audio track is demuxed after download"""
+    audio = [fmt for fmt in formats if is_audio_only(fmt)]
+    if audio:
+        return sorted(audio, key=lambda fmt: (-(fmt.get('abr') or fmt.get('tbr') or 0),
+                                              estimate_size(fmt, duration) or 0))
+    with_audio = [fmt for fmt in formats if fmt.get('acodec') != 'none']
+    return sorted(with_audio, key=lambda fmt: (estimate_size(fmt, duration) or float('inf'),
+                                               fmt.get('height') or 0))
+
+class FormatSelector:
+    """yt-dlp 'format' callable backed by rank_formats
+
+    Instances are picklable and have a stable repr, so they work with the
+    extraction process pool and as part of YoutubeDLPool keys.
+    """
+    
+    def __init__(self, quality):
+        self.quality = quality
+        self.preference = FormatPreference.parse(quality)
+    
+    def __call__(self, ctx):
+        ranked = rank_formats(ctx['formats'], self.preference)
+        if ranked:
+            yield ranked[0]
+    
+    def __repr__(self):
+        return f"FormatSelector({self.quality!r})"
+
+class FormatCache:
+    """Small LRU of each video's format list
+
+    Entries expire because CDN links in the formats are short-lived.
+    """
+    
+    def __init__(self, max_entries=512, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, video_id):
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if not entry:
+                return None
+            stored_at, formats = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[video_id]
+                return None
+            self._entries.move_to_end(video_id)
+            return formats
+    
+    def put(self, video_id, formats):
+        if not video_id or not formats:
+            return
+        with self._lock:
+            self._entries[video_id] = (time.time(), list(formats))
+            self._entries.move_to_end(video_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,268 @@
+"""
+Engine registry for Hikari TikTok Downloader
+Lazy, pluggable download engines with capability metadata
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import contextlib
+import importlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from importlib import metadata
+
+from utils.circuit_breaker import BreakerBoard
+
+# Third-party packages register engines under this entry point group, e.g.
+#   [project.entry-points."hikari.engines"]
+#   my-engine = "my_package.engine:MyEngine"
+ENTRY_POINT_GROUP = "hikari.engines"
+
+URL_KINDS = ("video", "short-link", "mobile")
+
+def url_kind(url):
+    """Classify a TikTok URL as one of URL_KINDS (None if unrecognized)"""
+    if re.search(r'(vm\.tiktok\.com/|tiktok\.com/t/)', url, re.IGNORECASE):
+        return "short-link"
+    if re.search(r'tiktok\.com/.*?/video/\d+', url, re.IGNORECASE):
+        return "video"
+    if re.search(r'm\.tiktok\.com/', url, re.IGNORECASE):
+        return "mobile"
+    return None
+
+class EngineCapabilities:
+    """What an engine can do, known without loading it"""
+    
+    def __init__(self, ranges=False, max_concurrency=None, url_kinds=URL_KINDS, is_async=False):
+        self.ranges = ranges                    # resumes partial files with Range requests
+        self.max_concurrency = max_concurrency  # parallel downloads allowed, None = no limit
+        self.url_kinds = tuple(url_kinds)       # URL forms it understands
+        self.is_async = is_async                # download() returns an awaitable
+    
+    def supports(self, url):
+        kind = url_kind(url)
+        return kind is None or kind in self.url_kinds
+    
+    def to_dict(self):
+        return {
+            'ranges': self.ranges,
+            'max_concurrency': self.max_concurrency,
+            'url_kinds': list(self.url_kinds),
+            'is_async': self.is_async
+        }
+
+class EngineSpec:
+    """A registered engine: where to find it and what it declares"""
+    
+    def __init__(self, name, factory, capabilities=None, description=""):
+        self.name = name
+        self.factory = factory  # callable or "module:attribute"
+        self.capabilities = capabilities
+        self.description = description
+    
+    def resolve(self):
+        """Import the engine class (or factory) without instantiating it"""
+        if isinstance(self.factory, str):
+            module_name, _, attribute = self.factory.partition(":")
+            target = importlib.import_module(module_name)
+            for part in attribute.split("."):
+                target = getattr(target, part)
+            self.factory = target
+        return self.factory
+
+class EngineRegistry:
+    """Named download engines, each built on first use
+    
+    Behaves like the plain dict of engines it replaces: lookups by name
+    load the engine, membership and iteration cover every registered name,
+    and values() / items() only cover engines that were actually loaded.
+    """
+    
+    def __init__(self, settings=None):
+        self.settings = settings or {}
+        self.logger = logging.getLogger("HikariDownloader")
+        self._specs = {}
+        self._instances = {}
+        self._slots = {}
+        # Per-engine and per-host circuit breakers, shared by every caller
+        self.breakers = BreakerBoard()
+        self._lock = threading.RLock()
+    
+    def register(self, name, factory, capabilities=None, description=""):
+        """Register an engine class, factory or "module:Class" path"""
+        with self._lock:
+            self._specs[name] = EngineSpec(name, factory, capabilities, description)
+            self._instances.pop(name, None)
+    
+    def discover(self, group=ENTRY_POINT_GROUP):
+        """Register engines advertised by installed packages"""
+        try:
+            entry_points = metadata.entry_points(group=group)
+        except TypeError:  # Python < 3.10
+            entry_points = metadata.entry_points().get(group, [])
+        for entry_point in entry_points:
+            if entry_point.name in self._specs:
+                continue  # Built-ins win over plugins with the same name
+            self.register(entry_point.name, entry_point.value)
+            self.logger.info(f"Discovered engine plugin: {entry_point.name}")
+    
+    def names(self):
+        """Registered engine names, in registration order"""
+        with self._lock:
+            return list(self._specs)
+    
+    def capabilities(self, name):
+        """Declared capabilities; plugins are imported (not built) to read them"""
+        spec = self._specs[name]
+        if spec.capabilities is None:
+            try:
+                declared = getattr(spec.resolve(), "capabilities", None)
+            except Exception as e:
+                self.logger.warning(f"Could not load engine {name}: {e}")
+                declared = None
+            spec.capabilities = declared if isinstance(declared, EngineCapabilities) else EngineCapabilities()
+        return spec.capabilities
+    
+    def slot(self, name):
+        """Context manager that enforces an engine's declared concurrency limit
+        
+        The semaphore is shared by everything that runs the engine, so jobs
+        routed to it by the auto engine count against the same limit.
+        """
+        limit = self.capabilities(name).max_concurrency
+        with self._lock:
+            if name not in self._slots:
+                self._slots[name] = threading.BoundedSemaphore(limit) if limit else None
+            return self._slots[name] or contextlib.nullcontext()
+    
+    def _build(self, spec):
+        factory = spec.resolve()
+        if hasattr(factory, "from_settings"):
+            return factory.from_settings(self.settings)
+        return factory()
+    
+    def __getitem__(self, name):
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                spec = self._specs[name]  # KeyError for unknown engines, like a dict
+                instance = self._instances[name] = self._build(spec)
+                self.logger.info(f"Loaded engine: {name}")
+            return instance
+    
+    def __setitem__(self, name, engine):
+        """Register an already built engine"""
+        with self._lock:
+            self._specs[name] = EngineSpec(name, type(engine), getattr(engine, "capabilities", None))
+            self._instances[name] = engine
+    
+    def get(self, name, default=None):
+        if name not in self._specs:
+            return default
+        return self[name]
+    
+    def loaded(self, name):
+        """The engine instance if it was already built, without building it"""
+        with self._lock:
+            return self._instances.get(name)
+    
+    def __contains__(self, name):
+        return name in self._specs
+    
+    def __iter__(self):
+        return iter(self.names())
+    
+    def __len__(self):
+        return len(self._specs)
+    
+    def keys(self):
+        return self.names()
+    
+    def values(self):
+        with self._lock:
+            return list(self._instances.values())
+    
+    def items(self):
+        with self._lock:
+            return list(self._instances.items())
+    
+    def benchmark(self, name, urls, output_path=None):
+        """Run an engine's benchmark() hook over fixture URLs
+        
+        Every engine is measured on the same URLs, typically served by
+        benchmarks.cdn_server.StandInCDN, so results are comparable.
+        """
+        engine = self[name]
+        cleanup = output_path is None
+        output_path = output_path or tempfile.mkdtemp(prefix=f"hikari-{name}-")
+        try:
+            hook = getattr(engine, "benchmark", None)
+            if hook:
+                result = hook(urls, output_path)
+            else:
+                result = default_benchmark(engine, urls, output_path)
+        finally:
+            if cleanup:
+                shutil.rmtree(output_path, ignore_errors=True)
+        result['engine'] = name
+        return result
+
+def default_benchmark(engine, urls, output_path, download=None):
+    """Time downloads of each URL sequentially
+    
+    ``download(url, output_path)`` defaults to the engine's own download()
+    and must return (success, message).
+    """
+    download = download or (lambda url, path: engine.download(url, path))
+    durations, failures = [], 0
+    start = time.perf_counter()
+    for url in urls:
+        job_start = time.perf_counter()
+        try:
+            success, _ = download(url, output_path)
+        except Exception:
+            success = False
+        if success:
+            durations.append(time.perf_counter() - job_start)
+        else:
+            failures += 1
+    wall = time.perf_counter() - start
+    
+    total_bytes = 0
+    for root, _, files in os.walk(output_path):
+        total_bytes += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    
+    return {
+        'jobs': len(urls),
+        'failed': failures,
+        'seconds': round(wall, 3),
+        'mean_job_seconds': round(sum(durations) / len(durations), 4) if durations else None,
+        'throughput_mb_s': round(total_bytes / wall / (1024 * 1024), 3) if wall else None
+    }
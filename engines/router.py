@@ -0,0 +1,292 @@
+"""
+Adaptive engine routing for Hikari TikTok Downloader
+Sends each job to the engine that has recently been finishing fastest
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import asyncio
+import collections
+import glob
+import inspect
+import logging
+import os
+import random
+import threading
+import time
+
+from utils.cancellation import CancelToken, DownloadCancelled, DownloadPaused
+from utils.circuit_breaker import engine_key
+from utils.output_index import TEMP_SUFFIXES
+
+AUTO_ENGINE = "auto"
+
+# Size used to compare engines with different first-byte times and throughput
+TYPICAL_SIZE = 8 * 1024 * 1024
+
+# Seconds a failed attempt is assumed to cost, on top of its own duration:
+# the job still has to be retried on another engine
+FAILURE_PENALTY = 5.0
+
+# Outcomes this many jobs old count half as much toward the success rate,
+# so a run of fresh failures outweighs a long history of successes
+SUCCESS_HALF_LIFE = 8
+
+# Extensions a finished download may have, to measure its size
+_OUTPUT_EXTENSIONS = (".mp4", ".m4a", ".webm", ".mp3", ".mkv")
+
+class EngineStats:
+    """Rolling outcome window for one engine"""
+    
+    def __init__(self, window=50, max_age=3600):
+        self.max_age = max_age
+        self._samples = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, success, ttfb=None, duration=None, size=None):
+        with self._lock:
+            self._samples.append((time.time(), success, ttfb, duration, size))
+    
+    def _recent(self):
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            return [sample for sample in self._samples if sample[0] >= cutoff]
+    
+    def summary(self):
+        """Success rate, mean time to first byte and mean throughput"""
+        samples = self._recent()
+        successes = [s for s in samples if s[1]]
+        failures = [s[3] for s in samples if not s[1] and s[3] is not None]
+        weights = [0.5 ** (age / SUCCESS_HALF_LIFE) for age in range(len(samples))]
+        succeeded = sum(w for w, s in zip(weights, reversed(samples)) if s[1])
+        ttfbs = [s[2] for s in successes if s[2] is not None]
+        rates = [
+            s[4] / (s[3] - (s[2] or 0))
+            for s in successes
+            if s[4] and s[3] and s[3] > (s[2] or 0)
+        ]
+        return {
+            'samples': len(samples),
+            # Laplace smoothing keeps one early failure from ruling an engine out
+            'success_rate': (succeeded + 1) / (sum(weights) + 2),
+            'failure_seconds': sum(failures) / len(failures) if failures else 0.0,
+            'ttfb': sum(ttfbs) / len(ttfbs) if ttfbs else None,
+            'throughput': sum(rates) / len(rates) if rates else None,
+            'durations': [s[3] for s in successes if s[3]]
+        }
+    
+    def expected_seconds(self):
+        """Expected time to finish a typical job, counting time lost to failures
+        
+        Engines without timing data score 0 so they are tried first.
+        """
+        summary = self.summary()
+        if summary['throughput']:
+            seconds = (summary['ttfb'] or 0) + TYPICAL_SIZE / summary['throughput']
+        elif summary['durations']:
+            seconds = sum(summary['durations']) / len(summary['durations'])
+        else:
+            seconds = 0.0
+        p = summary['success_rate']
+        lost = (summary['failure_seconds'] + FAILURE_PENALTY) * (1 - p) / p
+        return seconds + lost
+
+class AutoEngine:
+    """Pseudo-engine that routes every job to the best real engine
+    
+    Most jobs go to the engine with the lowest expected finish time; an
+    ``explore`` share goes to a random other engine so stale numbers get
+    refreshed (and a recovered engine wins its traffic back). When the
+    chosen engine fails, the job is retried on the next best one.
+    """
+    
+    def __init__(self, registry, explore=0.1, window=50, max_age=3600):
+        self.name = AUTO_ENGINE
+        self.description = "Picks the engine that is currently fastest and most reliable"
+        self.advantages = [
+            "Learns from recent downloads",
+            "Falls back automatically when an engine breaks",
+            "No manual switching"
+        ]
+        self.recommended = False
+        
+        self.registry = registry
+        self.explore = explore
+        self.logger = logging.getLogger("HikariDownloader")
+        self._stats = collections.defaultdict(lambda: EngineStats(window, max_age))
+        self._random = random.Random()
+    
+    def _candidates(self, url, exclude=()):
+        return [
+            name for name in self.registry.names()
+            if name != AUTO_ENGINE and name not in exclude
+            and self.registry.capabilities(name).supports(url)
+        ]
+    
+    def rank(self, url, exclude=()):
+        """Candidate engines for a URL, best first; engines with an open breaker are left out"""
+        breakers = self.registry.breakers
+        candidates = [
+            name for name in self._candidates(url, exclude)
+            if breakers.allows(engine_key(name))
+        ]
+        ranked = sorted(candidates, key=lambda name: self._stats[name].expected_seconds())
+        if len(ranked) > 1 and self._random.random() < self.explore:
+            ranked.insert(0, ranked.pop(self._random.randrange(1, len(ranked))))
+        return ranked
+    
+    def prepare(self, url, quality="best"):
+        """Prefetch with the engine the job is expected to use"""
+        for name in self.rank(url):
+            engine = self.registry[name]
+            if hasattr(engine, "prepare"):
+                prepared = engine.prepare(url, quality)
+                prepared['engine'] = name
+                return prepared
+        raise ValueError("No engine can prepare this URL")
+    
+    def download(self, url, output_path, quality="best", progress_callback=None, status_callback=None,
+                 prepared=None, cancel_token=None):
+        """Download with the best engine, falling back to the others on failure"""
+        token = cancel_token or CancelToken()
+        if token.routed_engine:
+            # A resumed job stays on the engine that owns its partial file
+            order = [token.routed_engine]
+        else:
+            order = self.rank(url)
+            if prepared and prepared.get('engine') in order:
+                order.remove(prepared['engine'])
+                order.insert(0, prepared['engine'])
+        if not order:
+            return False, "No engine is available for this URL right now"
+        
+        message = "Download failed"
+        for attempt, name in enumerate(order):
+            if attempt:
+                # A fallback engine starts over under a fresh name
+                self._remove_partials(token)
+                token.reserved_path = None
+                token.partial_path = None
+            token.routed_engine = name
+            success, message = self._download_with(
+                name, url, output_path, quality, progress_callback, status_callback,
+                prepared if prepared and prepared.get('engine') == name else None, token
+            )
+            if success:
+                return True, message
+            self.logger.warning(f"Engine {name} failed ({message}); trying the next one")
+        return False, message
+    
+    def _remove_partials(self, token):
+        """Delete what a failed engine left behind for its reserved name"""
+        paths = set()
+        if token.partial_path:
+            paths.add(token.partial_path)
+        if token.reserved_path:
+            paths.update(path for path in glob.glob(glob.escape(token.reserved_path) + ".*")
+                         if path.endswith(TEMP_SUFFIXES))
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _download_with(self, name, url, output_path, quality, progress_callback, status_callback,
+                       prepared, token):
+        """Run one engine and record how it did"""
+        engine = self.registry[name]
+        keys = [engine_key(name)]
+        if self.registry.breakers.acquire(keys):
+            return False, f"{name} is recovering from errors"
+        started = time.perf_counter()
+        first_byte = []
+        
+        def progress(percent):
+            if not first_byte:
+                first_byte.append(time.perf_counter() - started)
+            if progress_callback:
+                progress_callback(percent)
+        
+        if status_callback:
+            status_callback(f"Using {name} engine")
+        try:
+            with self.registry.slot(name):
+                result = engine.download(
+                    url, output_path, quality, progress, status_callback,
+                    prepared=prepared, cancel_token=token
+                )
+                if inspect.isawaitable(result):
+                    result = asyncio.run(result)
+            success, message = result
+        except (DownloadCancelled, DownloadPaused):
+            self.registry.breakers.release(keys)
+            raise
+        except Exception as e:
+            success, message = False, f"Download failed: {str(e)}"
+        
+        duration = time.perf_counter() - started
+        ttfb = first_byte[0] if first_byte else None
+        self.registry.breakers.record(keys, success, ttfb)
+        self._stats[name].record(
+            success,
+            ttfb=ttfb,
+            duration=duration,
+            size=self._output_size(token) if success else None
+        )
+        return success, message
+    
+    @staticmethod
+    def _output_size(token):
+        if not token.reserved_path:
+            return None
+        for ext in _OUTPUT_EXTENSIONS:
+            try:
+                return os.path.getsize(token.reserved_path + ext)
+            except OSError:
+                continue
+        return None
+    
+    def stats(self):
+        """Current routing numbers per engine"""
+        result = {}
+        for name in self._candidates(""):
+            summary = self._stats[name].summary()
+            result[name] = {
+                'samples': summary['samples'],
+                'success_rate': round(summary['success_rate'], 3),
+                'ttfb': round(summary['ttfb'], 3) if summary['ttfb'] is not None else None,
+                'throughput_mb_s': round(summary['throughput'] / 1024 / 1024, 3) if summary['throughput'] else None,
+                'expected_seconds': round(self._stats[name].expected_seconds(), 3)
+            }
+        return result
+    
+    def get_info(self):
+        """Get engine information"""
+        return {
+            'name': self.name,
+            'description': self.description,
+            'advantages': self.advantages,
+            'recommended': self.recommended
+        }
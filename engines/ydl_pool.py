@@ -0,0 +1,99 @@
+"""
+Reusable YoutubeDL instance pool
+Avoids rebuilding extractors, cookie jar and HTTP handlers for every job
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import threading
+from contextlib import contextmanager
+
+import yt_dlp
+
+class YoutubeDLPool:
+    """Pre-built YoutubeDL objects keyed by option set
+
+    Each checkout gets exclusive use of an instance. Per-job settings
+    (output template, progress hooks) are applied on checkout and reset
+    on return so they never leak into the next job.
+    """
+    
+    def __init__(self, max_idle_per_key=4):
+        self.max_idle_per_key = max_idle_per_key
+        self._idle = {}
+        self._lock = threading.Lock()
+        # Bumped by clear(); instances from an older generation are not reused
+        self._generation = 0
+    
+    @staticmethod
+    def _key(ydl_opts):
+        return repr(sorted(ydl_opts.items()))
+    
+    def _acquire(self, key, ydl_opts):
+        with self._lock:
+            instances = self._idle.get(key)
+            if instances:
+                return instances.pop()
+        return yt_dlp.YoutubeDL(dict(ydl_opts))
+    
+    def _release(self, key, ydl, generation):
+        with self._lock:
+            instances = self._idle.setdefault(key, [])
+            if generation == self._generation and len(instances) < self.max_idle_per_key:
+                instances.append(ydl)
+                return
+        ydl.close()
+    
+    @contextmanager
+    def checkout(self, ydl_opts, outtmpl=None, progress_hooks=None):
+        """Borrow an instance built with ydl_opts, applying per-job options"""
+        key = self._key(ydl_opts)
+        generation = self._generation
+        ydl = self._acquire(key, ydl_opts)
+        saved_outtmpl = dict(ydl.params.get('outtmpl') or {})
+        saved_hooks = list(ydl._progress_hooks)
+        
+        if outtmpl:
+            ydl.params['outtmpl'] = {'default': outtmpl}
+            ydl._parse_outtmpl()
+        for hook in progress_hooks or []:
+            ydl.add_progress_hook(hook)
+        
+        try:
+            yield ydl
+        finally:
+            ydl.params['outtmpl'] = saved_outtmpl
+            ydl._progress_hooks[:] = saved_hooks
+            ydl._download_retcode = 0
+            self._release(key, ydl, generation)
+    
+    def clear(self):
+        """Close every idle instance; checked-out ones are closed on return"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+            self._generation += 1
+        for instances in idle.values():
+            for ydl in instances:
+                ydl.close()
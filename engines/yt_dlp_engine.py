@@ -27,13 +27,32 @@ For commercial licensing, contact Gary19gts.
 Author: Gary19gts
 """
 
-import yt_dlp
+import contextlib
+import glob
 import os
+import time
 from pathlib import Path
 import threading
 
+from engines.extraction_pool import ExtractionPool
+from engines.formats import FormatSelector, FormatCache, FormatPreference, has_audio_only
+from engines.ydl_pool import YoutubeDLPool
+from utils.cancellation import DownloadCancelled, DownloadPaused
+from utils.catalog import get_catalog
+from utils.thumbnails import get_thumbnail_cache, thumbnail_url
+from utils.output_index import reserve_output_stem, TEMP_SUFFIXES
+from utils.proxy_pool import get_proxy_pool
+from utils.profiler import get_profiler
+from utils.mp4 import verify_download
+
+def _is_proxy_error(message):
+    """Whether a yt-dlp error message blames the proxy connection"""
+    message = (message or "").lower()
+    return "proxy" in message or "tunnel connection failed" in message
+
 class YtDlpEngine:
-    def __init__(self):
+    def __init__(self, extraction_workers=0, output_layout="flat", proxy_pool=None, catalog=None,
+                 thumbnails=None, profiler=None, verify=True):
         self.name = "yt-dlp"
         self.description = "Advanced downloader with best compatibility"
         self.advantages = [
@@ -44,57 +63,297 @@ class YtDlpEngine:
         ]
         self.recommended = True
         
-    def download(self, url, output_path, quality="best", progress_callback=None, status_callback=None):
+        # Optional process pool for extraction; 0 keeps it in-process
+        self.extraction_pool = ExtractionPool(extraction_workers) if extraction_workers else None
+        self.ydl_pool = YoutubeDLPool()
+        self.format_cache = FormatCache()
+        self._format_selectors = {}
+        # Folder layout under the output path (see utils.output_index.LAYOUTS)
+        self.output_layout = output_layout
+        # Optional egress proxies, applied per job through the 'proxy' option
+        self.proxy_pool = proxy_pool
+        # Optional utils.catalog.Catalog that finished downloads are recorded in
+        self.catalog = catalog
+        # Optional utils.thumbnails.ThumbnailCache, filled as downloads finish
+        self.thumbnails = thumbnails
+        # Optional utils.profiler.JobProfiler for the extract and transfer phases
+        self.profiler = profiler
+        # Check that finished MP4 files are complete before reporting success
+        self.verify = verify
+        # Calls using the library right now; a library swap waits for them
+        self._library_users = 0
+        self._library_swapping = False
+        self._library_idle = threading.Condition()
+        self._library_depth = threading.local()
+        
+    @classmethod
+    def from_settings(cls, settings):
+        """Build the engine from the shared settings (used by the registry)"""
+        return cls(
+            extraction_workers=settings.get("extraction_workers", 0),
+            output_layout=settings.get("output_layout", "flat"),
+            proxy_pool=get_proxy_pool(settings),
+            catalog=get_catalog(settings),
+            thumbnails=get_thumbnail_cache(settings),
+            profiler=get_profiler(settings),
+            verify=settings.get("verify_downloads", True)
+        )
+    
+    def _build_options(self, quality, lease=None):
+        """Setup yt-dlp options shared by every job with this quality (and proxy)"""
+        options = {
+            'format': self._get_format_selector(quality),
+            'noplaylist': True,
+            'extractaudio': False,
+            'writesubtitles': False,
+            'writeautomaticsub': False,
+            'ignoreerrors': False,
+        }
+        if lease:
+            options['proxy'] = lease.url
+            # A fixed share keeps pooled instances reusable across jobs
+            if lease.proxy.per_transfer_bandwidth:
+                options['ratelimit'] = lease.proxy.per_transfer_bandwidth
+        return options
+    
+    def _proxy_lease(self, url):
+        """Check out a proxy for a job (sticky per URL), or nothing without a pool"""
+        if self.proxy_pool is None:
+            return contextlib.nullcontext()
+        return self.proxy_pool.acquire(session_key=url)
+    
+    def _profile(self, label, phase):
+        """Profile a phase of a download when it is sampled, or do nothing"""
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.profile(f"{self.name}-{label}", phase)
+    
+    @contextlib.contextmanager
+    def _using_library(self):
+        """Mark a call that runs yt-dlp code; waits while the library is being swapped"""
+        depth = getattr(self._library_depth, "value", 0)
+        if depth == 0:
+            with self._library_idle:
+                while self._library_swapping:
+                    self._library_idle.wait()
+                self._library_users += 1
+        self._library_depth.value = depth + 1
+        try:
+            yield
+        finally:
+            self._library_depth.value = depth
+            if depth == 0:
+                with self._library_idle:
+                    self._library_users -= 1
+                    self._library_idle.notify_all()
+    
+    @contextlib.contextmanager
+    def library_swap(self):
+        """Hold new work and wait until no call is running yt-dlp code
+        
+        Install and reload a new yt-dlp inside this block: code that is
+        still running would otherwise lazy-import modules of the new
+        version into the old one.
+        """
+        with self._library_idle:
+            while self._library_swapping:
+                self._library_idle.wait()
+            self._library_swapping = True
+            while self._library_users:
+                self._library_idle.wait()
+        try:
+            yield
+        finally:
+            with self._library_idle:
+                self._library_swapping = False
+                self._library_idle.notify_all()
+    
+    def library_users(self):
+        """Number of calls currently running yt-dlp code"""
+        with self._library_idle:
+            return self._library_users
+    
+    def prepare(self, url, quality="best"):
+        """Extract info and warm up the CDN connection ahead of a download"""
+        with self._using_library(), self._proxy_lease(url) as lease:
+            ydl_opts = self._build_options(quality, lease)
+            info = self.extract_info(url, ydl_opts)
+            self._warm_up_connection(ydl_opts, info)
+        return {
+            'url': url,
+            'quality': quality,
+            'info': info,
+            'created_at': time.time()
+        }
+    
+    def _warm_up_connection(self, ydl_opts, info):
+        """Open a connection to the media host in the instance the download will reuse"""
+        media_url = info.get('url')
+        if not media_url:
+            return
+        try:
+            from yt_dlp.networking import Request
+            with self.ydl_pool.checkout(ydl_opts) as ydl:
+                ydl.urlopen(Request(media_url, headers=info.get('http_headers') or {}, method='HEAD')).close()
+        except Exception:
+            pass  # Warm-up is best effort; the download reports real errors
+    
+    def download(self, url, output_path, quality="best", progress_callback=None, status_callback=None,
+                 prepared=None, cancel_token=None):
         """Download TikTok content using yt-dlp"""
+        with self._using_library(), self._proxy_lease(url) as lease:
+            success, message = self._download(url, output_path, quality, progress_callback, status_callback,
+                                              prepared, cancel_token, lease)
+            if lease:
+                lease.record(success or not _is_proxy_error(message))
+            return success, message
+    
+    def _download(self, url, output_path, quality, progress_callback, status_callback, prepared,
+                  cancel_token, lease):
         try:
-            # Configure quality format
-            format_selector = self._get_format_selector(quality)
-            
-            # Setup yt-dlp options
-            ydl_opts = {
-                'format': format_selector,
-                'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
-                'noplaylist': True,
-                'extractaudio': False,
-                'writesubtitles': False,
-                'writeautomaticsub': False,
-                'ignoreerrors': False,
-            }
+            ydl_opts = self._build_options(quality, lease)
             
             # Add progress hook if provided
+            progress_hooks = []
             if progress_callback:
-                ydl_opts['progress_hooks'] = [self._progress_hook(progress_callback, status_callback)]
+                progress_hooks.append(self._progress_hook(progress_callback, status_callback))
+            if cancel_token:
+                progress_hooks.append(self._cancel_hook(cancel_token))
             
-            # Download the content
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            if prepared and prepared.get('url') == url and prepared.get('quality') == quality:
+                # Metadata was already extracted by a prefetch
+                info = prepared['info']
+            else:
                 if status_callback:
                     status_callback("Extracting video information...")
                 
                 # Extract info first to validate
-                info = ydl.extract_info(url, download=False)
-                
+                with self._profile(url, "extract"):
+                    info = self.extract_info(url, ydl_opts)
+            
+            if cancel_token:
+                cancel_token.check()
+            
+            # Reserve a unique name up front; yt-dlp itself would overwrite same-titled videos
+            stem_path = reserve_output_stem(output_path, info, self.output_layout, cancel_token)
+            outtmpl = stem_path.replace('%', '%%') + '.%(ext)s'
+            
+            if FormatPreference.parse(quality).audio_only and not has_audio_only(info.get('formats')):
+                # No native audio stream: demux the soundtrack without re-encoding
+                ydl_opts = dict(ydl_opts, postprocessors=[
+                    {'key': 'FFmpegExtractAudio', 'preferredcodec': 'best'}
+                ])
+            
+            # Download the content with a pooled instance
+            with self.ydl_pool.checkout(ydl_opts, outtmpl, progress_hooks) as ydl:
                 if status_callback:
                     status_callback(f"Downloading: {info.get('title', 'Unknown')}")
                 
-                # Perform actual download
-                ydl.download([url])
+                # Download from the extracted info instead of extracting again
+                with self._profile(info.get('id') or url, "transfer"):
+                    result = ydl.process_ie_result(info, download=True)
+                
+                downloads = (result or {}).get('requested_downloads') or [{}]
+                filepath = self._output_file(downloads[0], stem_path)
+                media = verify_download(filepath) if self.verify and filepath else None
+                if media is not None and not media.valid:
+                    return self._reject(filepath, media, status_callback)
+                
+                if filepath and (self.catalog or self.thumbnails):
+                    self._record(url, info, downloads[0], filepath, media)
                 
                 if status_callback:
                     status_callback("Download completed successfully!")
                 
                 return True, "Download completed successfully"
-                
+        
+        except DownloadPaused:
+            raise
+        except DownloadCancelled:
+            # yt-dlp keeps its .part file; a cancelled job should not
+            if cancel_token and cancel_token.partial_path and os.path.exists(cancel_token.partial_path):
+                os.remove(cancel_token.partial_path)
+            raise
         except Exception as e:
             error_msg = f"Download failed: {str(e)}"
             if status_callback:
                 status_callback(error_msg)
             return False, error_msg
     
+    def _reject(self, filepath, media, status_callback):
+        """Drop a damaged download so the job fails and can run again"""
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+        error_msg = f"Download failed: file is damaged ({media.problem})"
+        if status_callback:
+            status_callback(error_msg)
+        return False, error_msg
+    
+    def _output_file(self, download, stem_path):
+        """Path of the file a download produced, or None"""
+        filepath = download.get('filepath')
+        if filepath and os.path.exists(filepath):
+            return filepath
+        # Post-processors may have renamed the file; take whatever was written
+        candidates = [path for path in glob.glob(glob.escape(stem_path) + ".*")
+                      if not path.endswith(TEMP_SUFFIXES)]
+        return candidates[0] if candidates else None
+    
+    def _record(self, url, info, fmt, filepath, media=None):
+        """Add a finished download to the catalog and queue its thumbnail"""
+        if self.catalog:
+            # Values measured in the file beat what the extractor reported
+            fmt = dict(fmt, **media.as_format()) if media else fmt
+            self.catalog.record(info, filepath, url=url, engine=self.name, fmt=fmt)
+        if self.thumbnails and info.get('id'):
+            self.thumbnails.request(info['id'], thumbnail_url(info), filepath)
+    
+    def extract_info(self, url, ydl_opts=None):
+        """Extract a sanitized info dict, in a worker process when a pool is set"""
+        extract_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+            'format': (ydl_opts or {}).get('format', self._get_format_selector("best"))
+        }
+        if (ydl_opts or {}).get('proxy'):
+            extract_opts['proxy'] = ydl_opts['proxy']
+        
+        with self._using_library():
+            if self.extraction_pool:
+                info = self.extraction_pool.extract(url, extract_opts)
+            else:
+                with self.ydl_pool.checkout(extract_opts) as ydl:
+                    info = ydl.sanitize_info(ydl.extract_info(url, download=False), remove_private_keys=True)
+        
+        self.format_cache.put(info.get('id'), info.get('formats'))
+        return info
+    
+    def get_formats(self, video_id):
+        """Get the recently extracted format list of a video, if cached"""
+        return self.format_cache.get(video_id)
+    
     def _get_format_selector(self, quality):
-        """Get format selector for highest quality download"""
-        # Always return the best available quality format
-        # Prioritize mp4 format for compatibility, fallback to any best quality
-        return "best[ext=mp4]/best"
+        """Get the ranking format selector for a quality preset or spec"""
+        # One selector per quality keeps pooled YoutubeDL option keys stable
+        selector = self._format_selectors.get(quality)
+        if selector is None:
+            selector = self._format_selectors[quality] = FormatSelector(quality)
+        return selector
+    
+    def _cancel_hook(self, cancel_token):
+        """Create a hook that stops the transfer when the job is cancelled or paused"""
+        def hook(d):
+            if d.get('tmpfilename'):
+                cancel_token.partial_path = d['tmpfilename']
+            media_url = (d.get('info_dict') or {}).get('url')
+            if media_url:
+                cancel_token.media_url = media_url
+            if d['status'] == 'downloading':
+                cancel_token.check()
+        return hook
     
     def _progress_hook(self, progress_callback, status_callback):
         """Create progress hook for yt-dlp"""
@@ -121,12 +380,35 @@ class YtDlpEngine:
     def validate_url(self, url):
         """Validate if URL is supported"""
         try:
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return True, info.get('title', 'Unknown content')
+            info = self.extract_info(url)
+            return True, info.get('title', 'Unknown content')
         except Exception as e:
             return False, str(e)
     
+    def reload_library(self):
+        """Switch to a newly installed yt-dlp without restarting the app
+        
+        Call it inside library_swap(), so no download is running old code
+        while modules are replaced; held jobs then build fresh instances
+        and worker processes from the reloaded package.
+        """
+        from engines import ydl_pool
+        from utils.updater import reload_module
+        
+        module = reload_module("yt_dlp")
+        ydl_pool.yt_dlp = module
+        self.ydl_pool.clear()
+        if self.extraction_pool:
+            # Workers are respawned on the next job and import the new version
+            self.extraction_pool.shutdown(wait=False)
+        return module.version.__version__
+    
+    def shutdown(self):
+        """Release the extraction worker processes and pooled instances"""
+        if self.extraction_pool:
+            self.extraction_pool.shutdown(wait=False)
+        self.ydl_pool.clear()
+    
     def get_info(self):
         """Get engine information"""
         return {
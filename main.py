@@ -35,20 +35,28 @@ from tkinter import ttk, filedialog, messagebox
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import threading
+import contextlib
 import os
 import sys
-import json
 from pathlib import Path
 import webbrowser
 from datetime import datetime
 
 # Import downloader engines
-from engines.yt_dlp_engine import YtDlpEngine
-from engines.tiktok_api_engine import TikTokApiEngine
-from ui.components import ModernButton, InfoTooltip, ProgressBar
+from engines import create_engines
+from engines.formats import QUALITY_PRESETS
+from core.prefetch import Prefetcher
+from core.ingest import URLIngestor
+from core.jobs import JobManager
+from ui.components import ModernButton, InfoTooltip, ProgressBar, VirtualList
 from ui.styles import ModernStyle
 from utils.validator import URLValidator
 from utils.logger import Logger
+from utils.settings import get_settings
+from utils.cancellation import CancelToken, DownloadCancelled, DownloadPaused
+from utils.circuit_breaker import job_keys
+from utils.profiler import get_profiler
+from utils.updater import LibraryUpdater, HOT_RELOADABLE
 
 class HikariTikTokDownloader:
     def __init__(self):
@@ -92,8 +100,14 @@ class HikariTikTokDownloader:
         """Initialize variables"""
         self.url_var = tk.StringVar()
         
+        self.logger = Logger()
+        self.validator = URLValidator()
+        
         # Settings file path
         self.settings_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.json")
+        self.settings = get_settings(self.settings_file)
+        # Shared with the engines; toggled from the Diagnostics window
+        self.profiler = get_profiler(self.settings)
         
         # Create Downloads folder in program directory (default)
         self.default_downloads_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Downloads")
@@ -113,19 +127,27 @@ class HikariTikTokDownloader:
         
         self.output_dir = tk.StringVar(value=last_output_dir)
         self.engine_var = tk.StringVar(value=settings.get("engine", "yt-dlp"))
-        self.quality_var = tk.StringVar(value="best")
+        self.quality_var = tk.StringVar(value=settings.get("quality", "best"))
+        # Values as loaded; only the ones changed in the window are saved
+        self._saved_values = self._gui_values()
         self.progress_var = tk.DoubleVar()
         self.status_var = tk.StringVar(value="Ready")
         
-        self.logger = Logger()
-        self.validator = URLValidator()
+        # Token for the running download and the arguments to resume it with
+        self.current_token = None
+        self._paused_download = None
+        
+        # Job manager behind the Job Queue window, created on first use
+        self.job_manager = None
+        self._queue_window = None
         
     def setup_engines(self):
         """Initialize download engines"""
-        self.engines = {
-            "yt-dlp": YtDlpEngine(),
-            "tiktok-api": TikTokApiEngine()
-        }
+        self.engines = create_engines(self.settings)
+        
+        # Speculative metadata prefetch for the URL being typed
+        self.prefetcher = Prefetcher()
+        self._prefetch_job = None
         
     def create_ui(self):
         """Create the main user interface"""
@@ -228,7 +250,7 @@ class HikariTikTokDownloader:
         self.engine_combo = ctk.CTkComboBox(
             engine_control_frame,
             variable=self.engine_var,
-            values=["yt-dlp", "tiktok-api"],
+            values=self.engines.names(),
             height=30,
             corner_radius=8,
             state="readonly"
@@ -260,7 +282,7 @@ class HikariTikTokDownloader:
         self.quality_combo = ctk.CTkComboBox(
             quality_control_frame,
             variable=self.quality_var,
-            values=["best"],
+            values=list(QUALITY_PRESETS),
             height=30,
             corner_radius=8,
             state="readonly"
@@ -347,9 +369,59 @@ class HikariTikTokDownloader:
         )
         self.download_btn.pack(fill="x", pady=(0, 10))
         
-        # Update libraries button
+        # Pause / cancel controls for the running download
+        control_frame = ctk.CTkFrame(download_frame, fg_color="transparent")
+        control_frame.pack(fill="x", pady=(0, 10))
+        
+        self.pause_btn = ctk.CTkButton(
+            control_frame,
+            text="Pause",
+            height=32,
+            corner_radius=8,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color="#666666",
+            hover_color="#555555",
+            text_color="white",
+            text_color_disabled="white",
+            state="disabled",
+            command=self.toggle_pause
+        )
+        self.pause_btn.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        
+        self.cancel_btn = ctk.CTkButton(
+            control_frame,
+            text="Cancel",
+            height=32,
+            corner_radius=8,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color="#666666",
+            hover_color="#555555",
+            text_color="white",
+            text_color_disabled="white",
+            state="disabled",
+            command=self.cancel_download
+        )
+        self.cancel_btn.pack(side="right", fill="x", expand=True, padx=(5, 0))
+        
+        # Job queue and update libraries buttons
+        tools_frame = ctk.CTkFrame(download_frame, fg_color="transparent")
+        tools_frame.pack(fill="x")
+        
+        queue_btn = ctk.CTkButton(
+            tools_frame,
+            text="Job Queue",
+            height=32,
+            corner_radius=8,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color="#6C757D",
+            hover_color="#5A6268",
+            text_color="white",
+            command=self.show_job_queue
+        )
+        queue_btn.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        
         self.update_btn = ctk.CTkButton(
-            download_frame,
+            tools_frame,
             text="Update Libraries",
             height=32,
             corner_radius=8,
@@ -359,7 +431,7 @@ class HikariTikTokDownloader:
             text_color="white",  # White text color
             command=self.update_libraries
         )
-        self.update_btn.pack(fill="x")
+        self.update_btn.pack(side="right", fill="x", expand=True, padx=(5, 0))
     
     def create_detector_section(self, parent):
         """Create content detector section"""
@@ -474,7 +546,19 @@ class HikariTikTokDownloader:
             corner_radius=8,
             command=self.show_credits
         )
-        credits_btn.pack(pady=(0, 18))
+        credits_btn.pack(pady=(0, 8))
+        
+        diagnostics_btn = ctk.CTkButton(
+            credits_frame,
+            text="Diagnostics",
+            width=120,
+            height=32,
+            corner_radius=8,
+            fg_color="#6C757D",
+            hover_color="#5A6268",
+            command=self.show_diagnostics
+        )
+        diagnostics_btn.pack(pady=(0, 18))
         
     # Event handlers and utility methods
     def on_url_change(self, event=None):
@@ -485,11 +569,38 @@ class HikariTikTokDownloader:
             if is_valid:
                 self.status_indicator.set_status("success", "Content detected")
                 self.logger.info(f"Valid URL detected: {url}")
+                self._schedule_prefetch(url)
             else:
                 self.status_indicator.set_status("error", "No content detected")
                 self.logger.warning(f"Invalid URL: {message}")
+                self._cancel_prefetch()
         else:
             self.status_indicator.set_status("error", "No content detected")
+            self._cancel_prefetch()
+    
+    def _schedule_prefetch(self, url):
+        """Start prefetching once typing pauses, so partial URLs aren't fetched"""
+        if not self.settings.get("prefetch", True):
+            return
+        self._cancel_prefetch()
+        self._prefetch_job = self.root.after(400, lambda: self._start_prefetch(url))
+    
+    def _start_prefetch(self, url):
+        """Begin extraction and CDN warm-up for the detected URL"""
+        self._prefetch_job = None
+        if self.url_var.get().strip() != url:
+            return
+        engine_name = self.engine_var.get()
+        engine = self.engines.get(engine_name)
+        if engine:
+            self.prefetcher.start(url, engine_name, engine, self.quality_var.get())
+    
+    def _cancel_prefetch(self):
+        """Drop any pending or running prefetch"""
+        if self._prefetch_job:
+            self.root.after_cancel(self._prefetch_job)
+            self._prefetch_job = None
+        self.prefetcher.cancel()
     
     def show_engine_info(self):
         """Show engine information tooltip"""
@@ -506,7 +617,13 @@ class HikariTikTokDownloader:
     
     def show_quality_info(self):
         """Show quality information"""
-        message = "Downloads in the highest available quality (up to 1080p)\n\nThis ensures you get the best possible video quality with optimal file size."
+        message = (
+            "best: highest available quality (up to 1080p)\n"
+            "1080p / 720p / 480p: best format up to that resolution\n"
+            "data-saver: up to 720p and about 8 MB per video\n"
+            "audio: soundtrack only (native audio stream when available)\n\n"
+            "Among formats of similar size, watermark-free H.264 MP4 is preferred."
+        )
         messagebox.showinfo("Quality Information", message)
     
     def browse_output_folder(self):
@@ -527,28 +644,28 @@ class HikariTikTokDownloader:
         self.logger.info(f"Output folder reset to default: {self.default_downloads_path}")
     
     def load_settings(self):
-        """Load settings from JSON file"""
-        try:
-            if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            self.logger.warning(f"Could not load settings: {e}")
-        return {}
+        """Get effective settings from the shared store"""
+        return self.settings.as_dict()
+    
+    def _gui_values(self):
+        """Settings the main window edits"""
+        return {
+            "last_output_dir": self.output_dir.get(),
+            "engine": self.engine_var.get(),
+            "quality": self.quality_var.get()
+        }
     
     def save_settings(self):
-        """Save current settings to JSON file"""
-        try:
-            settings = {
-                "last_output_dir": self.output_dir.get(),
-                "engine": self.engine_var.get(),
-                "quality": self.quality_var.get()
-            }
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2)
-            self.logger.debug("Settings saved successfully")
-        except Exception as e:
-            self.logger.warning(f"Could not save settings: {e}")
+        """Queue the settings changed in the window for a debounced save
+        
+        Values that came from the command line or HIKARI_* variables and
+        were left alone are not written, so one-off overrides stay one-off.
+        """
+        values = self._gui_values()
+        changed = {key: value for key, value in values.items() if value != self._saved_values.get(key)}
+        if changed:
+            self.settings.update(changed)
+            self._saved_values = values
     
     def open_output_folder(self):
         """Open output folder in file explorer"""
@@ -585,23 +702,77 @@ class HikariTikTokDownloader:
                 messagebox.showerror("Error", f"Could not create output directory: {e}")
                 return
         
-        # Disable download button
+        self.current_token = CancelToken()
+        self._paused_download = None
+        self._launch_download(url, output_path, self.engine_var.get(), self.quality_var.get())
+    
+    def _launch_download(self, url, output_path, engine_name, quality):
+        """Start (or resume) the download worker for the current token"""
+        # Disable download button, enable pause/cancel
         self.download_btn.configure(state="disabled", text="Downloading...")
+        self.pause_btn.configure(state="normal", text="Pause")
+        self.cancel_btn.configure(state="normal")
         
         # Start download in separate thread
         download_thread = threading.Thread(
             target=self._download_worker,
-            args=(url, output_path),
+            args=(url, output_path, engine_name, quality, self.current_token),
             daemon=True
         )
         download_thread.start()
     
-    def _download_worker(self, url, output_path):
+    def toggle_pause(self):
+        """Pause the running download, or resume a paused one"""
+        token = self.current_token
+        if token is None:
+            return
+        
+        if self._paused_download:
+            token.resume()
+            args = self._paused_download
+            self._paused_download = None
+            self.status_var.set("Resuming download...")
+            self.logger.info("Resuming paused download")
+            self._launch_download(*args)
+        else:
+            token.pause()
+            self.pause_btn.configure(state="disabled", text="Pausing...")
+            self.status_var.set("Pausing...")
+    
+    def cancel_download(self):
+        """Cancel the running or paused download"""
+        token = self.current_token
+        if token is None:
+            return
+        
+        token.cancel()
+        self.cancel_btn.configure(state="disabled")
+        self.pause_btn.configure(state="disabled")
+        
+        if self._paused_download:
+            # Nothing is running, so drop the partial file here
+            if token.partial_path and os.path.exists(token.partial_path):
+                try:
+                    os.remove(token.partial_path)
+                except OSError:
+                    pass
+            self._paused_download = None
+            self._download_complete(False, "Download cancelled", cancelled=True)
+        else:
+            self.status_var.set("Cancelling...")
+    
+    def _download_worker(self, url, output_path, engine_name, quality, token):
         """Download worker thread"""
+        # Go through the same breakers the daemon uses, for Diagnostics
+        keys = job_keys(engine_name, token.media_url)
+        hold = self.engines.breakers.acquire(keys)
+        if hold:
+            error_msg = f"Download failed: {engine_name} keeps failing, try again in {hold:.0f}s"
+            self.logger.error(error_msg)
+            self.root.after(0, lambda: self._download_complete(False, error_msg))
+            return
         try:
-            engine_name = self.engine_var.get()
             engine = self.engines.get(engine_name)
-            quality = self.quality_var.get()
             
             self.logger.info(f"Starting download with {engine_name} engine")
             self.logger.info(f"URL: {url}")
@@ -616,26 +787,57 @@ class HikariTikTokDownloader:
             def status_callback(status):
                 self.root.after(0, lambda: self.status_var.set(status))
             
+            # Reuse metadata from the speculative prefetch when it matches
+            prepared = self.prefetcher.take(url, engine_name, quality)
+            if prepared:
+                self.logger.info("Using prefetched video information")
+            
             # Perform download
-            success, message = engine.download(
-                url, output_path, quality, 
-                progress_callback, status_callback
-            )
+            with self.profiler.profile(url, "job"):
+                success, message = engine.download(
+                    url, output_path, quality, 
+                    progress_callback, status_callback,
+                    prepared=prepared, cancel_token=token
+                )
+            self.engines.breakers.finish(keys, job_keys(engine_name, token.media_url), success)
             
             # Update UI on main thread
             self.root.after(0, lambda: self._download_complete(success, message))
             
+        except DownloadPaused:
+            self.engines.breakers.release(keys)
+            self.logger.info("Download paused")
+            args = (url, output_path, engine_name, quality)
+            self.root.after(0, lambda: self._download_paused(args))
+        except DownloadCancelled:
+            self.engines.breakers.release(keys)
+            self.logger.info("Download cancelled")
+            self.root.after(0, lambda: self._download_complete(False, "Download cancelled", cancelled=True))
         except Exception as e:
             error_msg = f"Download failed: {str(e)}"
             self.logger.error(error_msg)
+            self.engines.breakers.finish(keys, job_keys(engine_name, token.media_url), False)
             self.root.after(0, lambda: self._download_complete(False, error_msg))
     
-    def _download_complete(self, success, message):
+    def _download_paused(self, args):
+        """Handle a download stopping at a pause request"""
+        self._paused_download = args
+        self.status_var.set("Paused")
+        self.pause_btn.configure(state="normal", text="Resume")
+        self.cancel_btn.configure(state="normal")
+    
+    def _download_complete(self, success, message, cancelled=False):
         """Handle download completion"""
         # Re-enable download button
         self.download_btn.configure(state="normal", text="Download Content")
+        self.pause_btn.configure(state="disabled", text="Pause")
+        self.cancel_btn.configure(state="disabled")
+        self.current_token = None
         
-        if success:
+        if cancelled:
+            self.progress_bar.set(0)
+            self.status_var.set(message)
+        elif success:
             self.progress_bar.set(1.0)
             self.status_var.set("Download completed!")
             self.logger.info("Download completed successfully")
@@ -646,11 +848,154 @@ class HikariTikTokDownloader:
             self.logger.error(f"Download failed: {message}")
             messagebox.showerror("Download Failed", message)
     
+    def _get_job_manager(self):
+        """Start the job manager that runs queued downloads"""
+        if self.job_manager is None:
+            self.job_manager = JobManager(
+                self.engines,
+                max_workers=self.settings.get("workers", 2),
+                default_engine=self.engine_var.get()
+            )
+            self.job_manager.start()
+        return self.job_manager
+    
+    def show_job_queue(self):
+        """Show the job queue window"""
+        if self._queue_window is not None and self._queue_window.winfo_exists():
+            self._queue_window.focus()
+            return
+        manager = self._get_job_manager()
+        
+        queue_window = ctk.CTkToplevel(self.root)
+        queue_window.title("Job Queue - Hikari TikTok Downloader")
+        queue_window.geometry("760x560")
+        self._queue_window = queue_window
+        
+        toolbar = ctk.CTkFrame(queue_window, fg_color="transparent")
+        toolbar.pack(fill="x", padx=20, pady=(20, 10))
+        
+        import_btn = ctk.CTkButton(
+            toolbar,
+            text="Add Links from File...",
+            height=32,
+            corner_radius=8,
+            fg_color="#FF0050",
+            hover_color="#E6004A",
+            text_color="white",
+            command=self.import_links
+        )
+        import_btn.pack(side="left")
+        
+        summary_label = ctk.CTkLabel(toolbar, text="", font=ctk.CTkFont(size=12), text_color="#666666")
+        summary_label.pack(side="right")
+        
+        # Only the visible rows exist as widgets, so thousands of jobs stay cheap
+        job_list = VirtualList(
+            queue_window,
+            columns=[("status", "Status", 90), ("url", "Link", 0), ("progress", "Progress", 70),
+                     ("message", "Message", 220)],
+            on_activate=lambda job_id, row: webbrowser.open(row['url'])
+        )
+        job_list.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        
+        events = manager.subscribe(max_events=0)
+        for job in manager.list_jobs():
+            job_list.post(job.id, self._job_row(job.to_dict()))
+        job_list.attach(events, lambda event: (event['job']['id'], self._job_row(event['job'])))
+        
+        def refresh_summary():
+            if not summary_label.winfo_exists():
+                return
+            counts = {}
+            for row in job_list.model:
+                counts[row['status']] = counts.get(row['status'], 0) + 1
+            summary_label.configure(text="  ".join(f"{status}: {count}" for status, count in sorted(counts.items())))
+            queue_window.after(1000, refresh_summary)
+        refresh_summary()
+        
+        def close():
+            manager.unsubscribe(events)
+            self._queue_window = None
+            queue_window.destroy()
+        queue_window.protocol("WM_DELETE_WINDOW", close)
+    
+    def _job_row(self, job):
+        """Fields the job list shows for a job snapshot"""
+        return {
+            'status': job['status'],
+            'url': job['url'],
+            'progress': f"{job['progress']:.0f}%",
+            'message': job['message']
+        }
+    
+    def import_links(self):
+        """Queue every TikTok link found in a text file"""
+        path = filedialog.askopenfilename(
+            title="Select a file with TikTok links",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        args = (path, self.output_dir.get(), self.engine_var.get(), self.quality_var.get())
+        # Parsing and queueing thousands of links would stall the window
+        threading.Thread(target=self._import_worker, args=args, daemon=True).start()
+    
+    def _import_worker(self, path, output_path, engine_name, quality):
+        """Feed links from a file into the job manager"""
+        try:
+            ingestor = URLIngestor(self.validator)
+            urls = ingestor.iter_urls(ingestor.lines_from_file(path))
+            count = ingestor.feed(urls, self._get_job_manager(), output_path, engine_name, quality)
+            self.logger.info(f"Queued {count} links from {path} ({ingestor.rejected} skipped)")
+            self.root.after(0, lambda: self.status_var.set(f"Queued {count} links"))
+        except Exception as e:
+            error_msg = f"Could not import links: {str(e)}"
+            self.logger.error(error_msg)
+            self.root.after(0, lambda: messagebox.showerror("Error", error_msg))
+    
     def show_diagnostics(self):
         """Show diagnostics window"""
         diag_window = ctk.CTkToplevel(self.root)
         diag_window.title("Diagnostics - Hikari TikTok Downloader")
-        diag_window.geometry("600x400")
+        diag_window.geometry("600x620")
+        
+        # Circuit breakers
+        breaker_frame = ctk.CTkFrame(diag_window)
+        breaker_frame.pack(fill="x", padx=20, pady=(20, 0))
+        
+        breaker_label = ctk.CTkLabel(
+            breaker_frame,
+            text="Circuit Breakers",
+            font=ctk.CTkFont(size=16, weight="bold")
+        )
+        breaker_label.pack(pady=(10, 5))
+        
+        breaker_text = ctk.CTkTextbox(breaker_frame, wrap="none", height=90)
+        breaker_text.pack(fill="x", padx=10, pady=(0, 10))
+        self._show_breakers(breaker_text)
+        
+        # Profiling
+        profile_frame = ctk.CTkFrame(diag_window)
+        profile_frame.pack(fill="x", padx=20, pady=(20, 0))
+        
+        profile_var = tk.BooleanVar(value=self.profiler.enabled)
+        profile_label = ctk.CTkLabel(profile_frame, text="", font=ctk.CTkFont(size=11), text_color="#666666",
+                                     justify="left")
+        
+        def toggle_profiling():
+            self.profiler.set_enabled(profile_var.get())
+            self.settings.set("profile", profile_var.get())
+            self._show_profiler(profile_label)
+        
+        profile_switch = ctk.CTkSwitch(
+            profile_frame,
+            text="Profile downloads (cProfile + tracemalloc)",
+            variable=profile_var,
+            command=toggle_profiling
+        )
+        profile_switch.pack(anchor="w", padx=10, pady=(10, 5))
+        profile_label.pack(anchor="w", padx=10, pady=(0, 10))
+        self._show_profiler(profile_label)
         
         # Log display
         log_frame = ctk.CTkFrame(diag_window)
@@ -681,7 +1026,8 @@ class HikariTikTokDownloader:
         refresh_btn = ctk.CTkButton(
             button_frame,
             text="Refresh",
-            command=lambda: self._refresh_logs(log_text)
+            command=lambda: (self._refresh_logs(log_text), self._show_breakers(breaker_text),
+                             self._show_profiler(profile_label))
         )
         refresh_btn.pack(side="left", padx=(0, 5))
         
@@ -692,6 +1038,30 @@ class HikariTikTokDownloader:
         )
         clear_btn.pack(side="left")
     
+    def _show_breakers(self, breaker_text):
+        """Show the state of every circuit breaker"""
+        breaker_text.delete("1.0", "end")
+        breakers = self.engines.breakers.snapshot()
+        if not breakers:
+            breaker_text.insert("1.0", "No downloads yet")
+            return
+        lines = []
+        for key, breaker in breakers.items():
+            line = f"{key:<28} {breaker['state']:<10} errors {breaker['error_rate']:.0%} of {breaker['calls']}"
+            if breaker['retry_after']:
+                line += f", retry in {breaker['retry_after']:.0f}s"
+            lines.append(line)
+        breaker_text.insert("1.0", "\n".join(lines))
+    
+    def _show_profiler(self, profile_label):
+        """Show where profiles go and how many were written"""
+        stats = self.profiler.stats()
+        text = (f"{stats['rate']:.0%} of {', '.join(stats['phases'])} runs, "
+                f"{stats['profiled']} profiled so far\n{stats['directory']}")
+        if stats['last']:
+            text += f"\nLast: {os.path.basename(stats['last'])}"
+        profile_label.configure(text=text)
+    
     def _refresh_logs(self, log_text):
         """Refresh log display"""
         log_text.delete("1.0", "end")
@@ -846,7 +1216,7 @@ Foundation of this entire application"""
         # Show confirmation dialog
         result = messagebox.askyesno(
             "Update Libraries",
-            "This will update all libraries to their latest versions.\n\nThis may take a few minutes. Continue?",
+            "This will check for newer library versions and install only the outdated ones.\n\nContinue?",
             icon="question"
         )
         
@@ -866,41 +1236,51 @@ Foundation of this entire application"""
     def _update_worker(self):
         """Update worker thread"""
         try:
-            import subprocess
-            
             self.logger.info("Starting library update process")
+            self.root.after(0, lambda: self.status_var.set("Checking for updates..."))
             
-            # List of libraries to update
-            libraries = [
-                "customtkinter",
-                "pillow", 
-                "yt-dlp",
-                "requests"
-            ]
+            updater = LibraryUpdater(
+                index_url=self.settings.get("package_index_url"),
+                cache_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "update_cache.json")
+            )
+            outdated = updater.check()
+            if not outdated:
+                self.logger.info("All libraries are up to date")
+                self.root.after(0, lambda: self._update_complete(True, "All libraries are already up to date."))
+                return
             
-            # Update each library
-            for lib in libraries:
-                self.root.after(0, lambda l=lib: self.status_var.set(f"Updating {l}..."))
-                self.logger.info(f"Updating {lib}")
+            summary = ", ".join(f"{name} {current or 'missing'} -> {latest}" for name, current, latest in outdated)
+            self.logger.info(f"Updating: {summary}")
+            
+            # yt-dlp can be swapped in place (an engine not loaded yet just imports
+            # the new version when first used); the rest needs a restart
+            reload = [(name, self.engines.loaded(name)) for name, _, _ in outdated
+                      if name in HOT_RELOADABLE and self.engines.loaded(name)]
+            restart = [name for name, _, _ in outdated if name not in HOT_RELOADABLE]
+            
+            with contextlib.ExitStack() as stack:
+                # Hold new downloads and let running ones finish on the old code first
+                for name, engine in reload:
+                    if engine.library_users():
+                        self.root.after(0, lambda: self.status_var.set(
+                            "Waiting for running downloads to finish before updating..."))
+                    stack.enter_context(engine.library_swap())
                 
-                try:
-                    # Run pip install --upgrade for each library
-                    result = subprocess.run([
-                        sys.executable, "-m", "pip", "install", "--upgrade", lib
-                    ], capture_output=True, text=True, timeout=300)
-                    
-                    if result.returncode == 0:
-                        self.logger.info(f"Successfully updated {lib}")
-                    else:
-                        self.logger.warning(f"Failed to update {lib}: {result.stderr}")
-                        
-                except subprocess.TimeoutExpired:
-                    self.logger.error(f"Timeout updating {lib}")
-                except Exception as e:
-                    self.logger.error(f"Error updating {lib}: {e}")
+                # One pip run resolves every outdated package together
+                self.root.after(0, lambda: self.status_var.set(f"Updating {len(outdated)} libraries..."))
+                success, output = updater.upgrade(outdated)
+                if not success:
+                    self.root.after(0, lambda: self._update_complete(False, output))
+                    return
+                
+                for name, engine in reload:
+                    version = engine.reload_library()
+                    self.logger.info(f"Reloaded {name} {version}")
             
-            # Update UI on main thread
-            self.root.after(0, self._update_complete)
+            message = f"Updated: {summary}"
+            if restart:
+                message += f"\n\nRestart the application to use the new {', '.join(restart)}."
+            self.root.after(0, lambda: self._update_complete(True, message))
             
         except Exception as e:
             error_msg = f"Update failed: {str(e)}"
@@ -913,12 +1293,9 @@ Foundation of this entire application"""
         self.update_btn.configure(state="normal", text="Update Libraries")
         
         if success:
-            self.status_var.set("Libraries updated successfully!")
+            self.status_var.set("Libraries are up to date")
             self.logger.info("Library update completed successfully")
-            messagebox.showinfo(
-                "Update Complete", 
-                "Libraries have been updated successfully!\n\nRestart the application to use the latest versions."
-            )
+            messagebox.showinfo("Update Complete", message)
         else:
             self.status_var.set("Update failed")
             self.logger.error(f"Library update failed: {message}")
@@ -936,6 +1313,13 @@ Foundation of this entire application"""
     def on_closing(self):
         """Handle application closing"""
         self.save_settings()
+        self.settings.close()
+        self.prefetcher.shutdown()
+        if self.job_manager is not None:
+            self.job_manager.shutdown()
+        for engine in self.engines.values():
+            if hasattr(engine, "shutdown"):
+                engine.shutdown()
         self.logger.info("Hikari TikTok Downloader closed")
         self.root.destroy()
 
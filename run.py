@@ -29,6 +29,7 @@ Author: Gary19gts
 """
 
 import sys
+import argparse
 import subprocess
 import importlib.util
 import os
@@ -99,8 +100,84 @@ def create_directories():
     for directory in directories:
         Path(directory).mkdir(exist_ok=True)
 
+def parse_args(argv=None):
+    """Parse launcher command line options"""
+    parser = argparse.ArgumentParser(description="Hikari TikTok Downloader")
+    parser.add_argument("--engine", help="Download engine to use (overrides settings.json)")
+    parser.add_argument("--quality", help="Quality preset to use (overrides settings.json)")
+    parser.add_argument("--output-dir", dest="last_output_dir", help="Output folder (overrides settings.json)")
+    parser.add_argument("--output-layout", choices=["flat", "author-month", "id"],
+                        help="Sub-folder layout for downloads (overrides settings.json)")
+    parser.add_argument("--serve", action="store_true", help="Run the local REST daemon instead of the GUI")
+    parser.add_argument("--batch", metavar="FILE", help="Download every URL in FILE ('-' for stdin) without the GUI")
+    parser.add_argument("--host", default="127.0.0.1", help="Daemon bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="Daemon or coordinator port (default: 8765 / 8766)")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent downloads in daemon/batch/worker mode (default: 2)")
+    parser.add_argument("--coordinator", action="store_true",
+                        help="Run the cluster coordinator that hands jobs to remote workers")
+    parser.add_argument("--archive", help="Download archive file for the coordinator (default: download_archive.txt)")
+    parser.add_argument("--lease-seconds", type=int, default=60, help="How long a worker holds a job without a heartbeat")
+    parser.add_argument("--worker", metavar="URL", help="Run a headless worker that leases jobs from the coordinator at URL")
+    parser.add_argument("--search", nargs="?", const="", metavar="TEXT",
+                        help="Search the download catalog (title, description, author) and exit")
+    parser.add_argument("--author", help="Catalog search: only videos by this @author")
+    parser.add_argument("--since", help="Catalog search: from this time (30d, 2025-06 or 2025-06-01)")
+    parser.add_argument("--until", help="Catalog search: up to and including this time")
+    parser.add_argument("--by", choices=["uploaded", "downloaded"], default="uploaded",
+                        help="Catalog search: date that --since/--until apply to (default: uploaded)")
+    parser.add_argument("--limit", type=int, default=50, help="Catalog search: maximum results (default: 50)")
+    parser.add_argument("--json", action="store_true", help="Catalog search/verify: print results as JSON")
+    parser.add_argument("--verify", nargs="+", metavar="PATH",
+                        help="Check that MP4 files (or every MP4 in folders) are complete, then exit")
+    parser.add_argument("--profile", nargs="?", type=float, const=1.0, metavar="RATE",
+                        help="Profile a share of jobs with cProfile and tracemalloc into logs/profiles (default: all)")
+    parser.add_argument("--profile-phases", metavar="PHASES",
+                        help="Comma separated phases to profile: job, extract, transfer (default: job)")
+    return parser.parse_args(argv)
+
+def apply_settings_overrides(args):
+    """Layer command line options on top of the shared settings"""
+    from utils.settings import get_settings
+    get_settings().set_overrides({
+        "engine": args.engine,
+        "quality": args.quality,
+        "last_output_dir": args.last_output_dir,
+        "output_layout": args.output_layout,
+        "profile": True if args.profile is not None else None,
+        "profile_rate": args.profile,
+        "profile_phases": args.profile_phases
+    })
+
 def main():
     """Main launcher function"""
+    args = parse_args()
+    
+    if args.search is not None:
+        # Read-only and stdlib only, so skip the banner and dependency checks
+        from utils.catalog import get_catalog, print_search
+        from utils.settings import get_settings
+        catalog = get_catalog(get_settings())
+        if catalog is None:
+            print("❌ The download catalog is turned off (catalog_path)")
+            sys.exit(1)
+        try:
+            hits = print_search(catalog, args.search, args.author, args.since, args.until, args.by,
+                                args.limit, args.json)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(2)
+        if not args.json:
+            colored_print(f"🔎 {hits} result(s)")
+        return
+    
+    if args.verify:
+        # Reads box headers only, so it is safe to run on a whole library
+        from utils.mp4 import print_verify
+        checked, damaged = print_verify(args.verify, args.json)
+        if not args.json:
+            colored_print(f"{'❌' if damaged else '✅'} {checked} file(s) checked, {damaged} damaged")
+        sys.exit(1 if damaged else 0)
+    
     colored_print("🚀 Hikari TikTok Downloader Launcher")
     colored_print("=" * 40)
     
@@ -119,6 +196,46 @@ def main():
         input("Press Enter to exit...")
         sys.exit(1)
     
+    apply_settings_overrides(args)
+    
+    if args.serve:
+        from core.daemon import serve, DEFAULT_PORT
+        port = args.port or DEFAULT_PORT
+        colored_print(f"\n🛰️ Starting daemon on http://{args.host}:{port} ...")
+        serve(args.host, port, args.workers)
+        return
+    
+    if args.coordinator:
+        from core.coordinator import serve_coordinator, DEFAULT_COORDINATOR_PORT
+        # Its own default port, so it can run next to a daemon
+        port = args.port or DEFAULT_COORDINATOR_PORT
+        colored_print(f"\n🗂️ Starting coordinator on http://{args.host}:{port} ...")
+        serve_coordinator(args.host, port, args.archive, args.lease_seconds)
+        return
+    
+    if args.worker:
+        from core.remote_worker import run_worker
+        from utils.logger import Logger
+        from utils.settings import get_settings
+        Logger()
+        output_path = get_settings().get("last_output_dir") or os.path.join(os.getcwd(), "Downloads")
+        os.makedirs(output_path, exist_ok=True)
+        colored_print(f"\n🛠️ Leasing jobs from {args.worker} into {output_path} ...")
+        run_worker(args.worker, output_path, args.workers, args.engine)
+        return
+    
+    if args.batch:
+        from core.ingest import run_batch
+        from utils.logger import Logger
+        from utils.settings import get_settings
+        Logger()
+        output_path = get_settings().get("last_output_dir") or os.path.join(os.getcwd(), "Downloads")
+        os.makedirs(output_path, exist_ok=True)
+        colored_print(f"\n📄 Downloading links from {args.batch} into {output_path} ...")
+        accepted, rejected = run_batch(args.batch, output_path, args.workers, args.engine, args.quality or "best")
+        colored_print(f"✅ Processed {accepted} links ({rejected} skipped)")
+        return
+    
     # Launch the application
     colored_print("\n🎬 Starting Hikari TikTok Downloader...")
     try:
@@ -0,0 +1,147 @@
+"""
+Tests for the circuit breakers
+State changes, probes and media host keys
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import time
+import unittest
+
+from utils.circuit_breaker import (CircuitBreaker, BreakerBoard, CLOSED, OPEN, HALF_OPEN,
+                                   engine_key, host_key, job_keys)
+
+CDN_URL = "https://v16-webapp.tiktokcdn.com/video/abc.mp4?expire=1"
+
+def trip(breaker, calls=5):
+    for _ in range(calls):
+        breaker.record(False)
+
+class KeysTest(unittest.TestCase):
+    def test_keys(self):
+        self.assertEqual(engine_key("yt-dlp"), "engine:yt-dlp")
+        self.assertEqual(host_key(CDN_URL), "host:v16-webapp.tiktokcdn.com")
+        self.assertIsNone(host_key(None))
+        self.assertIsNone(host_key("not a url"))
+    
+    def test_host_only_once_the_media_url_is_known(self):
+        self.assertEqual(job_keys("api"), ["engine:api"])
+        self.assertEqual(job_keys("api", CDN_URL), ["engine:api", "host:v16-webapp.tiktokcdn.com"])
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_opens_at_error_threshold_after_min_calls(self):
+        breaker = CircuitBreaker("engine:test", min_calls=4)
+        for _ in range(3):
+            breaker.record(False)
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record(True)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.acquire())
+        self.assertGreater(breaker.retry_after(), 0)
+    
+    def test_mostly_successful_calls_stay_closed(self):
+        breaker = CircuitBreaker("engine:test", min_calls=4)
+        for success in (True, False, True, True, False, True):
+            breaker.record(success)
+        self.assertEqual(breaker.state, CLOSED)
+    
+    def test_slow_first_byte_counts_as_failure(self):
+        breaker = CircuitBreaker("host:slow", min_calls=2, slow_seconds=1.0)
+        breaker.record(True, ttfb=5.0)
+        breaker.record(True, ttfb=5.0)
+        self.assertEqual(breaker.state, OPEN)
+    
+    def test_half_open_lets_one_probe_through(self):
+        breaker = CircuitBreaker("engine:test", open_seconds=0.05)
+        trip(breaker)
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.acquire())
+        self.assertFalse(breaker.acquire())
+        breaker.record(True)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.snapshot()['calls'], 0)
+    
+    def test_failed_probe_doubles_the_cooldown(self):
+        breaker = CircuitBreaker("engine:test", open_seconds=0.05, max_open_seconds=0.08)
+        trip(breaker)
+        time.sleep(0.06)
+        self.assertTrue(breaker.acquire())
+        breaker.record(False)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertAlmostEqual(breaker.retry_after(), 0.08, delta=0.02)
+        self.assertEqual(breaker.snapshot()['times_opened'], 2)
+    
+    def test_released_probe_frees_the_slot(self):
+        breaker = CircuitBreaker("engine:test", open_seconds=0.05)
+        trip(breaker)
+        time.sleep(0.06)
+        self.assertTrue(breaker.acquire())
+        breaker.release()
+        self.assertTrue(breaker.acquire())
+
+class BreakerBoardTest(unittest.TestCase):
+    def test_acquire_is_all_or_nothing(self):
+        board = BreakerBoard(open_seconds=0.05)
+        trip(board.get("host:cdn"))
+        time.sleep(0.06)
+        self.assertTrue(board.get("host:cdn").acquire())  # Another call holds the probe
+        hold = board.acquire(["engine:api", "host:cdn"])
+        self.assertGreaterEqual(hold, 1.0)
+        self.assertEqual(board.acquire(["engine:api"]), 0)
+    
+    def test_finish_records_a_host_learned_during_the_call(self):
+        board = BreakerBoard(min_calls=2)
+        for _ in range(2):
+            keys = job_keys("api")
+            self.assertEqual(board.acquire(keys), 0)
+            board.finish(keys, job_keys("api", CDN_URL), False)
+        self.assertEqual(board.get("engine:api").state, OPEN)
+        self.assertEqual(board.get(host_key(CDN_URL)).state, OPEN)
+    
+    def test_finish_does_not_settle_another_calls_probe(self):
+        board = BreakerBoard(open_seconds=0.05)
+        cdn = host_key(CDN_URL)
+        trip(board.get(cdn))
+        time.sleep(0.06)
+        self.assertTrue(board.get(cdn).acquire())
+        board.finish(["engine:api"], job_keys("api", CDN_URL), True)
+        self.assertEqual(board.get(cdn).state, HALF_OPEN)
+    
+    def test_finish_releases_keys_that_no_longer_apply(self):
+        board = BreakerBoard(open_seconds=0.05)
+        trip(board.get("host:old"))
+        time.sleep(0.06)
+        self.assertEqual(board.acquire(["host:old"]), 0)
+        board.finish(["host:old"], ["engine:api"], True)
+        self.assertTrue(board.get("host:old").acquire())
+    
+    def test_snapshot(self):
+        board = BreakerBoard()
+        board.record(["engine:b", "engine:a"], True)
+        self.assertEqual(list(board.snapshot()), ["engine:a", "engine:b"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests for format ranking
+Quality specs, ranking, the yt-dlp selector and the format cache
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import pickle
+import time
+import unittest
+
+from engines.formats import (FormatCache, FormatPreference, FormatSelector, estimate_size,
+                             rank_formats)
+
+MB = 1024 * 1024
+
+def fmt(format_id, height, tbr, size=None, vcodec="h264", acodec="aac", ext="mp4", **extra):
+    values = dict(format_id=format_id, url=f"https://cdn.example/{format_id}", height=height, tbr=tbr,
+                  filesize=size, vcodec=vcodec, acodec=acodec, ext=ext)
+    values.update(extra)
+    return values
+
+FORMATS = [
+    fmt("540p", 540, 800, 4 * MB),
+    fmt("1080p-h265", 1080, 2900, 14 * MB, vcodec="h265"),
+    fmt("1080p-h264", 1080, 3000, 15 * MB),
+    fmt("720p", 720, 1500, 7 * MB),
+    fmt("audio", None, 128, 1 * MB, vcodec="none", ext="m4a", abr=128)
+]
+
+def ids(formats):
+    return [f['format_id'] for f in formats]
+
+class FormatPreferenceTest(unittest.TestCase):
+    def test_parse_presets_and_specs(self):
+        preference = FormatPreference.parse("data-saver")
+        self.assertEqual((preference.max_height, preference.max_size), (720, 8 * MB))
+        preference = FormatPreference.parse("≤1080p, ≤2 mbps")
+        self.assertEqual((preference.max_height, preference.max_bitrate), (1080, 2000))
+        self.assertTrue(FormatPreference.parse("audio").audio_only)
+        self.assertIsNone(FormatPreference.parse("best").max_height)
+    
+    def test_estimate_size(self):
+        self.assertEqual(estimate_size({'filesize_approx': 10}), 10)
+        self.assertEqual(estimate_size({'tbr': 8}, duration=10), 10000)
+        self.assertIsNone(estimate_size({'tbr': 8}))
+
+class RankFormatsTest(unittest.TestCase):
+    def test_best_prefers_height_then_h264_among_near_top_bitrates(self):
+        ranked = rank_formats(FORMATS, FormatPreference.parse("best"))
+        self.assertEqual(ids(ranked), ["1080p-h264", "1080p-h265", "720p", "540p"])
+    
+    def test_caps(self):
+        self.assertEqual(ids(rank_formats(FORMATS, FormatPreference.parse("720p")))[0], "720p")
+        self.assertEqual(ids(rank_formats(FORMATS, FormatPreference.parse("<=5MB"))), ["540p"])
+    
+    def test_over_budget_picks_the_smallest(self):
+        ranked = rank_formats(FORMATS, FormatPreference.parse("<=1MB"))
+        self.assertEqual(ids(ranked)[0], "540p")
+    
+    def test_watermark_loses_a_tie(self):
+        formats = [fmt("download_watermark", 720, 1500, format_note="watermarked"), fmt("play", 720, 1450)]
+        self.assertEqual(ids(rank_formats(formats, FormatPreference()))[0], "play")
+    
+    def test_audio_prefers_native_stream_then_smallest_muxed(self):
+        audio = FormatPreference.parse("audio")
+        self.assertEqual(ids(rank_formats(FORMATS, audio))[0], "audio")
+        muxed = [f for f in FORMATS if f['format_id'] != "audio"]
+        self.assertEqual(ids(rank_formats(muxed, audio))[0], "540p")
+    
+    def test_formats_without_url_are_skipped(self):
+        formats = [dict(FORMATS[2], url=None), FORMATS[3]]
+        self.assertEqual(ids(rank_formats(formats, FormatPreference())), ["720p"])
+
+class FormatSelectorTest(unittest.TestCase):
+    def test_yields_the_top_ranked_format(self):
+        selector = FormatSelector("720p")
+        self.assertEqual(ids(selector({'formats': FORMATS})), ["720p"])
+        self.assertEqual(list(selector({'formats': []})), [])
+    
+    def test_picklable_with_stable_repr(self):
+        selector = pickle.loads(pickle.dumps(FormatSelector("data-saver")))
+        self.assertEqual(repr(selector), "FormatSelector('data-saver')")
+        self.assertEqual(ids(selector({'formats': FORMATS})), ["720p"])
+
+class FormatCacheTest(unittest.TestCase):
+    def test_lru_eviction_and_expiry(self):
+        cache = FormatCache(max_entries=2, ttl=0.05)
+        cache.put("a", FORMATS)
+        cache.put("b", FORMATS)
+        cache.get("a")
+        cache.put("c", FORMATS)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache.get("a")), len(FORMATS))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("a"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for the job manager
+Submitting, coalescing and rejecting jobs
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import tempfile
+import unittest
+
+from core.jobs import Job, JobManager
+from core.scheduler import INTERACTIVE, BATCH
+
+VIDEO_URL = "https://www.tiktok.com/@user/video/7234567890123456789"
+
+class FakeEngine:
+    def download(self, url, output_path, quality, progress_callback=None, status_callback=None,
+                 cancel_token=None):
+        return True, "Download completed successfully"
+
+class JobManagerSubmitTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.output = folder.name
+        # Workers are not started, so submitted jobs stay queued
+        self.manager = JobManager({"yt-dlp": FakeEngine()})
+    
+    def tearDown(self):
+        self.manager.shutdown()
+    
+    def test_duplicate_attaches_to_queued_transfer(self):
+        first = self.manager.submit(VIDEO_URL, self.output)
+        second = self.manager.submit(VIDEO_URL, self.output)
+        self.assertIs(second.flight, first.flight)
+        self.assertEqual(second.to_dict()['coalesced_with'], first.id)
+    
+    def test_urgent_duplicate_raises_shared_priority(self):
+        first = self.manager.submit(VIDEO_URL, self.output, priority=BATCH)
+        self.manager.submit(VIDEO_URL, self.output, priority=INTERACTIVE)
+        self.assertEqual(first.priority, INTERACTIVE)
+    
+    def test_bad_hint_is_rejected_before_the_job_exists(self):
+        with self.assertRaises(ValueError):
+            self.manager.submit(VIDEO_URL, self.output, expected_size="abc")
+        self.assertEqual(self.manager.list_jobs(), [])
+        job = self.manager.submit(VIDEO_URL, self.output, expected_size="1048576")
+        self.assertEqual(job.expected_size, 1048576.0)
+        self.assertIs(job.flight.lead, job)
+    
+    def test_failed_enqueue_is_rolled_back(self):
+        def fail(*args, **kwargs):
+            raise RuntimeError("queue is broken")
+        put, self.manager._queue.put = self.manager._queue.put, fail
+        with self.assertRaises(RuntimeError):
+            self.manager.submit(VIDEO_URL, self.output)
+        self.manager._queue.put = put
+        self.assertEqual(self.manager.list_jobs(), [])
+        job = self.manager.submit(VIDEO_URL, self.output)
+        self.assertIs(job.flight.lead, job)
+    
+    def test_unknown_priority_and_engine(self):
+        with self.assertRaises(ValueError):
+            self.manager.submit(VIDEO_URL, self.output, priority="urgent")
+        with self.assertRaises(ValueError):
+            self.manager.submit(VIDEO_URL, self.output, priority=["batch"])
+        with self.assertRaises(ValueError):
+            self.manager.submit(VIDEO_URL, self.output, engine="missing")
+        self.assertIn(BATCH, self.manager.priorities)
+    
+    def test_cancel_queued_job(self):
+        job = self.manager.submit(VIDEO_URL, self.output)
+        self.manager.cancel(job.id)
+        self.assertEqual(job.status, Job.CANCELLED)
+
+if __name__ == "__main__":
+    unittest.main()
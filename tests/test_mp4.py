@@ -0,0 +1,137 @@
+"""
+Tests for MP4 inspection
+Box parsing and the checks run on finished downloads
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import os
+import struct
+import tempfile
+import unittest
+
+from utils.mp4 import MP4Error, find_box, inspect_mp4, iter_boxes, verify_download
+
+def box(box_type, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+def full_box(box_type, payload):
+    return box(box_type, b"\x00\x00\x00\x00" + payload)
+
+def track(handler, codec, offsets, width=0, height=0):
+    entry = box(codec, bytes(24) + struct.pack(">HH", width, height))
+    stbl = box(b"stbl", full_box(b"stsd", struct.pack(">I", 1) + entry) +
+               full_box(b"stco", struct.pack(f">I{len(offsets)}I", len(offsets), *offsets)))
+    mdia = box(b"mdia", full_box(b"mdhd", struct.pack(">IIII", 0, 0, 1000, 12000) + bytes(4)) +
+               full_box(b"hdlr", bytes(4) + handler + bytes(13)) + box(b"minf", stbl))
+    tkhd = full_box(b"tkhd", bytes(72) + struct.pack(">II", width << 16, height << 16))
+    return box(b"trak", tkhd + mdia)
+
+def movie(data_start, data_size):
+    mvhd = full_box(b"mvhd", struct.pack(">IIII", 0, 0, 1000, 15000) + bytes(80))
+    return box(b"moov", mvhd +
+               track(b"vide", b"avc1", [data_start, data_start + data_size // 2], 720, 1280) +
+               track(b"soun", b"mp4a", [data_start + data_size // 4]))
+
+def build(faststart=True, data=bytes(4096), first=b"ftyp"):
+    head = box(b"ftyp", b"isom\x00\x00\x02\x00isomiso2") if first == b"ftyp" else box(first)
+    if faststart:
+        # The moov size does not depend on the offsets it holds
+        start = len(head) + len(movie(0, len(data))) + 8
+        return head + movie(start, len(data)) + box(b"mdat", data)
+    start = len(head) + 8
+    return head + box(b"mdat", data) + movie(start, len(data))
+
+class BoxParserTest(unittest.TestCase):
+    def test_iter_and_find(self):
+        blob = build()
+        self.assertEqual([b[0] for b in iter_boxes(blob)], [b"ftyp", b"moov", b"mdat"])
+        self.assertIsNotNone(find_box(blob, (b"moov", b"trak", b"mdia", b"minf", b"stbl")))
+        self.assertIsNone(find_box(blob, (b"moov", b"udta")))
+    
+    def test_large_size_box(self):
+        blob = struct.pack(">I4sQ", 1, b"mdat", 20) + bytes(4)
+        self.assertEqual(list(iter_boxes(blob)), [(b"mdat", 0, 16, 20)])
+    
+    def test_box_past_the_end(self):
+        with self.assertRaises(MP4Error):
+            list(iter_boxes(build()[:-10]))
+
+class InspectMP4Test(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+    
+    def inspect(self, blob, name="video.mp4"):
+        path = os.path.join(self.folder, name)
+        with open(path, "wb") as f:
+            f.write(blob)
+        return inspect_mp4(path)
+    
+    def test_complete_files(self):
+        for faststart in (True, False):
+            report = self.inspect(build(faststart))
+            self.assertTrue(report.valid, report.problem)
+            self.assertEqual(report.brand, "isom")
+            self.assertEqual(report.as_format(), {'duration': 15.0, 'width': 720, 'height': 1280,
+                                                  'vcodec': 'avc1', 'acodec': 'mp4a'})
+    
+    def test_truncated_files(self):
+        self.assertFalse(self.inspect(build()[:len(build()) // 2]).valid)
+        self.assertIn("'moov'", self.inspect(build(faststart=False)[:-200]).problem)
+        self.assertIn("too small", self.inspect(b"").problem)
+    
+    def test_trailing_garbage(self):
+        self.assertIn("stray bytes", self.inspect(build() + b"\x00\x00\x00").problem)
+    
+    def test_missing_boxes(self):
+        no_moov = build(faststart=False)
+        no_moov = no_moov[:len(no_moov) - len(movie(0, 4096))]
+        self.assertIn("no 'moov'", self.inspect(no_moov).problem)
+        self.assertIn("instead of 'ftyp'", self.inspect(box(b"junk") + build()[24:]).problem)
+    
+    def test_chunk_offset_outside_mdat(self):
+        blob = build(faststart=False)
+        start = 24 + 8
+        bad = blob.replace(struct.pack(">I", start + 4096 // 4), struct.pack(">I", 4))
+        self.assertIn("outside every 'mdat'", self.inspect(bad).problem)
+    
+    def test_quicktime_without_ftyp(self):
+        for first in (b"wide", b"free"):
+            report = self.inspect(build(faststart=False, first=first), "clip.mov")
+            self.assertTrue(report.valid, report.problem)
+            self.assertIsNone(report.brand)
+    
+    def test_verify_download_only_checks_mp4_files(self):
+        path = os.path.join(self.folder, "notes.txt")
+        with open(path, "wb") as f:
+            f.write(b"hello")
+        self.assertIsNone(verify_download(path))
+        self.inspect(build(), "VIDEO.MP4")
+        self.assertTrue(verify_download(os.path.join(self.folder, "VIDEO.MP4")).valid)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Tests for the job scheduler
+Priority classes, the size term and held jobs
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import threading
+import time
+import unittest
+
+from core.scheduler import (JobScheduler, INTERACTIVE, BATCH, BACKGROUND, ASSUMED_THROUGHPUT,
+                            expected_seconds, size_hint)
+
+GB = 1024 ** 3
+
+class SizeHintTest(unittest.TestCase):
+    def test_converts_numbers_and_numeric_strings(self):
+        self.assertEqual(size_hint(1024), 1024.0)
+        self.assertEqual(size_hint("2.5", "duration"), 2.5)
+        self.assertIsNone(size_hint(None))
+        self.assertIsNone(size_hint(""))
+    
+    def test_rejects_anything_else(self):
+        for value in ("abc", [1], {"a": 1}, True, -1, float("nan"), float("inf")):
+            with self.assertRaises(ValueError, msg=repr(value)):
+                size_hint(value, "expected_size")
+    
+    def test_expected_seconds_prefers_size_over_duration(self):
+        self.assertEqual(expected_seconds(ASSUMED_THROUGHPUT * 3, duration=1000), 3)
+        self.assertLess(expected_seconds(duration=10), expected_seconds(duration=100))
+
+class JobSchedulerTest(unittest.TestCase):
+    def drain(self, queue):
+        jobs = []
+        while len(queue):
+            jobs.append(queue.get(timeout=1))
+        return jobs
+    
+    def test_class_order_at_same_time(self):
+        queue = JobScheduler()
+        now = time.time()
+        queue.put("background", BACKGROUND, queued_at=now)
+        queue.put("batch", BATCH, queued_at=now)
+        queue.put("interactive", INTERACTIVE, queued_at=now)
+        self.assertEqual(self.drain(queue), ["interactive", "batch", "background"])
+    
+    def test_smaller_jobs_first_within_a_class(self):
+        queue = JobScheduler()
+        now = time.time()
+        queue.put("big", BATCH, expected_size=200 * 1024 * 1024, queued_at=now)
+        queue.put("unknown", BATCH, queued_at=now)
+        queue.put("small", BATCH, expected_size=1024 * 1024, queued_at=now)
+        self.assertEqual(self.drain(queue), ["small", "unknown", "big"])
+    
+    def test_size_never_outweighs_the_priority_class(self):
+        queue = JobScheduler()
+        now = time.time()
+        queue.put("batch", BATCH, expected_size=1024, queued_at=now)
+        queue.put("huge", INTERACTIVE, expected_size=2 * GB, queued_at=now)
+        self.assertEqual(self.drain(queue), ["huge", "batch"])
+        self.assertEqual(queue.max_size_seconds, 60.0)
+    
+    def test_old_batch_job_beats_new_interactive_job(self):
+        queue = JobScheduler()
+        now = time.time()
+        queue.put("new", INTERACTIVE, queued_at=now)
+        queue.put("old", BATCH, queued_at=now - 600)
+        self.assertEqual(self.drain(queue), ["old", "new"])
+    
+    def test_unknown_or_unhashable_priority(self):
+        queue = JobScheduler()
+        for priority in ("urgent", ["batch"], None):
+            with self.assertRaises(ValueError):
+                queue.put("job", priority)
+        self.assertEqual(queue.priorities, (INTERACTIVE, BATCH, BACKGROUND))
+    
+    def test_held_job_waits_for_not_before(self):
+        queue = JobScheduler()
+        queue.put("held", INTERACTIVE, not_before=time.time() + 0.2)
+        self.assertIsNone(queue.get(timeout=0.05))
+        self.assertEqual(queue.queued_by_class()[INTERACTIVE], 1)
+        self.assertEqual(queue.get(timeout=1), "held")
+    
+    def test_put_waits_for_room(self):
+        queue = JobScheduler(max_pending=1)
+        queue.put("first", BATCH)
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (queue.put("second", BATCH), done.set()), daemon=True)
+        thread.start()
+        self.assertFalse(done.wait(0.1))
+        self.assertEqual(queue.get(timeout=1), "first")
+        self.assertTrue(done.wait(1))
+        self.assertEqual(queue.get(timeout=1), "second")
+    
+    def test_close_releases_waiters(self):
+        queue = JobScheduler()
+        result = []
+        thread = threading.Thread(target=lambda: result.append(queue.get()), daemon=True)
+        thread.start()
+        queue.close()
+        thread.join(1)
+        self.assertEqual(result, [None])
+
+if __name__ == "__main__":
+    unittest.main()
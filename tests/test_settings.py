@@ -0,0 +1,125 @@
+"""
+Tests for the settings store
+Layering, persistence and debounced saves
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from utils.settings import SettingsStore
+
+class SettingsStoreTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        self.path = os.path.join(self.folder, "settings.json")
+    
+    def write_file(self, data):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    
+    def read_file(self):
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+    
+    def store(self, **kwargs):
+        kwargs.setdefault("environ", {})
+        store = SettingsStore(self.path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+    
+    def test_layers_from_defaults_to_overrides(self):
+        self.write_file({"engine": "tiktok-api", "quality": "720p"})
+        store = self.store(environ={"HIKARI_QUALITY": "480p", "HIKARI_WORKERS": "4", "PATH": "/bin"})
+        self.assertEqual(store.get("engine"), "tiktok-api")
+        self.assertEqual(store.get("quality"), "480p")
+        self.assertEqual(store.get("workers"), 4)  # JSON values are decoded
+        self.assertIsNone(store.get("path"))
+        store.set_overrides({"quality": "1080p", "engine": None})
+        self.assertEqual(store.get("quality"), "1080p")
+        self.assertEqual(store.get("engine"), "tiktok-api")
+        self.assertEqual(store.as_dict()["quality"], "1080p")
+    
+    def test_defaults_and_missing_file(self):
+        store = self.store(defaults={"theme": "dark"})
+        self.assertEqual(store.get("engine"), "yt-dlp")
+        self.assertEqual(store.get("theme"), "dark")
+        self.assertEqual(store.get("missing", 3), 3)
+    
+    def test_corrupt_file_is_ignored(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        self.assertEqual(self.store().get("engine"), "yt-dlp")
+    
+    def test_explicit_change_beats_env_and_cli(self):
+        store = self.store(environ={"HIKARI_QUALITY": "480p"})
+        store.set_overrides({"quality": "1080p"})
+        store.set("quality", "720p")
+        self.assertEqual(store.get("quality"), "720p")
+    
+    def test_only_the_file_layer_is_persisted(self):
+        self.write_file({"engine": "tiktok-api"})
+        store = self.store(environ={"HIKARI_QUALITY": "480p"})
+        store.set_overrides({"workers": 8})
+        store.set("last_output_dir", "/tmp/videos")
+        self.assertTrue(store.flush())
+        self.assertEqual(self.read_file(), {"engine": "tiktok-api", "last_output_dir": "/tmp/videos"})
+    
+    def test_saves_are_debounced(self):
+        store = self.store(flush_delay=0.1)
+        for value in range(5):
+            store.set("counter", value)
+        self.assertFalse(os.path.exists(self.path))
+        time.sleep(0.3)
+        self.assertEqual(self.read_file(), {"counter": 4})
+        self.assertEqual([name for name in os.listdir(self.folder)], ["settings.json"])
+    
+    def test_unchanged_values_do_not_schedule_a_save(self):
+        self.write_file({"engine": "yt-dlp"})
+        store = self.store(flush_delay=0.05)
+        store.set("engine", "yt-dlp")
+        os.remove(self.path)
+        time.sleep(0.15)
+        self.assertFalse(os.path.exists(self.path))
+    
+    def test_reload_keeps_unsaved_changes(self):
+        store = self.store(flush_delay=60)
+        store.set("quality", "720p")
+        self.write_file({"quality": "480p"})
+        store.reload()
+        self.assertEqual(store.get("quality"), "720p")
+        store.flush()
+        self.write_file({"quality": "480p"})
+        store.reload()
+        self.assertEqual(store.get("quality"), "480p")
+
+if __name__ == "__main__":
+    unittest.main()
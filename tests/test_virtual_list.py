@@ -0,0 +1,71 @@
+"""
+Tests for the virtual list model
+Merging batched row updates
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import unittest
+
+try:
+    from ui.components import VirtualListModel
+except ImportError:  # customtkinter or Tk is not installed
+    VirtualListModel = None
+
+@unittest.skipIf(VirtualListModel is None, "ui.components needs customtkinter")
+class VirtualListModelTest(unittest.TestCase):
+    def test_apply_adds_rows_in_insertion_order(self):
+        model = VirtualListModel()
+        added, changed = model.apply({"b": {"status": "queued"}, "a": {"status": "queued"}})
+        self.assertEqual((added, changed), (2, set()))
+        self.assertEqual([model.key_at(i) for i in range(len(model))], ["b", "a"])
+        self.assertEqual(model.index_of("a"), 1)
+        self.assertIsNone(model.index_of("c"))
+    
+    def test_apply_merges_fields_and_reports_changed_indexes(self):
+        model = VirtualListModel()
+        model.apply({"a": {"status": "queued", "progress": 0}, "b": {"status": "queued"}})
+        added, changed = model.apply({"b": {"progress": 50}, "c": {"status": "queued"}})
+        self.assertEqual((added, changed), (1, {1}))
+        self.assertEqual(model.get("b"), {"status": "queued", "progress": 50})
+        self.assertEqual(model[2], {"status": "queued"})
+    
+    def test_rows_are_copies(self):
+        fields = {"status": "queued"}
+        model = VirtualListModel()
+        model.apply({"a": fields})
+        model.apply({"a": {"status": "running"}})
+        self.assertEqual(fields, {"status": "queued"})
+    
+    def test_clear(self):
+        model = VirtualListModel()
+        model.apply({"a": {}})
+        model.clear()
+        self.assertEqual(len(model), 0)
+        self.assertIsNone(model.get("a"))
+        self.assertEqual(model.apply({"a": {}}), (1, set()))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -26,6 +26,8 @@ For commercial licensing, contact Gary19gts.
 Author: Gary19gts
 """
 
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk
 import customtkinter as ctk
@@ -124,4 +126,217 @@ class StatusIndicator(ctk.CTkFrame):
         }
         
         self.status_dot.configure(text_color=colors.get(status, "#FF6B6B"))
-        self.status_text.configure(text=text)
\ No newline at end of file
+        self.status_text.configure(text=text)
+
+class VirtualListModel:
+    """Rows keyed by ID, in insertion order, for a VirtualList"""
+    def __init__(self):
+        self._keys = []
+        self._rows = {}
+        self._index = {}
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def __getitem__(self, index):
+        return self._rows[self._keys[index]]
+    
+    def key_at(self, index):
+        return self._keys[index]
+    
+    def get(self, key):
+        return self._rows.get(key)
+    
+    def index_of(self, key):
+        return self._index.get(key)
+    
+    def apply(self, updates):
+        """Merge a batch of {key: fields}; returns (rows added, indexes changed)"""
+        added, changed = 0, set()
+        for key, fields in updates.items():
+            row = self._rows.get(key)
+            if row is None:
+                self._index[key] = len(self._keys)
+                self._keys.append(key)
+                self._rows[key] = dict(fields)
+                added += 1
+            else:
+                row.update(fields)
+                changed.add(self._index[key])
+        return added, changed
+    
+    def clear(self):
+        self._keys.clear()
+        self._rows.clear()
+        self._index.clear()
+
+class VirtualList(ctk.CTkFrame):
+    """Scrolling list that only creates widgets for the rows on screen
+    
+    A CTk widget per row stops being usable after a few hundred rows, so
+    the list keeps a small pool of row widgets and re-labels them as it
+    scrolls through the model. Updates posted from any thread are merged
+    per key and applied in one batch per ``poll_ms`` tick, and only rows
+    that are visible get redrawn.
+    """
+    def __init__(self, parent, columns, row_height=26, poll_ms=100, on_activate=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        # columns: (field, header, width); a width of 0 takes the remaining space
+        self.columns = columns
+        self.row_height = row_height
+        self.poll_ms = poll_ms
+        self.on_activate = on_activate
+        self.model = VirtualListModel()
+        
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._sources = []
+        self._top = 0
+        self._rows = []  # (frame, labels, last texts)
+        self._poll_job = None
+        
+        header = ctk.CTkFrame(self, fg_color="transparent", height=row_height)
+        header.pack(fill="x", padx=(6, 22))
+        self._layout_cells(header, [
+            ctk.CTkLabel(header, text=title, anchor="w", font=ctk.CTkFont(size=12, weight="bold"))
+            for _, title, _ in columns
+        ])
+        
+        body = ctk.CTkFrame(self, fg_color="transparent")
+        body.pack(fill="both", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(body, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.viewport = ctk.CTkFrame(body, fg_color="transparent")
+        self.viewport.pack(side="left", fill="both", expand=True, padx=(6, 0))
+        self.viewport.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.viewport)
+        
+        self._poll_job = self.after(self.poll_ms, self._poll)
+    
+    def _layout_cells(self, parent, labels):
+        for column, ((_, _, width), label) in enumerate(zip(self.columns, labels)):
+            parent.grid_columnconfigure(column, weight=0 if width else 1, minsize=width)
+            label.grid(row=0, column=column, sticky="we", padx=(0, 6))
+    
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda event: self.scroll(-3))
+        widget.bind("<Button-5>", lambda event: self.scroll(3))
+    
+    # Updates
+    
+    def post(self, key, fields):
+        """Queue an update for one row; safe to call from any thread"""
+        with self._pending_lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = dict(fields)
+            else:
+                pending.update(fields)
+    
+    def attach(self, events, to_row, max_events=5000):
+        """Poll a queue.Queue of events, turning each into (key, fields) with to_row"""
+        self._sources.append((events, to_row, max_events))
+    
+    def _poll(self):
+        try:
+            for events, to_row, max_events in self._sources:
+                for _ in range(max_events):
+                    try:
+                        event = events.get_nowait()
+                    except queue.Empty:
+                        break
+                    update = to_row(event)
+                    if update:
+                        self.post(*update)
+            
+            with self._pending_lock:
+                batch, self._pending = self._pending, {}
+            if batch:
+                added, changed = self.model.apply(batch)
+                visible = range(self._top, self._top + len(self._rows))
+                if added or any(index in visible for index in changed):
+                    self._render()
+        finally:
+            self._poll_job = self.after(self.poll_ms, self._poll)
+    
+    def clear(self):
+        with self._pending_lock:
+            self._pending.clear()
+        self.model.clear()
+        self._top = 0
+        self._render()
+    
+    def destroy(self):
+        if self._poll_job is not None:
+            self.after_cancel(self._poll_job)
+            self._poll_job = None
+        super().destroy()
+    
+    # Scrolling and drawing
+    
+    def _on_resize(self, event):
+        wanted = max(1, event.height // self.row_height)
+        while len(self._rows) < wanted:
+            self._rows.append(self._create_row())
+        while len(self._rows) > wanted:
+            frame, _, _ = self._rows.pop()
+            frame.destroy()
+        self.scroll(0)
+    
+    def _create_row(self):
+        frame = ctk.CTkFrame(self.viewport, fg_color="transparent", height=self.row_height, corner_radius=0)
+        frame.pack(fill="x")
+        frame.pack_propagate(False)
+        frame.grid_propagate(False)
+        frame.grid_rowconfigure(0, weight=1)
+        labels = [ctk.CTkLabel(frame, text="", anchor="w", height=self.row_height - 4) for _ in self.columns]
+        self._layout_cells(frame, labels)
+        position = len(self._rows)
+        for widget in [frame] + labels:
+            self._bind_wheel(widget)
+            widget.bind("<Double-Button-1>", lambda event, offset=position: self._activate(offset))
+        return frame, labels, [None] * len(self.columns)
+    
+    def _activate(self, offset):
+        index = self._top + offset
+        if self.on_activate and index < len(self.model):
+            self.on_activate(self.model.key_at(index), self.model[index])
+    
+    def _on_wheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll(-step * 3)
+    
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self.model)))
+        elif unit == "pages":
+            self.scroll(int(amount) * max(1, len(self._rows) - 1))
+        else:
+            self.scroll(int(amount))
+    
+    def scroll(self, rows):
+        self._scroll_to(self._top + rows)
+    
+    def _scroll_to(self, top):
+        top = max(0, min(top, len(self.model) - len(self._rows)))
+        if top != self._top:
+            self._top = top
+        self._render()
+    
+    def _render(self):
+        total = len(self.model)
+        for offset, (_, labels, texts) in enumerate(self._rows):
+            index = self._top + offset
+            row = self.model[index] if index < total else None
+            for column, (field, _, _) in enumerate(self.columns):
+                text = "" if row is None else str(row.get(field, ""))
+                # Only touch labels whose text changed; each configure redraws the widget
+                if texts[column] != text:
+                    texts[column] = text
+                    labels[column].configure(text=text)
+        if total and self._rows:
+            self.scrollbar.set(self._top / total, min(1.0, (self._top + len(self._rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
\ No newline at end of file
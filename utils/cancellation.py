@@ -0,0 +1,76 @@
+"""
+Cooperative cancellation for running downloads
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import threading
+
+class DownloadCancelled(Exception):
+    """Raised inside an engine when its job was cancelled"""
+
+class DownloadPaused(Exception):
+    """Raised inside an engine when its job was paused; partial data is kept"""
+
+class CancelToken:
+    """Flag checked by engines between chunks so a job can stop promptly"""
+    
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._paused = threading.Event()
+        # Set by the engine to the .part file it is writing, for cleanup
+        self.partial_path = None
+        # Set by the engine to the media (CDN) URL it downloads from, so
+        # failures count against the host that actually served the data
+        self.media_url = None
+        # Output path (without extension) reserved for the job, reused on resume
+        self.reserved_path = None
+        # Engine the auto router picked, so a resumed job stays on it
+        self.routed_engine = None
+    
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+    
+    @property
+    def paused(self):
+        return self._paused.is_set()
+    
+    def cancel(self):
+        self._cancelled.set()
+    
+    def pause(self):
+        self._paused.set()
+    
+    def resume(self):
+        """Clear a pause so the job can run again"""
+        self._paused.clear()
+    
+    def check(self):
+        """Raise if the job should stop now"""
+        if self._cancelled.is_set():
+            raise DownloadCancelled("Download cancelled")
+        if self._paused.is_set():
+            raise DownloadPaused("Download paused")
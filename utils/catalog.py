@@ -0,0 +1,396 @@
+"""
+Download catalog for Hikari TikTok Downloader
+Records every finished download in a searchable SQLite (FTS5) database
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import atexit
+import calendar
+import hashlib
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+DEFAULT_CATALOG_NAME = "catalog.db"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Columns searchable by date
+DATE_FIELDS = {'uploaded': "uploaded_at", 'downloaded': "downloaded_at"}
+
+COLUMNS = ("video_id", "author", "title", "description", "duration", "width", "height",
+           "size", "sha256", "path", "url", "engine", "uploaded_at", "downloaded_at")
+
+# A plain INTEGER PRIMARY KEY keeps rowids stable across VACUUM, which the
+# external-content FTS table relies on
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL UNIQUE,
+    author TEXT COLLATE NOCASE,
+    title TEXT,
+    description TEXT,
+    duration REAL,
+    width INTEGER,
+    height INTEGER,
+    size INTEGER,
+    sha256 TEXT,
+    path TEXT NOT NULL,
+    url TEXT,
+    engine TEXT,
+    uploaded_at INTEGER,
+    downloaded_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_author ON videos (author, uploaded_at);
+CREATE INDEX IF NOT EXISTS videos_uploaded ON videos (uploaded_at);
+CREATE INDEX IF NOT EXISTS videos_downloaded ON videos (downloaded_at);
+CREATE INDEX IF NOT EXISTS videos_sha256 ON videos (sha256);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+    title, description, author, content='videos', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS videos_ai AFTER INSERT ON videos BEGIN
+    INSERT INTO videos_fts (rowid, title, description, author)
+    VALUES (new.id, new.title, new.description, new.author);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_ad AFTER DELETE ON videos BEGIN
+    INSERT INTO videos_fts (videos_fts, rowid, title, description, author)
+    VALUES ('delete', old.id, old.title, old.description, old.author);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_au AFTER UPDATE ON videos BEGIN
+    INSERT INTO videos_fts (videos_fts, rowid, title, description, author)
+    VALUES ('delete', old.id, old.title, old.description, old.author);
+    INSERT INTO videos_fts (rowid, title, description, author)
+    VALUES (new.id, new.title, new.description, new.author);
+END;
+"""
+
+UPSERT = (
+    f"INSERT INTO videos ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+    f"ON CONFLICT (video_id) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:])
+)
+
+_RELATIVE_TIME = re.compile(r"^(\d+)\s*([hdwm])$", re.IGNORECASE)
+_RELATIVE_UNITS = {'h': 3600, 'd': 86400, 'w': 7 * 86400, 'm': 30 * 86400}
+
+def normalize_author(author):
+    """Handle without the leading @, as stored in the catalog"""
+    return str(author).strip().lstrip("@") if author else None
+
+def parse_time(value, end=False):
+    """Epoch seconds from "30d"/"12h"/"2w", "YYYY-MM" or "YYYY-MM-DD" (UTC)
+    
+    With ``end`` a month or day means the moment it is over, so it can be
+    used as an exclusive upper bound.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    value = str(value).strip()
+    match = _RELATIVE_TIME.match(value)
+    if match:
+        return int(time.time()) - int(match.group(1)) * _RELATIVE_UNITS[match.group(2).lower()]
+    for fmt, unit in (("%Y-%m-%d", "day"), ("%Y-%m", "month")):
+        try:
+            parsed = datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        if end:
+            if unit == "day":
+                return int(parsed.timestamp()) + 86400
+            return int(parsed.timestamp()) + calendar.monthrange(parsed.year, parsed.month)[1] * 86400
+        return int(parsed.timestamp())
+    raise ValueError(f"Unrecognized time: {value} (use e.g. 30d, 2025-06 or 2025-06-01)")
+
+def _upload_timestamp(info):
+    timestamp = info.get('timestamp')
+    if timestamp:
+        return int(timestamp)
+    upload_date = str(info.get('upload_date') or '')
+    if len(upload_date) == 8 and upload_date.isdigit():
+        return calendar.timegm(time.strptime(upload_date, "%Y%m%d"))
+    return None
+
+def _fts_query(text):
+    """Quote each word so punctuation in user input is not FTS5 syntax
+    
+    A trailing * on a word keeps working as a prefix search.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Catalog:
+    """SQLite catalog of finished downloads
+    
+    ``record`` only queues the entry, so a download never waits on the
+    database: a writer thread hashes the files and inserts them in one
+    transaction per batch of up to ``batch_size`` entries, or whatever
+    arrived within ``flush_interval`` seconds. Title, description and
+    author are full-text indexed with FTS5; author and date lookups use
+    plain indexes.
+    """
+    
+    def __init__(self, path, batch_size=200, flush_interval=1.0, hash_files=True):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.hash_files = hash_files
+        self.logger = logging.getLogger("HikariDownloader")
+        
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+        
+        self._reader = self._connect(check_same_thread=False)
+        self._read_lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+    
+    def _connect(self, check_same_thread=True):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=check_same_thread)
+        connection.row_factory = sqlite3.Row
+        # WAL lets queries run while a batch is being written
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    def record(self, info, path, url=None, engine=None, fmt=None):
+        """Queue a finished download; ``fmt`` is the chosen format, if separate from info"""
+        if self._closed or not info.get('id'):
+            return
+        fmt = fmt or {}
+        entry = {
+            'video_id': str(info['id']),
+            'author': normalize_author(info.get('uploader') or info.get('author') or info.get('channel')),
+            'title': info.get('title'),
+            'description': info.get('description'),
+            'duration': info.get('duration') or fmt.get('duration'),
+            'width': fmt.get('width') or info.get('width'),
+            'height': fmt.get('height') or info.get('height'),
+            'path': os.path.abspath(path),
+            'url': url or info.get('webpage_url'),
+            'engine': engine,
+            'uploaded_at': _upload_timestamp(info),
+            'downloaded_at': int(time.time())
+        }
+        self._start_writer()
+        self._pending.put(entry)
+    
+    def _start_writer(self):
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="hikari-catalog", daemon=True)
+                self._writer.start()
+    
+    def _write_loop(self):
+        connection = self._connect()
+        stop = False
+        while not stop:
+            item = self._pending.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._pending.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(connection, batch)
+            for waiter in waiters:
+                waiter.set()
+        connection.close()
+    
+    def _write_batch(self, connection, batch):
+        rows = []
+        for entry in batch:
+            try:
+                entry['size'] = os.path.getsize(entry['path'])
+                entry['sha256'] = file_sha256(entry['path']) if self.hash_files else None
+            except OSError:
+                entry.setdefault('size', None)
+                entry.setdefault('sha256', None)
+            rows.append(tuple(entry[column] for column in COLUMNS))
+        try:
+            with connection:
+                connection.executemany(UPSERT, rows)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not write {len(rows)} catalog entries: {e}")
+    
+    def flush(self, timeout=None):
+        """Wait until everything recorded so far is written"""
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        self._pending.put(done)
+        return done.wait(timeout)
+    
+    def close(self):
+        """Write pending entries and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._pending.put(None)
+            self._writer.join()
+        with self._read_lock:
+            self._reader.close()
+    
+    def _query(self, sql, params=()):
+        with self._read_lock:
+            return [dict(row) for row in self._reader.execute(sql, params)]
+    
+    def get(self, video_id):
+        """Catalog entry of one video, or None"""
+        rows = self._query(f"SELECT {', '.join(COLUMNS)} FROM videos WHERE video_id = ?", (str(video_id),))
+        return rows[0] if rows else None
+    
+    def search(self, text=None, author=None, since=None, until=None, date_field="uploaded",
+               limit=50, offset=0):
+        """Find videos by full-text match, author and date range
+        
+        ``since``/``until`` take epoch seconds or anything parse_time()
+        accepts and filter on the upload or the download time. Text matches
+        are ordered by relevance, everything else newest first.
+        """
+        if date_field not in DATE_FIELDS:
+            raise ValueError(f"Unknown date field: {date_field}")
+        column = DATE_FIELDS[date_field]
+        clauses, params = [], []
+        if author:
+            clauses.append("v.author = ?")
+            params.append(normalize_author(author))
+        if since is not None:
+            clauses.append(f"v.{column} >= ?")
+            params.append(parse_time(since))
+        if until is not None:
+            clauses.append(f"v.{column} < ?")
+            params.append(parse_time(until, end=True))
+        
+        select = f"SELECT {', '.join('v.' + c for c in COLUMNS)} FROM videos v"
+        match = _fts_query(text) if text else ""
+        if match:
+            select += " JOIN videos_fts ON videos_fts.rowid = v.id"
+            clauses.insert(0, "videos_fts MATCH ?")
+            params.insert(0, match)
+            order = "bm25(videos_fts)"
+        else:
+            order = f"v.{column} DESC"
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._query(f"{select}{where} ORDER BY {order} LIMIT ? OFFSET ?", params + [limit, offset])
+    
+    def duplicates(self, limit=50):
+        """Groups of files with the same content hash"""
+        return self._query(
+            "SELECT sha256, COUNT(*) AS copies, GROUP_CONCAT(path, char(10)) AS paths FROM videos "
+            "WHERE sha256 IS NOT NULL GROUP BY sha256 HAVING COUNT(*) > 1 ORDER BY copies DESC LIMIT ?",
+            (limit,)
+        )
+    
+    def stats(self):
+        """Totals over the whole catalog"""
+        return self._query(
+            "SELECT COUNT(*) AS videos, COUNT(DISTINCT author) AS authors, "
+            "COALESCE(SUM(size), 0) AS bytes, MAX(downloaded_at) AS last_download FROM videos"
+        )[0]
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def catalog_path(settings):
+    """Configured catalog file; None when the catalog is turned off"""
+    path = settings.get("catalog_path") if settings else None
+    if path is None:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return os.path.join(base_dir, DEFAULT_CATALOG_NAME)
+    return path or None
+
+def get_catalog(settings):
+    """Get the catalog shared by every engine (None when turned off)"""
+    path = catalog_path(settings)
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    with _catalogs_lock:
+        catalog = _catalogs.get(path)
+        if catalog is None:
+            try:
+                hash_files = settings.get("catalog_hash", True) if settings else True
+                catalog = _catalogs[path] = Catalog(path, hash_files=hash_files)
+            except sqlite3.Error as e:
+                logging.getLogger("HikariDownloader").warning(f"Catalog disabled: {e}")
+                return None
+            # Pending entries would otherwise be lost when the process exits
+            atexit.register(catalog.close)
+        return catalog
+
+def print_search(catalog, text=None, author=None, since=None, until=None, date_field="uploaded",
+                 limit=50, as_json=False):
+    """Run a search and print it for the command line; returns the number of hits"""
+    import json
+    rows = catalog.search(text, author, since, until, date_field, limit)
+    if as_json:
+        print(json.dumps(rows, indent=2))
+        return len(rows)
+    for row in rows:
+        stamp = row['uploaded_at'] if date_field == "uploaded" else row['downloaded_at']
+        day = datetime.fromtimestamp(stamp, timezone.utc).strftime("%Y-%m-%d") if stamp else "----------"
+        size = f"{row['size'] / 1024 / 1024:.1f} MB" if row['size'] else "?"
+        print(f"{day}  @{row['author'] or '?':<20} {row['video_id']:<20} {size:>9}  {row['title'] or ''}")
+        print(f"            {row['path']}")
+    return len(rows)
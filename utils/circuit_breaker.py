@@ -0,0 +1,225 @@
+"""
+Circuit breakers for Hikari TikTok Downloader
+Stop sending jobs to an engine or host while it keeps failing
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import collections
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+def engine_key(name):
+    return f"engine:{name}"
+
+def host_key(url):
+    host = (urlparse(url).hostname or "").lower() if url else ""
+    return f"host:{host}" if host else None
+
+def job_keys(engine, media_url=None):
+    """Breakers a job for this engine and media URL goes through
+    
+    The host breaker is keyed on the media (CDN) URL the engine downloads
+    from, not the page URL: every page is on the same site, so only the
+    CDN host tells where downloads fail. It is left out until known.
+    """
+    return [key for key in (engine_key(engine), host_key(media_url)) if key]
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker driven by recent error rate
+    
+    Closed: calls go through and outcomes fill a rolling window. Once at
+    least ``min_calls`` are recorded and ``error_threshold`` of them
+    failed (or took longer than ``slow_seconds`` to start), it opens.
+    Open: calls are refused for ``open_seconds``. Half-open: one probe is
+    let through; success closes the breaker, failure opens it again for
+    twice as long (up to ``max_open_seconds``).
+    """
+    
+    def __init__(self, name, error_threshold=0.5, min_calls=5, window=20,
+                 slow_seconds=30.0, open_seconds=30.0, max_open_seconds=600.0):
+        self.name = name
+        self.error_threshold = error_threshold
+        self.min_calls = min_calls
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.logger = logging.getLogger("HikariDownloader")
+        
+        self._lock = threading.Lock()
+        self._outcomes = collections.deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._cooldown = open_seconds
+        self._probing = False
+        self._opened_count = 0
+    
+    def _refresh(self, now):
+        """Move from open to half-open once the cooldown has passed"""
+        if self._state == OPEN and now - self._opened_at >= self._cooldown:
+            self._state = HALF_OPEN
+            self._probing = False
+    
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+    
+    def acquire(self):
+        """Ask to make a call; in half-open only one probe is allowed at a time"""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+    
+    def release(self):
+        """Give back a call that ended without an outcome (paused or cancelled)"""
+        with self._lock:
+            self._probing = False
+    
+    def retry_after(self):
+        """Seconds until a refused call may try again"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self._state == OPEN:
+                return max(0.0, self._opened_at + self._cooldown - now)
+            return 1.0 if self._state == HALF_OPEN and self._probing else 0.0
+    
+    def record(self, success, ttfb=None):
+        """Record the outcome of a call"""
+        failed = not success or (ttfb is not None and ttfb > self.slow_seconds)
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self._state == OPEN:
+                return  # Late result of a call started before the breaker opened
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._trip(now, min(self._cooldown * 2, self.max_open_seconds))
+                else:
+                    self._state = CLOSED
+                    self._cooldown = self.open_seconds
+                    self._outcomes.clear()
+                    self.logger.info(f"Circuit {self.name} closed")
+                return
+            
+            self._outcomes.append(failed)
+            errors = sum(self._outcomes)
+            if len(self._outcomes) >= self.min_calls and errors / len(self._outcomes) >= self.error_threshold:
+                self._trip(now, self.open_seconds)
+    
+    def _trip(self, now, cooldown):
+        self._state = OPEN
+        self._opened_at = now
+        self._cooldown = cooldown
+        self._opened_count += 1
+        self.logger.warning(f"Circuit {self.name} opened for {cooldown:.0f}s")
+    
+    def snapshot(self):
+        """JSON-serializable state"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            calls = len(self._outcomes)
+            return {
+                'state': self._state,
+                'error_rate': round(sum(self._outcomes) / calls, 3) if calls else 0.0,
+                'calls': calls,
+                'retry_after': round(max(0.0, self._opened_at + self._cooldown - now), 1) if self._state == OPEN else 0.0,
+                'times_opened': self._opened_count
+            }
+
+class BreakerBoard:
+    """Circuit breakers by key, created on first use"""
+    
+    def __init__(self, **options):
+        self.options = options
+        self._breakers = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(key, **self.options)
+            return breaker
+    
+    def allows(self, key):
+        """Whether a breaker would currently let a call through"""
+        return self.get(key).state != OPEN
+    
+    def acquire(self, keys):
+        """Acquire every breaker; returns 0 on success or the seconds to wait"""
+        acquired = []
+        for key in keys:
+            breaker = self.get(key)
+            if not breaker.acquire():
+                for other in acquired:
+                    other.release()
+                return max(breaker.retry_after(), 1.0)
+            acquired.append(breaker)
+        return 0
+    
+    def release(self, keys):
+        for key in keys:
+            self.get(key).release()
+    
+    def record(self, keys, success, ttfb=None):
+        for key in keys:
+            self.get(key).record(success, ttfb)
+    
+    def finish(self, acquired, keys, success, ttfb=None):
+        """Record a call made under ``acquired`` against ``keys``
+        
+        Keys learned during the call (the media host) are acquired before
+        their outcome counts, so they never bypass another call's half-open
+        probe; acquired keys that no longer apply are released.
+        """
+        for key in acquired:
+            if key not in keys:
+                self.get(key).release()
+        for key in keys:
+            breaker = self.get(key)
+            if key in acquired or breaker.acquire():
+                breaker.record(success, ttfb)
+    
+    def snapshot(self):
+        """State of every breaker by key"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {key: breaker.snapshot() for key, breaker in sorted(breakers.items())}
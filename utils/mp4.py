@@ -0,0 +1,305 @@
+"""
+MP4 inspection for Hikari TikTok Downloader
+Walks the boxes of memory-mapped MP4 files to validate them and read their metadata
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import mmap
+import os
+import struct
+
+# Files that use the ISO base media (MP4) layout
+MP4_EXTENSIONS = (".mp4", ".m4a", ".m4v", ".mov")
+
+# Classic QuickTime files have no 'ftyp' and start with one of these instead
+_QUICKTIME_FIRST_BOXES = (b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot")
+
+# Boxes that start with 4 bytes of version and flags before their children
+_FULL_BOX_HEADERS = {b"meta": 4}
+
+_HEADER = struct.Struct(">I4s")
+_LARGE_SIZE = struct.Struct(">Q")
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+_U64 = struct.Struct(">Q")
+
+class MP4Error(ValueError):
+    """The file is not a well-formed MP4"""
+
+def iter_boxes(buf, start=0, end=None):
+    """Yield (type, offset, payload offset, end) of the boxes in a byte range
+    
+    ``buf`` is anything struct can read from, such as an mmap; nothing is
+    copied. Raises MP4Error when a box does not fit in the range.
+    """
+    end = len(buf) if end is None else end
+    offset = start
+    while offset < end:
+        if offset + 8 > end:
+            raise MP4Error(f"{end - offset} stray bytes at offset {offset}")
+        size, box_type = _HEADER.unpack_from(buf, offset)
+        header_size = 8
+        if size == 1:
+            if offset + 16 > end:
+                raise MP4Error(f"'{_name(box_type)}' box header at offset {offset} is cut off")
+            size = _LARGE_SIZE.unpack_from(buf, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset  # Box runs to the end of its container
+        if size < header_size:
+            raise MP4Error(f"'{_name(box_type)}' box at offset {offset} has invalid size {size}")
+        if offset + size > end:
+            raise MP4Error(f"'{_name(box_type)}' box at offset {offset} needs {size} bytes "
+                           f"but only {end - offset} are left")
+        yield box_type, offset, offset + header_size, offset + size
+        offset += size
+
+def find_box(buf, path, start=0, end=None):
+    """Payload range (start, end) of the first box along a path of types, or None"""
+    end = len(buf) if end is None else end
+    for wanted in path:
+        for box_type, _, payload, box_end in iter_boxes(buf, start, end):
+            if box_type == wanted:
+                start, end = payload + _FULL_BOX_HEADERS.get(box_type, 0), box_end
+                break
+        else:
+            return None
+    return start, end
+
+def _name(box_type):
+    return box_type.decode("ascii", "backslashreplace")
+
+class MP4Report:
+    """What inspect_mp4() found out about a file"""
+    
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.errors = []
+        self.brand = None
+        self.fragmented = False
+        self.duration = None
+        self.width = None
+        self.height = None
+        self.video_codec = None
+        self.audio_codec = None
+    
+    @property
+    def valid(self):
+        return not self.errors
+    
+    @property
+    def problem(self):
+        """First error found, or None"""
+        return self.errors[0] if self.errors else None
+    
+    def as_format(self):
+        """Measured values in the shape of a yt-dlp format dict"""
+        values = {
+            'duration': self.duration,
+            'width': self.width,
+            'height': self.height,
+            'vcodec': self.video_codec,
+            'acodec': self.audio_codec
+        }
+        return {key: value for key, value in values.items() if value is not None}
+    
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'size': self.size,
+            'valid': self.valid,
+            'errors': list(self.errors),
+            'brand': self.brand,
+            'fragmented': self.fragmented,
+            'duration': self.duration,
+            'width': self.width,
+            'height': self.height,
+            'video_codec': self.video_codec,
+            'audio_codec': self.audio_codec
+        }
+
+def inspect_mp4(path):
+    """Check that an MP4 file is complete and read its duration, resolution and codecs
+    
+    The file is memory-mapped and only box headers and the small boxes
+    inside ``moov`` are touched, so media data is never read: checking a
+    multi-gigabyte file costs a few page faults. A file passes when its
+    top-level boxes exactly fill it, ``ftyp`` (absent from classic
+    QuickTime files) comes before the media,
+    ``moov`` and ``mdat`` are present and every chunk offset points into
+    an ``mdat``. Problems are collected in the report instead of raised.
+    """
+    size = os.path.getsize(path)
+    report = MP4Report(path, size)
+    if size < 8:
+        report.errors.append(f"file is too small ({size} bytes)")
+        return report
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        try:
+            _inspect(buf, report)
+        except MP4Error as e:
+            report.errors.append(str(e))
+        except struct.error as e:
+            report.errors.append(f"malformed box: {e}")
+    return report
+
+def _inspect(buf, report):
+    boxes = {}
+    media = []  # payload ranges of the mdat boxes
+    for box_type, offset, payload, end in iter_boxes(buf):
+        if not boxes and box_type != b"ftyp" and box_type not in _QUICKTIME_FIRST_BOXES:
+            raise MP4Error(f"file starts with '{_name(box_type)}' instead of 'ftyp'")
+        boxes.setdefault(box_type, (payload, end))
+        if box_type == b"mdat":
+            media.append((payload, end))
+        elif box_type == b"moof":
+            report.fragmented = True
+    
+    if b"ftyp" in boxes:
+        report.brand = _name(buf[boxes[b"ftyp"][0]:boxes[b"ftyp"][0] + 4]).strip() or None
+    if b"moov" not in boxes:
+        raise MP4Error("no 'moov' box: the file is incomplete or was never finalized")
+    if not media:
+        raise MP4Error("no 'mdat' box: the file has no media data")
+    
+    start, end = boxes[b"moov"]
+    for box_type, _, payload, box_end in iter_boxes(buf, start, end):
+        if box_type == b"mvhd":
+            report.duration = _read_duration(buf, payload)
+        elif box_type == b"mvex":
+            report.fragmented = True
+        elif box_type == b"trak":
+            _inspect_track(buf, payload, box_end, report, media)
+
+def _read_duration(buf, payload):
+    """Seconds from an mvhd or mdhd box"""
+    if buf[payload] == 1:
+        timescale = _U32.unpack_from(buf, payload + 20)[0]
+        duration = _U64.unpack_from(buf, payload + 24)[0]
+    else:
+        timescale, duration = struct.unpack_from(">II", buf, payload + 12)
+    if not timescale or duration in (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+        return None
+    return round(duration / timescale, 3)
+
+def _inspect_track(buf, start, end, report, media):
+    mdia = find_box(buf, (b"mdia",), start, end)
+    if mdia is None:
+        raise MP4Error("track without 'mdia' box")
+    hdlr = find_box(buf, (b"hdlr",), *mdia)
+    handler = bytes(buf[hdlr[0] + 8:hdlr[0] + 12]) if hdlr else None
+    stbl = find_box(buf, (b"minf", b"stbl"), *mdia)
+    if stbl is None:
+        raise MP4Error("track without sample table")
+    
+    stsd = find_box(buf, (b"stsd",), *stbl)
+    codec = None
+    if stsd and _U32.unpack_from(buf, stsd[0] + 4)[0]:
+        # First sample entry: size, then its format code
+        codec = _name(buf[stsd[0] + 12:stsd[0] + 16])
+    
+    if handler == b"vide":
+        report.video_codec = report.video_codec or codec
+        tkhd = find_box(buf, (b"tkhd",), start, end)
+        if tkhd:
+            # Width and height are 16.16 fixed point at the end of the box
+            width, height = struct.unpack_from(">II", buf, tkhd[1] - 8)
+            report.width, report.height = width >> 16 or None, height >> 16 or None
+        if not report.width and stsd:
+            # Visual sample entry: 24 bytes of fields, then 16-bit width and height
+            width, height = struct.unpack_from(">HH", buf, stsd[0] + 8 + 32)
+            report.width, report.height = width or None, height or None
+    elif handler == b"soun":
+        report.audio_codec = report.audio_codec or codec
+    if report.duration is None:
+        mdhd = find_box(buf, (b"mdhd",), *mdia)
+        if mdhd:
+            report.duration = _read_duration(buf, mdhd[0])
+    
+    _check_chunks(buf, stbl, media, report)
+
+def _check_chunks(buf, stbl, media, report):
+    """Every chunk of samples must start inside an mdat box"""
+    for box_type, fmt in ((b"stco", ">{}I"), (b"co64", ">{}Q")):
+        table = find_box(buf, (box_type,), *stbl)
+        if table is None:
+            continue
+        count = _U32.unpack_from(buf, table[0] + 4)[0]
+        width = 4 if box_type == b"stco" else 8
+        if table[0] + 8 + count * width > table[1]:
+            raise MP4Error(f"'{_name(box_type)}' table is cut off")
+        if not count:
+            return
+        offsets = struct.unpack_from(fmt.format(count), buf, table[0] + 8)
+        for offset in (min(offsets), max(offsets)):
+            if offset >= report.size:
+                raise MP4Error(f"media chunk at offset {offset} is past the end of the file ({report.size} bytes)")
+            if not any(start <= offset < end for start, end in media):
+                raise MP4Error(f"media chunk at offset {offset} is outside every 'mdat' box")
+        return
+
+def verify_download(path):
+    """Inspect a finished download; None for files that are not MP4"""
+    if not path.lower().endswith(MP4_EXTENSIONS):
+        return None
+    return inspect_mp4(path)
+
+def iter_mp4_files(paths):
+    """MP4 files among the given files and folders (searched recursively)"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, _, files in os.walk(path):
+            for name in sorted(files):
+                if name.lower().endswith(MP4_EXTENSIONS):
+                    yield os.path.join(directory, name)
+
+def print_verify(paths, as_json=False):
+    """Check files for the command line; returns (checked, damaged)"""
+    import json
+    reports = []
+    for path in iter_mp4_files(paths):
+        try:
+            report = inspect_mp4(path)
+        except OSError as e:
+            report = MP4Report(path, None)
+            report.errors.append(str(e))
+        reports.append(report)
+        if as_json:
+            continue
+        if report.valid:
+            resolution = f"{report.width}x{report.height}" if report.width else "-"
+            duration = f"{report.duration:.1f}s" if report.duration else "?"
+            codecs = "/".join(codec for codec in (report.video_codec, report.audio_codec) if codec)
+            print(f"OK       {duration:>8} {resolution:>10} {codecs:<10} {path}")
+        else:
+            print(f"DAMAGED  {path}")
+            print(f"         {report.problem}")
+    if as_json:
+        print(json.dumps([report.to_dict() for report in reports], indent=2))
+    return len(reports), sum(not report.valid for report in reports)
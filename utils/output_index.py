@@ -0,0 +1,175 @@
+"""
+Output folder index for Hikari TikTok Downloader
+Collision-free file names and optional sharded layouts for large folders
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import os
+import re
+import threading
+from datetime import datetime, timezone
+
+# flat: everything in the output folder
+# author-month: <author>/<yyyy-mm>/
+# id: <last two digits of the video ID>/ (IDs start with a timestamp, so
+#     the trailing digits spread files evenly over 100 folders)
+LAYOUTS = ("flat", "author-month", "id")
+
+# Suffixes of in-progress files; they still claim the name of the final file
+TEMP_SUFFIXES = (".part", ".ytdl", ".temp")
+
+MAX_STEM_LENGTH = 150
+
+_UNSAFE_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+def safe_name(text, fallback="TikTok_Video"):
+    """Make a string safe to use as a file or folder name"""
+    name = _UNSAFE_CHARS.sub('_', str(text or '')).strip(' .')
+    return name[:MAX_STEM_LENGTH].rstrip(' .') or fallback
+
+def _stem_of(filename):
+    """File name without temp suffixes and extension"""
+    for suffix in TEMP_SUFFIXES:
+        if filename.endswith(suffix):
+            filename = filename[:-len(suffix)]
+            break
+    return os.path.splitext(filename)[0]
+
+def shard_path(info, layout="flat"):
+    """Relative folder a video goes to under the output folder"""
+    if layout == "author-month":
+        author = safe_name(info.get('uploader') or info.get('author') or info.get('uploader_id'), "unknown")
+        return os.path.join(author, _upload_month(info))
+    if layout == "id":
+        video_id = re.sub(r'\W', '', str(info.get('id') or ''))
+        return video_id[-2:].rjust(2, '0') if video_id else "00"
+    return ""
+
+def _upload_month(info):
+    upload_date = str(info.get('upload_date') or '')
+    if len(upload_date) == 8 and upload_date.isdigit():
+        return f"{upload_date[:4]}-{upload_date[4:6]}"
+    timestamp = info.get('timestamp')
+    if timestamp:
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m")
+    return "undated"
+
+class OutputIndex:
+    """In-memory index of the file names under one output folder
+    
+    Each folder is read with a single os.scandir the first time a name is
+    needed there and is then kept current as names are reserved, so large
+    folders cost no per-file existence checks. Names are compared
+    case-insensitively and without extension, which also keeps an audio
+    file demuxed next to its video from clashing with another download.
+    """
+    
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+        self._dirs = {}
+        self._next_suffix = {}
+    
+    def _names(self, directory):
+        """Stems used in a folder, scanning it on first use"""
+        names = self._dirs.get(directory)
+        if names is None:
+            names = set()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        names.add(_stem_of(entry.name).casefold())
+            except FileNotFoundError:
+                pass
+            self._dirs[directory] = names
+        return names
+    
+    def reserve(self, directory, stem):
+        """Claim a unique stem in a folder, adding " (n)" on collisions"""
+        directory = os.path.abspath(directory)
+        with self._lock:
+            names = self._names(directory)
+            key = stem.casefold()
+            if key not in names:
+                names.add(key)
+                return stem
+            
+            # Remember where the last search stopped so repeats stay O(1)
+            n = self._next_suffix.get((directory, key), 1)
+            while f"{stem} ({n})".casefold() in names:
+                n += 1
+            self._next_suffix[(directory, key)] = n + 1
+            names.add(f"{stem} ({n})".casefold())
+            return f"{stem} ({n})"
+    
+    def add(self, path):
+        """Record a file written outside of reserve()"""
+        directory, filename = os.path.split(os.path.abspath(path))
+        with self._lock:
+            self._names(directory).add(_stem_of(filename).casefold())
+    
+    def discard(self, path):
+        """Forget a file that was removed"""
+        directory, filename = os.path.split(os.path.abspath(path))
+        with self._lock:
+            names = self._dirs.get(directory)
+            if names is not None:
+                names.discard(_stem_of(filename).casefold())
+    
+    def refresh(self):
+        """Drop cached folders so they are scanned again on next use"""
+        with self._lock:
+            self._dirs.clear()
+            self._next_suffix.clear()
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_output_index(root):
+    """Get the shared index of an output folder"""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = OutputIndex(root)
+        return index
+
+def reserve_output_stem(output_path, info, layout="flat", cancel_token=None):
+    """Pick the unique path (without extension) a download is saved to
+    
+    The path is remembered on the job's cancel token, so a paused job
+    resumes into the same .part file instead of getting a new name.
+    """
+    if cancel_token is not None and cancel_token.reserved_path:
+        return cancel_token.reserved_path
+    
+    directory = os.path.join(output_path, shard_path(info, layout))
+    os.makedirs(directory, exist_ok=True)
+    stem = get_output_index(output_path).reserve(directory, safe_name(info.get('title')))
+    path = os.path.join(directory, stem)
+    if cancel_token is not None:
+        cancel_token.reserved_path = path
+    return path
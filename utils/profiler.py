@@ -0,0 +1,236 @@
+"""
+Profiling hooks for Hikari TikTok Downloader
+Samples jobs and download phases with cProfile and tracemalloc and writes the results to logs/
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import contextlib
+import cProfile
+import logging
+import pstats
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+# What can be profiled: a whole job, metadata extraction, or the media transfer
+PHASES = ("job", "extract", "transfer")
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "profiles")
+DEFAULT_MAX_FILES = 200
+
+# Allocations made by the profiler itself are noise in the reports
+_MEMORY_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+class JobProfiler:
+    """Wraps sampled jobs or phases in cProfile and tracemalloc
+    
+    ``profile()`` is cheap when profiling is off or a run is not sampled,
+    so the hooks can stay in place: with ``rate`` at 0.05 one run in
+    twenty pays the profiling overhead. Each sampled run writes a
+    ``.prof`` file (open it with pstats or snakeviz) and, with ``memory``
+    on, a ``.mem.txt`` file listing the lines that allocated the most
+    while it ran. Only the newest ``max_files`` results are kept.
+    
+    cProfile sees the calling thread only, so a profile covers exactly
+    the job or phase it wraps. tracemalloc is process wide: it runs while
+    any sampled run is active, and a report also counts allocations of
+    jobs that overlapped with it.
+    """
+    
+    def __init__(self, directory=DEFAULT_DIR, enabled=False, rate=1.0, phases=("job",), memory=True,
+                 top=25, max_files=DEFAULT_MAX_FILES):
+        self.directory = os.path.abspath(directory)
+        self.enabled = enabled
+        self.rate = rate
+        self.phases = set(phases)
+        self.memory = memory
+        self.top = top
+        self.max_files = max_files
+        self.logger = logging.getLogger("HikariDownloader")
+        
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._memory_users = 0
+        self._started_tracemalloc = False
+        self._counts = {'profiled': 0, 'skipped': 0}
+        self._last = None
+    
+    def set_enabled(self, enabled, rate=None):
+        """Turn profiling on or off while jobs are running"""
+        if rate is not None:
+            self.rate = rate
+        self.enabled = enabled
+    
+    def _sampled(self, phase):
+        if not self.enabled or phase not in self.phases:
+            return False
+        if getattr(self._local, "active", False):
+            return False  # Already inside a profiled job or phase
+        return self.rate >= 1 or random.random() < self.rate
+    
+    def profile(self, label, phase="job"):
+        """Context manager that profiles the wrapped code if this run is sampled"""
+        if not self._sampled(phase):
+            return contextlib.nullcontext()
+        return self._profile(label, phase)
+    
+    @contextlib.contextmanager
+    def _profile(self, label, phase):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process
+            with self._lock:
+                self._counts['skipped'] += 1
+            yield
+            return
+        
+        self._local.active = True
+        memory = self.memory and self._start_memory()
+        before = tracemalloc.take_snapshot() if memory else None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            seconds = time.perf_counter() - started
+            after = tracemalloc.take_snapshot() if memory else None
+            traced = tracemalloc.get_traced_memory() if memory else None
+            if memory:
+                self._stop_memory()
+            self._local.active = False
+            try:
+                self._write(label, phase, seconds, profiler, before, after, traced)
+            except OSError as e:
+                self.logger.warning(f"Could not write profile for {label}: {e}")
+    
+    def _start_memory(self):
+        with self._lock:
+            if self._memory_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self._memory_users += 1
+        return True
+    
+    def _stop_memory(self):
+        with self._lock:
+            self._memory_users -= 1
+            if self._memory_users == 0 and self._started_tracemalloc:
+                # Tracing slows every allocation; never leave it running idle
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+    
+    def _write(self, label, phase, seconds, profiler, before, after, traced):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        name = re.sub(r'[^\w.-]', '_', str(label))[-80:]
+        stem = os.path.join(self.directory, f"{stamp}-{phase}-{name}")
+        profiler.dump_stats(stem + ".prof")
+        if after is not None:
+            self._write_memory(stem + ".mem.txt", label, phase, seconds, before, after, traced)
+        with self._lock:
+            self._counts['profiled'] += 1
+            self._last = stem + ".prof"
+        self.logger.debug(f"Profiled {phase} {label} ({seconds:.2f}s): {stem}.prof")
+        self._prune()
+    
+    def _write_memory(self, path, label, phase, seconds, before, after, traced):
+        before = before.filter_traces(_MEMORY_FILTERS)
+        after = after.filter_traces(_MEMORY_FILTERS)
+        diff = after.compare_to(before, "lineno")
+        current, peak = traced
+        lines = [
+            f"{phase} {label}: {seconds:.3f}s",
+            f"net allocated: {sum(stat.size_diff for stat in diff) / 1024:.1f} KiB, "
+            f"traced now: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB",
+            "",
+            f"Top {self.top} lines by net allocation:"
+        ]
+        for stat in diff[:self.top]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size_diff / 1024:>10.1f} KiB {stat.count_diff:>+8} blocks  "
+                         f"{frame.filename}:{frame.lineno}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    
+    def _prune(self):
+        """Delete the oldest results beyond max_files"""
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith(".prof"))
+        except OSError:
+            return
+        for name in names[:max(0, len(names) - self.max_files)]:
+            stem = os.path.join(self.directory, name[:-len(".prof")])
+            for path in (stem + ".prof", stem + ".mem.txt"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._counts,
+                enabled=self.enabled,
+                rate=self.rate,
+                phases=sorted(self.phases),
+                directory=self.directory,
+                last=self._last
+            )
+
+_profilers = {}
+_profilers_lock = threading.Lock()
+
+def get_profiler(settings):
+    """Get the profiler shared by the engines and job runners"""
+    settings = settings or {}
+    directory = os.path.abspath(settings.get("profile_dir") or DEFAULT_DIR)
+    with _profilers_lock:
+        profiler = _profilers.get(directory)
+        if profiler is None:
+            phases = settings.get("profile_phases", ["job"])
+            if isinstance(phases, str):
+                phases = [phase.strip() for phase in phases.split(",") if phase.strip()]
+            profiler = _profilers[directory] = JobProfiler(
+                directory,
+                enabled=bool(settings.get("profile", False)),
+                rate=float(settings.get("profile_rate", 1.0)),
+                phases=phases,
+                memory=settings.get("profile_memory", True),
+                top=settings.get("profile_top", 25),
+                max_files=settings.get("profile_max_files", DEFAULT_MAX_FILES)
+            )
+        return profiler
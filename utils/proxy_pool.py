@@ -0,0 +1,348 @@
+"""
+Proxy pool for Hikari TikTok Downloader
+Spreads downloads over several egress proxies with health checks and limits
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import json
+import logging
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+STRATEGIES = ("least-loaded", "weighted")
+
+DEFAULT_PROBE_URL = "https://www.tiktok.com/robots.txt"
+
+# Consecutive transfer failures that take a proxy out until a probe passes
+MAX_FAILURES = 3
+
+def redact(url):
+    """Proxy URL without credentials, for logs and stats"""
+    parts = urlsplit(url)
+    if not parts.username and not parts.password:
+        return url
+    netloc = parts.hostname + (f":{parts.port}" if parts.port else "")
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+
+class NoProxyAvailable(Exception):
+    """Raised when no proxy frees up within the acquire timeout"""
+
+class Proxy:
+    """One egress proxy with its limits and health"""
+    
+    def __init__(self, url, weight=1, max_concurrency=None, max_bandwidth=None):
+        self.url = url
+        self.weight = max(1, int(weight))
+        self.max_concurrency = max_concurrency
+        self.max_bandwidth = max_bandwidth  # bytes per second shared by all its transfers
+        self.active = 0
+        self.healthy = True
+        self.failures = 0
+        self.latency = None
+        self.last_probe = None
+        self.current_weight = 0  # smooth weighted round-robin state
+        
+        self._bucket_lock = threading.Lock()
+        self._tokens = float(max_bandwidth or 0)
+        self._stamp = time.monotonic()
+    
+    @classmethod
+    def from_config(cls, entry):
+        """Build from a URL string or a dict with url, weight, max_concurrency, max_bandwidth_mbps"""
+        if isinstance(entry, str):
+            return cls(entry)
+        mbps = entry.get("max_bandwidth_mbps")
+        return cls(
+            entry["url"],
+            weight=entry.get("weight", 1),
+            max_concurrency=entry.get("max_concurrency"),
+            max_bandwidth=int(mbps * 1024 * 1024 / 8) if mbps else None
+        )
+    
+    @property
+    def has_capacity(self):
+        return not self.max_concurrency or self.active < self.max_concurrency
+    
+    @property
+    def per_transfer_bandwidth(self):
+        """Fixed share of the bandwidth cap for engines that take a per-job rate limit"""
+        if not self.max_bandwidth:
+            return None
+        return max(1, self.max_bandwidth // (self.max_concurrency or 1))
+    
+    def throttle(self, nbytes):
+        """Wait as long as needed to keep the proxy under its bandwidth cap"""
+        if not self.max_bandwidth:
+            return
+        with self._bucket_lock:
+            now = time.monotonic()
+            # Allow up to one second of burst, then run a deficit that is slept off
+            self._tokens = min(self.max_bandwidth, self._tokens + (now - self._stamp) * self.max_bandwidth)
+            self._stamp = now
+            self._tokens -= nbytes
+            wait = -self._tokens / self.max_bandwidth if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+    
+    def to_dict(self):
+        return {
+            'url': redact(self.url),
+            'healthy': self.healthy,
+            'active': self.active,
+            'weight': self.weight,
+            'max_concurrency': self.max_concurrency,
+            'max_bandwidth': self.max_bandwidth,
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+            'failures': self.failures
+        }
+
+class ProxyLease:
+    """A proxy checked out for one transfer; release it when done"""
+    
+    def __init__(self, pool, proxy):
+        self.pool = pool
+        self.proxy = proxy
+        self._released = False
+    
+    @property
+    def url(self):
+        return self.proxy.url
+    
+    @property
+    def proxies(self):
+        """Mapping for requests' ``proxies`` argument"""
+        return {'http': self.proxy.url, 'https': self.proxy.url}
+    
+    def throttle(self, nbytes):
+        self.proxy.throttle(nbytes)
+    
+    def record(self, success):
+        """Report whether the proxy itself worked (not whether the video did)"""
+        self.pool._record(self.proxy, success)
+    
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.pool._release(self.proxy)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+class ProxyPool:
+    """Egress proxies shared by every engine
+    
+    ``least-loaded`` picks the healthy proxy with the fewest transfers per
+    unit of weight; ``weighted`` uses smooth weighted round-robin. Each
+    proxy can cap its concurrent transfers (acquire() waits for a slot)
+    and its bandwidth. Jobs that pass a ``session_key`` stick to the same
+    proxy for ``sticky_ttl`` seconds, so cookies and IP-bound media URLs
+    keep working between extraction and download.
+    
+    Health is tracked passively (repeated transfer failures take a proxy
+    out) and actively by probing ``probe_url`` through every proxy each
+    ``probe_interval`` seconds.
+    """
+    
+    def __init__(self, proxies, strategy="least-loaded", probe_url=DEFAULT_PROBE_URL,
+                 probe_interval=60, probe_timeout=5, sticky_ttl=1800):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown proxy strategy: {strategy}")
+        self.proxies = [p if isinstance(p, Proxy) else Proxy.from_config(p) for p in proxies]
+        if not self.proxies:
+            raise ValueError("A proxy pool needs at least one proxy")
+        self.strategy = strategy
+        self.probe_url = probe_url
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.sticky_ttl = sticky_ttl
+        self.logger = logging.getLogger("HikariDownloader")
+        
+        self._condition = threading.Condition()
+        self._sticky = {}
+        self._stop = threading.Event()
+        self._prober = None
+    
+    @classmethod
+    def from_settings(cls, settings):
+        """Build from the "proxies" setting; None when no proxies are configured"""
+        proxies = settings.get("proxies")
+        if not proxies:
+            return None
+        return cls(
+            proxies,
+            strategy=settings.get("proxy_strategy", "least-loaded"),
+            probe_url=settings.get("proxy_probe_url", DEFAULT_PROBE_URL),
+            probe_interval=settings.get("proxy_probe_interval", 60)
+        )
+    
+    def _choose(self, candidates):
+        if self.strategy == "weighted":
+            total = sum(p.weight for p in candidates)
+            for proxy in candidates:
+                proxy.current_weight += proxy.weight
+            best = max(candidates, key=lambda p: p.current_weight)
+            best.current_weight -= total
+            return best
+        return min(candidates, key=lambda p: (p.active / p.weight, p.latency or 0))
+    
+    def _pick(self, session_key):
+        """Proxy to use now, or None if the right one is at capacity"""
+        now = time.monotonic()
+        if session_key is not None:
+            sticky = self._sticky.get(session_key)
+            if sticky and sticky[1] > now and sticky[0].healthy:
+                return sticky[0] if sticky[0].has_capacity else None
+        
+        healthy = [p for p in self.proxies if p.healthy]
+        if not healthy:
+            # Better to try a proxy that failed a probe than to stall every job
+            healthy = self.proxies
+        candidates = [p for p in healthy if p.has_capacity]
+        if not candidates:
+            return None
+        proxy = self._choose(candidates)
+        if session_key is not None:
+            self._sticky[session_key] = (proxy, now + self.sticky_ttl)
+        return proxy
+    
+    def acquire(self, session_key=None, timeout=None):
+        """Check out a proxy, waiting for a free slot; returns a ProxyLease"""
+        self.start_health_checks()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                proxy = self._pick(session_key)
+                if proxy is not None:
+                    proxy.active += 1
+                    return ProxyLease(self, proxy)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise NoProxyAvailable("Every proxy is at its concurrency limit")
+                self._condition.wait(remaining)
+    
+    def _release(self, proxy):
+        with self._condition:
+            proxy.active -= 1
+            self._condition.notify_all()
+    
+    def _record(self, proxy, success):
+        with self._condition:
+            if success:
+                proxy.failures = 0
+                return
+            proxy.failures += 1
+            if proxy.failures >= MAX_FAILURES and proxy.healthy:
+                proxy.healthy = False
+                self.logger.warning(f"Proxy {redact(proxy.url)} marked unhealthy after {proxy.failures} failures")
+            self._condition.notify_all()
+    
+    def probe(self, proxy):
+        """Fetch the probe URL through one proxy and update its health"""
+        started = time.monotonic()
+        try:
+            response = requests.get(
+                self.probe_url,
+                proxies={'http': proxy.url, 'https': proxy.url},
+                timeout=self.probe_timeout,
+                stream=True
+            )
+            response.close()
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        elapsed = time.monotonic() - started
+        
+        with self._condition:
+            proxy.last_probe = time.time()
+            if ok:
+                proxy.latency = elapsed if proxy.latency is None else 0.7 * proxy.latency + 0.3 * elapsed
+                if not proxy.healthy:
+                    self.logger.info(f"Proxy {redact(proxy.url)} is healthy again")
+                proxy.healthy = True
+                proxy.failures = 0
+            elif proxy.healthy:
+                proxy.healthy = False
+                self.logger.warning(f"Proxy {redact(proxy.url)} failed its health probe")
+            self._condition.notify_all()
+        return ok
+    
+    def probe_all(self):
+        """Probe every proxy in parallel"""
+        threads = [threading.Thread(target=self.probe, args=(p,), daemon=True) for p in self.proxies]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+    def start_health_checks(self):
+        """Start the background prober (once)"""
+        if self._prober is not None or not self.probe_interval:
+            return
+        with self._condition:
+            if self._prober is not None:
+                return
+            self._prober = threading.Thread(target=self._probe_loop, name="hikari-proxy-probe", daemon=True)
+            self._prober.start()
+    
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.probe_interval)
+    
+    def shutdown(self):
+        self._stop.set()
+    
+    def snapshot(self):
+        """State of every proxy"""
+        with self._condition:
+            return [proxy.to_dict() for proxy in self.proxies]
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_proxy_pool(settings):
+    """Get the pool shared by every engine for the configured proxies (None without any)"""
+    proxies = settings.get("proxies") if settings else None
+    if not proxies:
+        return None
+    key = json.dumps([
+        proxies,
+        settings.get("proxy_strategy"),
+        settings.get("proxy_probe_url"),
+        settings.get("proxy_probe_interval")
+    ], sort_keys=True)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ProxyPool.from_settings(settings)
+        return pool
@@ -0,0 +1,206 @@
+"""
+Settings store for Hikari TikTok Downloader
+Layered configuration with debounced, atomic saves
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+
+class SettingsStore:
+    """In-memory settings shared by the GUI and headless modes
+
+    Values are resolved from layered sources, lowest priority first:
+    built-in defaults, the settings file, HIKARI_* environment variables
+    and command line overrides. Only the file layer is persisted; writes
+    are debounced and replace the file atomically.
+    """
+    
+    DEFAULTS = {
+        "engine": "yt-dlp",
+        "quality": "best"
+    }
+    ENV_PREFIX = "HIKARI_"
+    
+    def __init__(self, settings_file, defaults=None, environ=None, flush_delay=1.0):
+        self.settings_file = settings_file
+        self.flush_delay = flush_delay
+        self.logger = logging.getLogger("HikariDownloader")
+        
+        self._lock = threading.RLock()
+        # Held from snapshot to rename so an older snapshot never replaces a newer file
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        
+        self._defaults = dict(self.DEFAULTS)
+        if defaults:
+            self._defaults.update(defaults)
+        self._file = self._read_file()
+        self._env = self._read_environ(os.environ if environ is None else environ)
+        self._overrides = {}
+    
+    def _read_file(self):
+        """Read the persisted layer from disk"""
+        try:
+            if os.path.exists(self.settings_file):
+                with open(self.settings_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    return data
+        except Exception as e:
+            self.logger.warning(f"Could not load settings: {e}")
+        return {}
+    
+    def _read_environ(self, environ):
+        """Collect HIKARI_* variables as lowercase setting keys"""
+        values = {}
+        for name, raw in environ.items():
+            if not name.startswith(self.ENV_PREFIX):
+                continue
+            key = name[len(self.ENV_PREFIX):].lower()
+            try:
+                values[key] = json.loads(raw)
+            except ValueError:
+                values[key] = raw
+        return values
+    
+    def set_overrides(self, overrides):
+        """Apply command line overrides, ignoring unset (None) values"""
+        with self._lock:
+            for key, value in overrides.items():
+                if value is not None:
+                    self._overrides[key] = value
+    
+    def get(self, key, default=None):
+        """Get the effective value of a setting"""
+        with self._lock:
+            for layer in (self._overrides, self._env, self._file, self._defaults):
+                if key in layer:
+                    return layer[key]
+        return default
+    
+    def as_dict(self):
+        """Get all effective settings as a plain dict"""
+        with self._lock:
+            merged = dict(self._defaults)
+            merged.update(self._file)
+            merged.update(self._env)
+            merged.update(self._overrides)
+            return merged
+    
+    def set(self, key, value):
+        """Set a persisted value and schedule a save"""
+        self.update({key: value})
+    
+    def update(self, values):
+        """Set several persisted values and schedule a save"""
+        with self._lock:
+            changed = False
+            for key, value in values.items():
+                # An explicit change wins over env/CLI for the rest of the session
+                self._env.pop(key, None)
+                self._overrides.pop(key, None)
+                if self._file.get(key) != value or key not in self._file:
+                    self._file[key] = value
+                    changed = True
+            if changed:
+                self._dirty = True
+                self._schedule_flush()
+    
+    def _schedule_flush(self):
+        """Restart the debounce timer"""
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.flush_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def flush(self):
+        """Write pending changes to disk now"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return True
+                data = dict(self._file)
+                self._dirty = False
+            
+            try:
+                self._atomic_write(data)
+                self.logger.debug("Settings saved successfully")
+                return True
+            except Exception as e:
+                with self._lock:
+                    self._dirty = True
+                self.logger.warning(f"Could not save settings: {e}")
+                return False
+    
+    def _atomic_write(self, data):
+        """Write to a temp file in the same folder, then swap it in"""
+        folder = os.path.dirname(os.path.abspath(self.settings_file))
+        fd, tmp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=folder)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.settings_file)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    def reload(self):
+        """Re-read the settings file, keeping unsaved changes"""
+        with self._lock:
+            if not self._dirty:
+                self._file = self._read_file()
+    
+    def close(self):
+        """Flush pending changes before shutdown"""
+        return self.flush()
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+def get_settings(settings_file=None):
+    """Get the process-wide settings store"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            if settings_file is None:
+                base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                settings_file = os.path.join(base_dir, "settings.json")
+            _shared_store = SettingsStore(settings_file)
+        return _shared_store
\ No newline at end of file
@@ -0,0 +1,263 @@
+"""
+Thumbnail cache for Hikari TikTok Downloader
+Renders small poster images in worker processes and keeps them in a bounded disk cache
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import atexit
+import collections
+import io
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import struct
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from utils.mp4 import find_box
+
+DEFAULT_SIZE = (320, 320)
+DEFAULT_QUALITY = 85
+DEFAULT_MAX_MB = 256
+
+# MP4 boxes on the way to iTunes-style cover art: moov/udta/meta/ilst/covr/data
+_COVER_PATH = (b"moov", b"udta", b"meta", b"ilst", b"covr", b"data")
+
+def thumbnail_url(info):
+    """Best poster image URL in an info dict, if any"""
+    if info.get('thumbnail'):
+        return info['thumbnail']
+    thumbnails = info.get('thumbnails') or []
+    for thumbnail in reversed(thumbnails):
+        if thumbnail.get('url'):
+            return thumbnail['url']
+    return info.get('cover')
+
+def read_cover_art(path):
+    """Embedded cover image bytes of an MP4/M4A file, or None"""
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            found = find_box(buf, _COVER_PATH)
+            if found is None:
+                return None
+            start, end = found
+            # data payload: 4 bytes type indicator, 4 bytes locale, then the image
+            return buf[start + 8:end] or None
+    except (OSError, ValueError, struct.error):
+        return None  # MP4Error is a ValueError, as is mmap's for empty files
+
+def _render_in_worker(dest, size, quality, source_url=None, media_path=None, timeout=15):
+    """Run inside a pool process: fetch or extract a poster image and save it as a JPEG
+    
+    Returns the size of the written file, or None when no image was found.
+    """
+    from PIL import Image
+    
+    data = read_cover_art(media_path) if media_path else None
+    if data is None and source_url:
+        import requests
+        response = requests.get(source_url, timeout=timeout)
+        response.raise_for_status()
+        data = response.content
+    if not data:
+        return None
+    
+    with Image.open(io.BytesIO(data)) as image:
+        # Let the JPEG decoder downscale while decoding, far cheaper than a full decode
+        image.draft("RGB", size)
+        image = image.convert("RGB")
+        image.thumbnail(size)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        temp_path = f"{dest}.{os.getpid()}.tmp"
+        image.save(temp_path, "JPEG", quality=quality, optimize=True)
+    os.replace(temp_path, dest)
+    return os.path.getsize(dest)
+
+class ThumbnailCache:
+    """Disk cache of small JPEG thumbnails keyed by video ID
+    
+    Images are decoded and resized in worker processes, so rendering a
+    whole history never competes with the GUI or downloads for the GIL.
+    The cache keeps at most ``max_bytes`` on disk and drops the least
+    recently used thumbnails first; use order survives restarts through
+    the files' modification times.
+    """
+    
+    def __init__(self, root, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, size=DEFAULT_SIZE,
+                 quality=DEFAULT_QUALITY, max_workers=None):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.size = tuple(size)
+        self.quality = quality
+        self.max_workers = max_workers or min(4, multiprocessing.cpu_count())
+        self.logger = logging.getLogger("HikariDownloader")
+        
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # video ID -> bytes, least recent first
+        self._total = 0
+        self._inflight = {}
+        self._executor = None
+        self._scan()
+    
+    def _scan(self):
+        """Load existing thumbnails, oldest use first"""
+        found = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(".jpg"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, video_id, size in sorted(found):
+            self._entries[video_id] = size
+            self._total += size
+    
+    def path_for(self, video_id):
+        """Where the thumbnail of a video is (or would be) stored"""
+        key = re.sub(r'[^\w-]', '_', str(video_id))
+        return os.path.join(self.root, key[-2:].rjust(2, '0'), f"{key}.jpg")
+    
+    def _key(self, video_id):
+        return os.path.basename(self.path_for(video_id))[:-4]
+    
+    def get(self, video_id):
+        """Path of a cached thumbnail, or None"""
+        key = self._key(video_id)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self.path_for(video_id)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._total -= self._entries.pop(key, 0)
+            return None
+        return path
+    
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn keeps workers clean of the parent's threads and Tk state
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+    
+    def request(self, video_id, source_url=None, media_path=None):
+        """Make sure a thumbnail exists; returns a future for its path (None if no image)
+        
+        Embedded cover art in ``media_path`` is used when present, since it
+        needs no network; otherwise the image at ``source_url`` is fetched.
+        """
+        cached = self.get(video_id)
+        if cached or not (source_url or media_path):
+            future = Future()
+            future.set_result(cached)
+            return future
+        
+        key = self._key(video_id)
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is not None:
+                return pending
+            result = self._inflight[key] = Future()
+        job = self._get_executor().submit(
+            _render_in_worker, self.path_for(video_id), self.size, self.quality, source_url, media_path
+        )
+        job.add_done_callback(lambda done: self._stored(key, video_id, done, result))
+        return result
+    
+    def _stored(self, key, video_id, done, result):
+        try:
+            size = done.result()
+        except Exception as e:
+            self.logger.debug(f"No thumbnail for {video_id}: {e}")
+            size = None
+        with self._lock:
+            self._inflight.pop(key, None)
+            if size is not None:
+                self._total += size - self._entries.pop(key, 0)
+                self._entries[key] = size
+            evicted = self._evict()
+        for path in evicted:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        result.set_result(self.path_for(video_id) if size is not None else None)
+    
+    def _evict(self):
+        """Drop least recently used entries until under the size limit; returns their paths"""
+        evicted = []
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            evicted.append(self.path_for(key))
+        return evicted
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'thumbnails': len(self._entries),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'pending': len(self._inflight)
+            }
+    
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_thumbnail_cache(settings):
+    """Get the thumbnail cache shared by every engine (None when turned off)"""
+    root = settings.get("thumbnail_cache_dir") if settings else None
+    if root is None:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        root = os.path.join(base_dir, "cache", "thumbnails")
+    if not root:
+        return None
+    root = os.path.abspath(root)
+    max_mb = settings.get("thumbnail_cache_mb", DEFAULT_MAX_MB) if settings else DEFAULT_MAX_MB
+    with _caches_lock:
+        cache = _caches.get(root)
+        if cache is None:
+            cache = _caches[root] = ThumbnailCache(root, max_bytes=int(max_mb * 1024 * 1024))
+            atexit.register(cache.shutdown, False)
+        return cache
@@ -0,0 +1,218 @@
+"""
+Library updater for Hikari TikTok Downloader
+Checks installed versions against a package index and upgrades only what is outdated
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import importlib
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+
+import requests
+
+try:
+    from packaging.version import Version, InvalidVersion
+except ImportError:  # pip always ships a copy
+    from pip._vendor.packaging.version import Version, InvalidVersion
+
+DEFAULT_INDEX_URL = "https://pypi.org/simple"
+
+# Distributions the application depends on
+PACKAGES = ("customtkinter", "pillow", "yt-dlp", "requests")
+
+# Packages that can be swapped in without restarting the application
+HOT_RELOADABLE = {"yt-dlp": "yt_dlp"}
+
+_HREF = re.compile(r'<a\s[^>]*href="([^"]+)"[^>]*>', re.IGNORECASE)
+_ARCHIVE_SUFFIXES = (".tar.gz", ".tar.bz2", ".zip", ".whl")
+
+def canonical_name(name):
+    """PEP 503 normalized project name"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def installed_version(name):
+    """Installed version of a distribution, or None"""
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+def _version_from_filename(filename, project):
+    """Version part of a wheel or sdist file name"""
+    filename = filename.split("#", 1)[0].rsplit("/", 1)[-1]
+    if not filename.endswith(_ARCHIVE_SUFFIXES):
+        return None
+    if filename.endswith(".whl"):
+        parts = filename.split("-")
+        return parts[1] if len(parts) >= 5 else None
+    stem = next(filename[:-len(s)] for s in _ARCHIVE_SUFFIXES if filename.endswith(s))
+    name, _, version = stem.rpartition("-")
+    return version if canonical_name(name) == project else None
+
+def latest_stable(versions):
+    """Highest non-prerelease version string"""
+    best = None
+    for text in versions:
+        try:
+            version = Version(text)
+        except InvalidVersion:
+            continue
+        if not version.is_prerelease and (best is None or version > best):
+            best = version
+    return str(best) if best else None
+
+def reload_module(name):
+    """Import a package again from disk, dropping every cached submodule"""
+    importlib.invalidate_caches()
+    for module_name in [m for m in sys.modules if m == name or m.startswith(name + ".")]:
+        del sys.modules[module_name]
+    return importlib.import_module(name)
+
+class LibraryUpdater:
+    """Version-aware updater for the application's dependencies
+    
+    Latest versions come from a PEP 503/691 simple index, queried in
+    parallel and cached on disk for ``cache_ttl`` seconds. Outdated
+    packages are upgraded together in a single pip run.
+    """
+    
+    def __init__(self, packages=PACKAGES, index_url=None, cache_file=None, cache_ttl=3600, timeout=10):
+        self.packages = tuple(packages)
+        self.index_url = (index_url or DEFAULT_INDEX_URL).rstrip("/")
+        self.cache_file = cache_file
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self.logger = logging.getLogger("HikariDownloader")
+        self._lock = threading.Lock()
+    
+    def _read_cache(self):
+        if not self.cache_file:
+            return {}
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict) or cache.get("index_url") != self.index_url:
+            return {}
+        return cache.get("packages", {})
+    
+    def _write_cache(self, packages):
+        if not self.cache_file:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.cache_file))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"index_url": self.index_url, "packages": packages}, f, indent=2)
+            os.replace(temp_path, self.cache_file)
+        except OSError as e:
+            self.logger.warning(f"Could not save update cache: {e}")
+    
+    def fetch_latest(self, name):
+        """Query the index for the latest stable version of one project"""
+        project = canonical_name(name)
+        response = requests.get(
+            f"{self.index_url}/{project}/",
+            headers={"Accept": "application/vnd.pypi.simple.v1+json, text/html;q=0.1"},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        
+        if "json" in response.headers.get("Content-Type", ""):
+            data = response.json()
+            versions = data.get("versions")
+            if not versions:
+                versions = [
+                    _version_from_filename(f.get("filename", ""), project)
+                    for f in data.get("files", []) if not f.get("yanked")
+                ]
+        else:
+            versions = [
+                _version_from_filename(href, project)
+                for href in _HREF.findall(response.text)
+            ]
+        return latest_stable(v for v in versions if v)
+    
+    def latest_versions(self, force=False):
+        """Latest versions of every package, from the cache when still fresh"""
+        with self._lock:
+            cache = self._read_cache()
+            now = time.time()
+            stale = [
+                name for name in self.packages
+                if force or now - cache.get(name, {}).get("checked", 0) > self.cache_ttl
+            ]
+            
+            if stale:
+                with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+                    futures = {name: executor.submit(self.fetch_latest, name) for name in stale}
+                for name, future in futures.items():
+                    try:
+                        cache[name] = {"version": future.result(), "checked": now}
+                    except Exception as e:
+                        self.logger.warning(f"Could not check {name}: {e}")
+                self._write_cache(cache)
+            
+            return {name: cache.get(name, {}).get("version") for name in self.packages}
+    
+    def check(self, force=False):
+        """List (name, installed, latest) for every outdated package"""
+        outdated = []
+        for name, latest in self.latest_versions(force).items():
+            current = installed_version(name)
+            if not latest:
+                continue
+            try:
+                if current is None or Version(latest) > Version(current):
+                    outdated.append((name, current, latest))
+            except InvalidVersion:
+                continue
+        return outdated
+    
+    def upgrade(self, outdated, timeout=300):
+        """Install the given (name, installed, latest) entries in one pip run"""
+        if not outdated:
+            return True, ""
+        command = [sys.executable, "-m", "pip", "install", "--upgrade", "--disable-pip-version-check"]
+        if self.index_url != DEFAULT_INDEX_URL:
+            command += ["--index-url", self.index_url]
+        command += [f"{name}=={latest}" for name, _, latest in outdated]
+        
+        self.logger.info(f"Running: {' '.join(command)}")
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            return False, result.stderr.strip() or result.stdout.strip()
+        return True, result.stdout.strip()
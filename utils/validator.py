@@ -29,6 +29,8 @@ Author: Gary19gts
 import re
 from urllib.parse import urlparse
 
+import requests
+
 class URLValidator:
     """Validates TikTok URLs"""
     
@@ -79,6 +81,14 @@ class URLValidator:
                 return match.group(1)
         return None
     
+    def resolve_url(self, url, timeout=10):
+        """Follow a short link (vm.tiktok.com, /t/) to the video page it points to"""
+        if not re.search(r'(vm\.tiktok\.com/|tiktok\.com/t/)', url, re.IGNORECASE):
+            return url
+        response = requests.head(url, allow_redirects=True, timeout=timeout)
+        response.close()
+        return response.url
+    
     def normalize_url(self, url):
         """Normalize TikTok URL to standard format"""
         if not url:
@@ -0,0 +1,176 @@
+"""
+Write-behind file output for downloads
+Keeps the network reader from stalling on slow disks
+
+Copyright (C) 2025 Gary19gts
+
+This program is dual-licensed:
+1. GNU Affero General Public License v3 (AGPLv3) for open source use
+2. Proprietary license for commercial/closed source use
+
+For open source use:
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+For commercial licensing, contact Gary19gts.
+
+Author: Gary19gts
+"""
+
+import os
+import queue
+import threading
+
+DEFAULT_BUFFER_SIZE = 256 * 1024
+DEFAULT_BUFFERS = 16
+
+def fsync_directory(path):
+    """Persist a rename by syncing its directory (no-op where unsupported)"""
+    if os.name != "posix":
+        return
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_replace(src, dst, sync=True):
+    """Rename src over dst so readers see either nothing or the whole file"""
+    os.replace(src, dst)
+    if sync:
+        fsync_directory(os.path.dirname(os.path.abspath(dst)))
+
+class WriteBehindWriter:
+    """File writer that hands buffers to a dedicated disk thread
+    
+    The caller fills buffers taken from a fixed pool and queues them; the
+    writer thread drains them to disk and returns them to the pool. When
+    every buffer is in flight ``write`` blocks, which bounds memory and
+    applies back-pressure only once the disk is truly behind.
+    
+    ``fsync_interval`` batches durability per job: 0 syncs once on close,
+    a positive value also syncs after that many bytes, None never syncs.
+    """
+    
+    def __init__(self, path, mode="wb", buffer_size=DEFAULT_BUFFER_SIZE, buffers=DEFAULT_BUFFERS,
+                 fsync_interval=0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.bytes_written = 0
+        
+        self._file = open(path, mode)
+        self._free = queue.Queue()
+        for _ in range(max(2, buffers)):
+            self._free.put(bytearray(buffer_size))
+        self._full = queue.Queue()
+        self._current = None
+        self._fill = 0
+        self._unsynced = 0
+        self._error = None
+        self._closed = False
+        
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return False
+        # Queued data is still written on errors so a paused .part stays resumable
+        try:
+            self.close(sync=False)
+        except Exception:
+            pass  # Report the original exception, not the write error behind it
+        return False
+    
+    def write(self, data):
+        """Queue data for the writer thread"""
+        self._raise_error()
+        view = memoryview(data)
+        while view:
+            if self._current is None:
+                self._current = self._free.get()
+                self._fill = 0
+            n = min(len(view), len(self._current) - self._fill)
+            self._current[self._fill:self._fill + n] = view[:n]
+            self._fill += n
+            view = view[n:]
+            if self._fill == len(self._current):
+                self._submit()
+        return len(data)
+    
+    def _submit(self):
+        if self._current is not None:
+            self._full.put((self._current, self._fill))
+            self._current = None
+            self._fill = 0
+    
+    def _run(self):
+        """Writer thread: drain queued buffers to disk"""
+        while True:
+            item = self._full.get()
+            if item is None:
+                break
+            buf, length = item
+            try:
+                # After an error keep recycling buffers so the reader never deadlocks
+                if self._error is None and length:
+                    self._file.write(memoryview(buf)[:length])
+                    self.bytes_written += length
+                    self._unsynced += length
+                    if self.fsync_interval and self._unsynced >= self.fsync_interval:
+                        self._sync()
+            except Exception as e:
+                # Any failure, not just disk errors, must leave the thread draining
+                self._error = e
+            finally:
+                self._free.put(buf)
+    
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+    
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+    
+    def close(self, sync=True):
+        """Drain the queue, optionally fsync, and close the file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._submit()
+        self._full.put(None)
+        self._thread.join()
+        try:
+            if sync and self._error is None and self.fsync_interval is not None:
+                self._sync()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._file.close()
+        self._raise_error()
+    
+    def commit(self, final_path):
+        """Close durably and atomically move the file to its final name"""
+        self.close(sync=True)
+        atomic_replace(self.path, final_path, sync=self.fsync_interval is not None)